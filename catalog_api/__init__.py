@@ -0,0 +1,11 @@
+"""
+只读商品目录 JSON 服务（FastAPI + SQLModel）
+
+- 直接映射 Django 的 store_product / store_productcomment / auth_user 表，与 Django 共用同一个数据库
+- 独立的 uvicorn 应用，移动端 / 前端单页应用的目录读取不再占用 Django worker：
+
+    uvicorn catalog_api.app:app --host 0.0.0.0 --port 8001 --workers 4
+
+- 数据库连接从 Django 配置（DJANGO_SETTINGS_MODULE，缺省 shop.settings）读取，
+  CATALOG_API_DB_ALIAS 可指定使用的别名（例如只读副本 replica1）
+"""
@@ -0,0 +1,228 @@
+"""
+只读商品目录接口
+
+    GET /api/products?cursor=&limit=&fields=id,name,price     商品列表（游标分页，按上架时间倒序）
+    GET /api/products/{id}?fields=...                          商品详情
+    GET /api/products/{id}/comments?cursor=&limit=             商品评论（游标分页，按时间倒序）
+
+- 分页结构与 Django 视图的 ?format=json 一致：{"results": [...], "next": 游标, "previous": 游标}，
+  游标格式与 store.pagination 相同
+- fields 只查询需要的列
+- 响应带 ETag（响应体哈希），请求头 If-None-Match 命中时返回 304
+"""
+import datetime
+import hashlib
+import json
+import os
+from decimal import Decimal
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_, select
+
+from store.pagination import decode_cursor, encode_cursor
+
+from .db import Database
+from .models import Product, ProductComment, User
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# 可选字段 → 列；未指定 fields 时返回全部
+PRODUCT_FIELDS = {
+    'id': Product.id,
+    'sku': Product.sku,
+    'name': Product.name,
+    'description': Product.description,
+    'price': Product.price,
+    'stock': Product.stock,
+    'image': Product.image,
+    'comment_count': Product.comment_count,
+    'created_at': Product.created_at,
+}
+# 列表默认不返回描述，减少响应体积
+LIST_FIELDS = tuple(f for f in PRODUCT_FIELDS if f != 'description')
+
+
+def _parse_fields(fields, default):
+    if not fields:
+        return default
+    names = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in names if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(400, f'未知字段：{", ".join(unknown)}')
+    return tuple(dict.fromkeys(names))
+
+
+def _decode(cursor, size):
+    """
+    非法游标按第一页处理（与 store.pagination 一致）
+    """
+    if not cursor:
+        return None, 'n'
+    try:
+        values, direction = decode_cursor(cursor)
+        if len(values) != size:
+            raise ValueError('invalid cursor')
+        return values, direction
+    except ValueError:
+        return None, 'n'
+
+
+def _seek(columns, values, forward):
+    """
+    按 (created_at DESC, id DESC) 定位游标之后 / 之前的行
+    """
+    created_at, pk = columns
+    if forward:
+        return or_(created_at < values[0], and_(created_at == values[0], pk < values[1]))
+    return or_(created_at > values[0], and_(created_at == values[0], pk > values[1]))
+
+
+def _keyset(stmt, columns, cursor, limit):
+    """
+    在 stmt 上加游标条件、排序与 LIMIT，返回 (语句, 游标取值, 方向)
+    """
+    values, direction = _decode(cursor, 2)
+    if values is not None:
+        try:
+            values = [datetime.datetime.fromisoformat(values[0]), int(values[1])]
+        except (TypeError, ValueError):
+            values, direction = None, 'n'
+
+    if direction == 'n':
+        if values is not None:
+            stmt = stmt.where(_seek(columns, values, forward=True))
+        stmt = stmt.order_by(columns[0].desc(), columns[1].desc())
+    else:
+        stmt = stmt.where(_seek(columns, values, forward=False))
+        stmt = stmt.order_by(columns[0].asc(), columns[1].asc())
+    return stmt.limit(limit + 1), values, direction
+
+
+def _finish(rows, values, direction, limit, key):
+    """
+    返回 (本页行, 下一页游标, 上一页游标)；key(row) 取出 [created_at, id]
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'n':
+        has_next, has_prev = has_more, values is not None
+    else:
+        rows = rows[::-1]
+        has_next, has_prev = True, has_more
+    next_cursor = encode_cursor(key(rows[-1]), 'n') if rows and has_next else None
+    prev_cursor = encode_cursor(key(rows[0]), 'p') if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+def _json_response(request, data, max_age):
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={max_age}'}
+
+    if_none_match = request.headers.get('if-none-match', '')
+    tags = {t.strip().removeprefix('W/') for t in if_none_match.split(',')}
+    if etag in tags or '*' in tags:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+def create_app(db=None, media_url=None, max_age=None):
+    """
+    db：Django 格式的数据库配置（缺省从 Django settings 读取）
+    """
+    database = Database(db)
+    if media_url is None:
+        from django.conf import settings
+        media_url = settings.MEDIA_URL
+    if max_age is None:
+        max_age = int(os.environ.get('CATALOG_API_MAX_AGE', 0))
+
+    def product_row(names, row):
+        data = {}
+        for name, value in zip(names, row):
+            if name == 'price':
+                value = str(value.quantize(Decimal('0.01')))
+            elif name == 'created_at':
+                value = value.isoformat()
+            elif name == 'image':
+                value = f'{media_url}{value}' if value else None
+            data[name] = value
+        return data
+
+    app = FastAPI(title='商品目录 API', docs_url='/api/docs', openapi_url='/api/openapi.json')
+
+    @app.get('/api/products')
+    def product_list(
+        request: Request,
+        cursor: str = '',
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        fields: str = '',
+    ):
+        names = _parse_fields(fields, LIST_FIELDS)
+        # 游标需要排序键，未请求时额外查询
+        columns = names + tuple(k for k in ('created_at', 'id') if k not in names)
+        key_index = (columns.index('created_at'), columns.index('id'))
+        stmt = select(*(PRODUCT_FIELDS[n] for n in columns))
+        stmt, values, direction = _keyset(stmt, (Product.created_at, Product.id), cursor, limit)
+        with database.session() as session:
+            rows = session.execute(stmt).all()
+        rows, next_cursor, prev_cursor = _finish(
+            rows, values, direction, limit, lambda row: [row[i] for i in key_index],
+        )
+        return _json_response(request, {
+            'results': [product_row(names, row[:len(names)]) for row in rows],
+            'next': next_cursor,
+            'previous': prev_cursor,
+        }, max_age)
+
+    @app.get('/api/products/{product_id}')
+    def product_detail(request: Request, product_id: int, fields: str = ''):
+        names = _parse_fields(fields, tuple(PRODUCT_FIELDS))
+        stmt = select(*(PRODUCT_FIELDS[n] for n in names)).where(Product.id == product_id)
+        with database.session() as session:
+            row = session.execute(stmt).first()
+        if row is None:
+            raise HTTPException(404, '商品不存在')
+        return _json_response(request, product_row(names, row), max_age)
+
+    @app.get('/api/products/{product_id}/comments')
+    def product_comments(
+        request: Request,
+        product_id: int,
+        cursor: str = '',
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    ):
+        keys = (ProductComment.created_at, ProductComment.id)
+        stmt = (
+            select(User.username, ProductComment.content, *keys)
+            .select_from(ProductComment)
+            .outerjoin(User, User.id == ProductComment.user_id)
+            .where(ProductComment.product_id == product_id)
+        )
+        stmt, values, direction = _keyset(stmt, keys, cursor, limit)
+        with database.session() as session:
+            if session.execute(select(Product.id).where(Product.id == product_id)).first() is None:
+                raise HTTPException(404, '商品不存在')
+            rows = session.execute(stmt).all()
+        rows, next_cursor, prev_cursor = _finish(
+            rows, values, direction, limit, lambda row: [row[2], row[3]],
+        )
+        return _json_response(request, {
+            'results': [
+                {'id': pk, 'user': username, 'content': content, 'created_at': created_at.isoformat()}
+                for username, content, created_at, pk in rows
+            ],
+            'next': next_cursor,
+            'previous': prev_cursor,
+        }, max_age)
+
+    return app
+
+
+def __getattr__(name):
+    # uvicorn catalog_api.app:app —— 首次访问时才读取配置并创建引擎
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(name)
@@ -0,0 +1,66 @@
+"""
+数据库连接：由 Django 的 DATABASES 配置生成 SQLAlchemy 引擎
+- SQLite 以只读模式打开（本服务不写库）
+"""
+import os
+import pathlib
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+from sqlmodel import Session
+
+_DIALECTS = {
+    'django.db.backends.sqlite3': 'sqlite',
+    'django.db.backends.postgresql': 'postgresql',
+    'django.db.backends.mysql': 'mysql',
+}
+
+
+def django_database(alias=None):
+    """
+    读取 Django 数据库配置（只加载 settings，不初始化 Django 应用）
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shop.settings')
+    from django.conf import settings
+
+    alias = alias or os.environ.get('CATALOG_API_DB_ALIAS', 'default')
+    return settings.DATABASES[alias]
+
+
+def engine_for(db):
+    """
+    db 为 Django 格式的数据库配置 dict
+    """
+    dialect = _DIALECTS.get(db['ENGINE'])
+    if dialect is None:
+        raise ValueError(f'不支持的数据库后端：{db["ENGINE"]}')
+
+    if dialect == 'sqlite':
+        path = pathlib.Path(db['NAME']).resolve()
+        return create_engine(
+            f'sqlite:///file:{path}?mode=ro&uri=true',
+            connect_args={'check_same_thread': False, 'timeout': db.get('OPTIONS', {}).get('timeout', 5)},
+        )
+
+    url = URL.create(
+        dialect,
+        username=db.get('USER') or None,
+        password=db.get('PASSWORD') or None,
+        host=db.get('HOST') or None,
+        port=int(db['PORT']) if db.get('PORT') else None,
+        database=db['NAME'],
+    )
+    return create_engine(url, pool_size=10, max_overflow=20, pool_pre_ping=True)
+
+
+class Database:
+    def __init__(self, db=None):
+        self.settings = db or django_database()
+        self.engine = engine_for(self.settings)
+
+    @property
+    def vendor(self):
+        return _DIALECTS[self.settings['ENGINE']]
+
+    def session(self):
+        return Session(self.engine)
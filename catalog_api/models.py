@@ -0,0 +1,86 @@
+"""
+Django 表的只读映射（表结构以 store/models.py 与迁移为准，这里不建表）
+"""
+import datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Float, Numeric, String
+from sqlalchemy.types import TypeDecorator
+from sqlmodel import Field, SQLModel
+
+
+class _SQLiteDateTime(TypeDecorator):
+    """
+    按 Django 在 SQLite 中的存储格式读写时间（'YYYY-MM-DD HH:MM:SS[.ffffff]'）
+    - SQLAlchemy 默认总是写出 6 位微秒，游标比较「created_at = ?」时与 Django 写入的值不一致
+    """
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return str(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return datetime.datetime.fromisoformat(value)
+
+
+class _SQLiteDecimal(TypeDecorator):
+    """
+    SQLite 没有定点数类型，按 Django 的方式由浮点值转换并保留两位小数
+    """
+    impl = Float
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else float(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(repr(float(value))).quantize(Decimal('0.01'))
+
+
+def _datetime_column():
+    return Column(DateTime().with_variant(_SQLiteDateTime(), 'sqlite'), nullable=False)
+
+
+def _price_column():
+    return Column(Numeric(10, 2).with_variant(_SQLiteDecimal(), 'sqlite'), nullable=False)
+
+
+class User(SQLModel, table=True):
+    __tablename__ = 'auth_user'
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    username: str
+
+
+class Product(SQLModel, table=True):
+    __tablename__ = 'store_product'
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    sku: Optional[str] = None
+    name: str
+    description: str = ''
+    price: Decimal = Field(sa_column=_price_column())
+    stock: int = 0
+    image: Optional[str] = None
+    comment_count: int = 0
+    created_at: datetime.datetime = Field(sa_column=_datetime_column())
+
+
+class ProductComment(SQLModel, table=True):
+    __tablename__ = 'store_productcomment'
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key='store_product.id')
+    user_id: Optional[int] = Field(default=None, foreign_key='auth_user.id')
+    content: str
+    created_at: datetime.datetime = Field(sa_column=_datetime_column())
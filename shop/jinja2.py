@@ -0,0 +1,70 @@
+"""
+Jinja2 模板环境（settings.JINJA2_TEMPLATES 开启时使用，模板位于项目根目录 jinja2/）
+
+- 与 Django 模板保持一致的全局函数 / 过滤器：url()、static()、localize
+- {% cache 超时, '片段名', 变量... %} ... {% endcache %} 片段缓存，
+  键的计算方式与 Django 的 {% cache %} 标签相同（版本号等变量变化即失效）
+- 模板编译结果由 Jinja2 缓存在内存中（auto_reload 仅在 DEBUG 时开启）
+"""
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import formats
+from django.utils.timezone import template_localtime
+from jinja2 import Environment, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def localize(value):
+    """
+    按当前语言格式化日期、时间、数字（与 Django 模板直接输出变量时一致）
+    """
+    return formats.localize(template_localtime(value))
+
+
+def _fragment_cache():
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+class FragmentCacheExtension(Extension):
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_render', [nodes.List(args)]), [], [], body,
+        ).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        timeout, name, *vary_on = args
+        cache = _fragment_cache()
+        # 片段名加前缀，与 Django 模板的同名片段分开缓存
+        key = make_template_fragment_key(f'jinja2:{name}', vary_on)
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, str(value), timeout)
+        return Markup(value)
+
+
+def environment(**options):
+    options.setdefault('auto_reload', settings.DEBUG)
+    options['extensions'] = [*options.get('extensions', ()), FragmentCacheExtension]
+    env = Environment(**options)
+    env.globals.update(url=url, static=static)
+    env.filters['localize'] = localize
+    return env
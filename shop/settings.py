@@ -18,6 +18,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'store.profiling.ProfilingMiddleware',
+    'store.routers.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,6 +46,21 @@ TEMPLATES = [
     },
 ]
 
+# Jinja2 渲染热点页面（商品列表、我的订单、后台订单列表）：SHOP_JINJA2_TEMPLATES=1 开启
+# Jinja2 引擎排在前面，只在 jinja2/ 目录中查找；其余页面找不到时仍由 Django 模板渲染
+JINJA2_TEMPLATES = os.environ.get('SHOP_JINJA2_TEMPLATES') == '1'
+JINJA2_BACKEND = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'DIRS': [BASE_DIR / 'jinja2'],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'environment': 'shop.jinja2.environment',
+        'context_processors': TEMPLATES[0]['OPTIONS']['context_processors'],
+    },
+}
+if JINJA2_TEMPLATES:
+    TEMPLATES.insert(0, JINJA2_BACKEND)
+
 WSGI_APPLICATION = 'shop.wsgi.application'
 ASGI_APPLICATION = 'shop.asgi.application'
 
@@ -54,6 +71,59 @@ DATABASES = {
     }
 }
 
+# 只读副本（读写分离，见 store/routers.py）
+# 本地测试：SHOP_REPLICA_DBS=db-replica.sqlite3（逗号分隔多个 SQLite 文件），
+# 用 manage.py sync_sqlite_replicas 从主库复制数据；其他数据库直接在 DATABASES 中配置副本别名
+DATABASE_REPLICAS = []
+for _i, _path in enumerate(p for p in os.environ.get('SHOP_REPLICA_DBS', '').split(',') if p):
+    _alias = f'replica{_i + 1}'
+    DATABASES[_alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / _path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(_alias)
+DATABASE_ROUTERS = ['store.routers.ReplicaRouter']
+# 用户写操作之后多少秒内读主库（读己之写）
+REPLICA_STICKY_SECONDS = 5
+
+# 性能采样：生产环境只抽样少量请求，开销控制在几个百分点以内
+PROFILING_SAMPLE_RATE = 1.0 if DEBUG else 0.02
+PROFILING_TRACEMALLOC = True
+
+# 缓存：商品目录页面片段等
+# 多进程部署时请改用 FileBasedCache / Redis，使失效在各进程间共享
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shop-default',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# 邮箱验证码存储（store.verification）：'lru' 为进程内存储，仅适合单进程部署；
+# 'cache' 使用 VERIFICATION_CACHE_ALIAS 指定的缓存，多进程部署时需为 Redis / Memcached 等共享缓存
+VERIFICATION_STORE = 'cache'
+VERIFICATION_CACHE_ALIAS = 'default'
+VERIFICATION_CODE_TTL = 60
+# 令牌桶 (容量, 补满所需秒数)：每个邮箱 60 秒 1 次，每个 IP 10 分钟 10 次
+VERIFICATION_EMAIL_RATE = (1, 60)
+VERIFICATION_IP_RATE = (10, 600)
+
+# 库存 / 订单状态实时推送（store.live，manage.py live_hub）
+# Django 进程把变更通知发到本机推送进程的 UDP 地址；设为 None 关闭
+LIVE_EVENTS_ADDR = ('127.0.0.1', 8765)
+# 推送进程合并变更的间隔（秒）
+LIVE_FLUSH_INTERVAL = 0.25
+# 页面连接的 WebSocket 地址，例如 ws://localhost:8002/ws/live；为空时页面不建立连接
+LIVE_WS_URL = os.environ.get('SHOP_LIVE_WS_URL', '')
+
+# 搜索框联想（store.suggest）：每个进程在内存中维护商品名称前缀索引
+# 最多收录的商品数（销量优先），限制每个进程的索引内存（约 270 字节 / 商品）；None 表示不限
+SUGGEST_MAX_PRODUCTS = 200_000
+# 全量重建间隔（秒），用于同步其他进程对商品的修改；0 表示只做本进程的增量更新
+SUGGEST_REFRESH_INTERVAL = 600
+
 AUTH_PASSWORD_VALIDATORS = []  # course convenience
 
 LOGIN_URL = '/login/'
@@ -69,6 +139,9 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 商品图片衍生图生成进程数
+IMAGE_WORKERS = 2
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ========= Email Settings for QQ ========
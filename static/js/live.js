@@ -0,0 +1,45 @@
+// 库存 / 订单状态实时推送（服务端见 store/live.py）
+// 页面中 data-live-stock="商品 id" 的元素显示库存，data-live-order="订单 id" 的元素显示订单状态
+(function () {
+  var script = document.currentScript;
+  var url = script && script.dataset.url;
+  if (!url || !window.WebSocket) return;
+
+  var retry = 1000;
+
+  function productIds() {
+    var ids = [];
+    document.querySelectorAll('[data-live-stock]').forEach(function (el) {
+      ids.push(el.dataset.liveStock);
+    });
+    return ids;
+  }
+
+  function apply(msg) {
+    if (msg.type === 'stock') {
+      document.querySelectorAll('[data-live-stock="' + msg.product + '"]').forEach(function (el) {
+        el.textContent = msg.stock;
+      });
+    } else if (msg.type === 'order') {
+      document.querySelectorAll('[data-live-order="' + msg.order + '"]').forEach(function (el) {
+        el.textContent = msg.status;
+      });
+    }
+  }
+
+  function connect() {
+    var ids = productIds();
+    var ws = new WebSocket(url + (ids.length ? '?products=' + ids.join(',') : ''));
+    ws.onopen = function () { retry = 1000; };
+    ws.onmessage = function (e) {
+      try { apply(JSON.parse(e.data)); } catch (err) { /* 忽略非法消息 */ }
+    };
+    ws.onclose = function () {
+      // 断线重连，间隔逐次加倍，最长 30 秒
+      setTimeout(connect, retry);
+      retry = Math.min(retry * 2, 30000);
+    };
+  }
+
+  connect();
+})();
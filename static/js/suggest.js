@@ -0,0 +1,44 @@
+// 搜索框联想（服务端见 store/suggest.py）
+// 带 data-suggest-url 的输入框：输入时请求联想结果，显示在输入框下方，点击直接进入商品详情
+(function () {
+  document.querySelectorAll('input[data-suggest-url]').forEach(function (input) {
+    var url = input.dataset.suggestUrl;
+    var menu = document.createElement('div');
+    menu.className = 'list-group position-absolute w-100 shadow-sm d-none';
+    menu.style.zIndex = 1000;
+    input.parentNode.appendChild(menu);
+
+    var timer = null;
+    var seq = 0;
+
+    function hide() { menu.classList.add('d-none'); }
+
+    function show(results) {
+      menu.innerHTML = '';
+      results.forEach(function (r) {
+        var a = document.createElement('a');
+        a.className = 'list-group-item list-group-item-action';
+        a.href = r.url;
+        a.textContent = r.name;
+        menu.appendChild(a);
+      });
+      menu.classList.toggle('d-none', !results.length);
+    }
+
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      var q = input.value.trim();
+      if (!q) { hide(); return; }
+      // 停止输入 100 毫秒后再请求；只采用最后一次请求的结果
+      timer = setTimeout(function () {
+        var current = ++seq;
+        fetch(url + '?q=' + encodeURIComponent(q))
+          .then(function (r) { return r.json(); })
+          .then(function (data) { if (current === seq) show(data.results); })
+          .catch(hide);
+      }, 100);
+    });
+    input.addEventListener('keydown', function (e) { if (e.key === 'Escape') hide(); });
+    input.addEventListener('blur', function () { setTimeout(hide, 200); });
+  });
+})();
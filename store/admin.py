@@ -1,10 +1,19 @@
-from django.contrib import admin
-from .models import Product, CartItem, Order, OrderItem, ProductComment
+from django.contrib import admin, messages
+from .models import Product, CartItem, Order, OrderItem, ProductComment, OutboundEmail
+from . import inventory, live, orders, rollup
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'stock', 'created_at')
-    search_fields = ('name',)
+    list_display = ('name', 'sku', 'price', 'stock', 'created_at')
+    search_fields = ('name', 'sku')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # 修改库存：分片商品重新分配到各分片，并通知实时推送
+        if change and 'stock' in form.changed_data:
+            if obj.stock_shard_count:
+                inventory.set_stock(obj, obj.stock)
+            live.stock_changed([obj.pk])
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
@@ -14,11 +23,58 @@ class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
 
+def _transition_action(status, notify=False):
+    """
+    生成批量修改订单状态的后台动作（一条 UPDATE，见 store.orders.bulk_transition）
+    """
+    label = orders.STATUS_LABELS[status]
+
+    def action(modeladmin, request, queryset):
+        result = orders.bulk_transition(queryset.values_list('pk', flat=True), status, notify=notify)
+        if result.updated:
+            modeladmin.message_user(request, f'已将 {len(result.updated)} 个订单改为{label}。')
+        if result.failed:
+            shown = '；'.join(f'#{pk} {reason}' for pk, reason in sorted(result.failed.items())[:20])
+            modeladmin.message_user(
+                request, f'{len(result.failed)} 个订单未更新：{shown}', level=messages.WARNING,
+            )
+
+    action.__name__ = f'mark_{status}' + ('_notify' if notify else '')
+    action.short_description = f'标记为{label}' + ('并邮件通知' if notify else '')
+    return action
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'total_amount', 'status', 'created_at')
+    list_filter = ('status', 'created_at')
     inlines = [OrderItemInline]
+    actions = [
+        _transition_action('paid'),
+        _transition_action('shipped'),
+        _transition_action('shipped', notify=True),
+        _transition_action('delivered'),
+        _transition_action('cancelled'),
+        _transition_action('cancelled', notify=True),
+    ]
+
+    def get_readonly_fields(self, request, obj=None):
+        # 已有订单的状态只能经由上面的批量操作（orders.bulk_transition）修改，
+        # 以保证迁移合法并同步销售汇总与实时推送
+        readonly = super().get_readonly_fields(request, obj)
+        return readonly if obj is None else (*readonly, 'status')
+
+    def save_related(self, request, form, formsets, change):
+        # 订单项保存之后再同步销售汇总表
+        super().save_related(request, form, formsets, change)
+        if not change:
+            rollup.record_order(form.instance)
 
 @admin.register(ProductComment)
 class ProductCommentAdmin(admin.ModelAdmin):
     list_display = ('product', 'user', 'content', 'created_at')
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
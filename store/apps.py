@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        # 注册信号处理器
+        from . import signals  # noqa: F401
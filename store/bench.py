@@ -0,0 +1,237 @@
+"""
+基准测试公共工具
+- 供 store/management/commands/bench_* 命令复用
+"""
+import asyncio
+import contextlib
+import json
+import math
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+
+def percentile(values, p):
+    """
+    最近秩法百分位数，values 为空时返回 0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[k]
+
+
+def summarize(values):
+    """
+    汇总一组耗时（毫秒）
+    """
+    return {
+        'n': len(values),
+        'mean': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'max': round(max(values), 3) if values else 0.0,
+    }
+
+
+def timed(fn, *args, **kwargs):
+    """
+    执行 fn 并返回 (结果, 耗时毫秒)
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def write_report(report, output=None, stdout=None):
+    """
+    以 JSON 输出报告：写入文件或打印到命令行
+    """
+    text = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    elif stdout is not None:
+        stdout.write(text)
+    return text
+
+
+@contextlib.contextmanager
+def temporary_database(verbosity=0):
+    """
+    创建并迁移一个临时测试库，退出时销毁，避免压测数据污染正式库
+    - SQLite 使用临时文件（多线程可共享），并放宽锁等待超时
+    """
+    from django.db import connection
+
+    settings_dict = connection.settings_dict
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        tmpdir = tempfile.mkdtemp(prefix='shop-bench-')
+        settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+        settings_dict.setdefault('OPTIONS', {})['timeout'] = 30
+
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False,
+    )
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def seed_dataset(products=200, users=20, stock=50, seed=42):
+    """
+    生成压测数据：users 个普通用户、products 个商品（均已建立搜索索引）
+    - 返回 (用户列表, 商品列表)
+    """
+    import random
+
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    from . import search
+    from .models import Product
+
+    rng = random.Random(seed)
+    password = make_password('bench-pass')
+    User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password)
+        for i in range(users)
+    ], batch_size=1000)
+    Product.objects.bulk_create([
+        Product(
+            name=f'压测商品 {i}',
+            description=f'benchmark product {i} 用于压力测试',
+            price=rng.randint(1, 500),
+            stock=stock,
+        )
+        for i in range(products)
+    ], batch_size=1000)
+
+    user_list = list(User.objects.filter(username__startswith='bench').order_by('id'))
+    product_list = list(Product.objects.order_by('id'))
+    search.index_products(product_list)
+    return user_list, product_list
+
+
+# ----------------------
+# HTTP 压测
+# ----------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_django_wsgi(port):
+    """
+    在后台线程中启动多线程 WSGI 服务器，返回停止函数
+    """
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', port), QuietHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.shutdown
+
+
+def start_uvicorn(app, port):
+    """
+    在后台线程中启动 uvicorn（单进程），返回停止函数
+    """
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(
+        app, host='127.0.0.1', port=port,
+        lifespan='off', log_level='warning', access_log=False,
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return stop
+
+
+def start_django_asgi(port):
+    from django.core.asgi import get_asgi_application
+
+    return start_uvicorn(get_asgi_application(), port)
+
+
+async def _read_response(reader):
+    """
+    读取一个 HTTP/1.1 响应，返回 (状态码, 是否需要关闭连接)
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, True
+    return status, headers.get('connection', '').lower() == 'close'
+
+
+async def http_load(port, requests, concurrency):
+    """
+    concurrency 个长连接并发发送 GET 请求，requests 为 (名称, 路径) 序列，
+    返回 {名称: [(耗时毫秒, 是否成功)]}
+    """
+    results = {}
+    queue = iter(requests)
+
+    async def worker():
+        reader = writer = None
+        for name, path in queue:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            start = time.perf_counter()
+            try:
+                writer.write(
+                    f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: keep-alive\r\n\r\n'.encode()
+                )
+                await writer.drain()
+                status, close = await _read_response(reader)
+                ok = status < 500
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                ok, close = False, True
+            results.setdefault(name, []).append(((time.perf_counter() - start) * 1000, ok))
+            if close:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
@@ -0,0 +1,83 @@
+"""
+商品目录缓存
+
+- 模板片段（{% cache %}）的键中带有版本号，商品 / 评论保存或删除时递增版本号，
+  旧片段随之失效，无需逐个删除缓存键
+- catalog_version：任一商品变化即递增，用于列表页
+- product_version：单个商品或其评论变化时递增，用于详情页
+- acatalog_version / aproduct_version 供异步视图使用
+"""
+import time
+
+from django.core.cache import cache
+
+# 片段缓存时长（秒），模板中的 {% cache %} 使用
+FRAGMENT_TIMEOUT = 600
+# 依赖库存 / 销量的片段（不随版本号失效）的缓存时长
+VOLATILE_FRAGMENT_TIMEOUT = 30
+
+CATALOG_VERSION_KEY = 'store:catalog:version'
+
+
+def _product_key(pk):
+    return f'store:product:{pk}:version'
+
+
+def _fresh_version():
+    # 版本键被淘汰后不能从 1 重新计数，否则可能命中旧片段；改用时间戳初始化
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _fresh_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def catalog_version():
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def product_version(pk):
+    return _get_version(_product_key(pk))
+
+
+async def acatalog_version():
+    return await _aget_version(CATALOG_VERSION_KEY)
+
+
+async def aproduct_version(pk):
+    return await _aget_version(_product_key(pk))
+
+
+def invalidate_catalog():
+    """
+    使列表页缓存片段失效（批量导入等不经过模型信号的写入后调用）
+    """
+    _bump(CATALOG_VERSION_KEY)
+
+
+def invalidate_product(pk, catalog=True):
+    """
+    使单个商品（及列表页）的缓存片段失效
+    """
+    _bump(_product_key(pk))
+    if catalog:
+        _bump(CATALOG_VERSION_KEY)
@@ -0,0 +1,223 @@
+"""
+商品批量导入 / 导出（以 SKU 为唯一键）
+
+- 读取：CSV（带表头）或 JSON Lines，按行流式读取，不把整个文件读入内存
+- 导入分两遍：第一遍只校验（记录错误行），第二遍按批 upsert：
+  每批一条 bulk_create(update_conflicts=True)（INSERT ... ON CONFLICT (sku) DO UPDATE），
+  每批一个事务
+- 批量写入不会触发模型信号，由导入流程自行重建搜索索引、调整分片库存、使缓存失效并通知实时推送
+- 图片在进程池中并行复制与生成衍生图（store.images.import_image）
+"""
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import caching, inventory, live, search, suggest
+from .models import Product
+
+FORMATS = ('csv', 'jsonl')
+# 导入 / 导出的字段，image 为相对 image_root（导出时为相对 MEDIA_ROOT）的路径
+FIELDS = ('sku', 'name', 'description', 'price', 'stock', 'image')
+UPDATE_FIELDS = ('name', 'description', 'price', 'stock')
+
+BATCH_SIZE = 1000
+
+
+class RowError(ValueError):
+    def __init__(self, line, message):
+        self.line = line
+        super().__init__(f'第 {line} 行：{message}')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(path, fmt):
+    """
+    逐行读取，生成 (行号, dict)；JSON 解析失败的行生成 (行号, None)
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            # 表头占第 1 行
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, row
+        else:
+            for line, text in enumerate(f, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except json.JSONDecodeError:
+                    row = None
+                yield line, row if isinstance(row, dict) else None
+
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def clean_row(line, row, image_root=None):
+    """
+    校验并转换一行，返回 dict；非法时抛出 RowError
+    """
+    if row is None:
+        raise RowError(line, '无法解析')
+
+    sku = _text(row, 'sku')
+    if not sku:
+        raise RowError(line, '缺少 sku')
+    if len(sku) > Product._meta.get_field('sku').max_length:
+        raise RowError(line, 'sku 过长')
+
+    name = _text(row, 'name')
+    if not name:
+        raise RowError(line, '缺少 name')
+    if len(name) > Product._meta.get_field('name').max_length:
+        raise RowError(line, 'name 过长')
+
+    try:
+        price = Decimal(_text(row, 'price') or '0').quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(line, 'price 不是合法金额')
+    if price < 0 or price >= Decimal('1e8'):
+        raise RowError(line, 'price 超出范围')
+
+    try:
+        stock = int(_text(row, 'stock') or 0)
+    except ValueError:
+        raise RowError(line, 'stock 不是整数')
+    if stock < 0:
+        raise RowError(line, 'stock 不能为负数')
+
+    image = _text(row, 'image')
+    if image:
+        if image_root is None:
+            image = ''
+        else:
+            image = os.path.join(image_root, image)
+            if not os.path.isfile(image):
+                raise RowError(line, f'图片不存在：{image}')
+
+    return {
+        'sku': sku,
+        'name': name,
+        'description': _text(row, 'description'),
+        'price': price,
+        'stock': stock,
+        'image': image,
+    }
+
+
+def validate(rows, image_root=None, max_errors=None):
+    """
+    校验遍：返回 (有效行数, 错误列表)；文件内重复的 SKU 也视为错误
+    """
+    seen = set()
+    valid = 0
+    errors = []
+    for line, row in rows:
+        try:
+            data = clean_row(line, row, image_root)
+            if data['sku'] in seen:
+                raise RowError(line, f'sku 重复：{data["sku"]}')
+            seen.add(data['sku'])
+            valid += 1
+        except RowError as e:
+            errors.append(e)
+            if max_errors and len(errors) >= max_errors:
+                break
+    return valid, errors
+
+
+def upsert_batch(batch):
+    """
+    写入一批已校验的行，返回 (新建数, 更新数, {sku: 商品 id})
+    """
+    skus = [data['sku'] for data in batch]
+    existing = {
+        sku: (pk, shards)
+        for sku, pk, shards in Product.objects.filter(sku__in=skus)
+        .values_list('sku', 'id', 'stock_shard_count')
+    }
+
+    products = [
+        Product(sku=data['sku'], **{f: data[f] for f in UPDATE_FIELDS})
+        for data in batch
+    ]
+
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=UPDATE_FIELDS,
+        )
+        ids = dict(Product.objects.filter(sku__in=skus).values_list('sku', 'id'))
+        for product in products:
+            product.pk = ids[product.sku]
+            # 分片商品：导入值为新的总库存
+            if product.sku in existing and existing[product.sku][1]:
+                product.stock_shard_count = existing[product.sku][1]
+                inventory.set_stock(product, product.stock)
+        search.index_products(products)
+        live.stock_changed(ids.values())
+        names = [(product.pk, product.name) for product in products]
+        transaction.on_commit(lambda: suggest.products_changed(names))
+
+    for sku, (pk, _) in existing.items():
+        caching.invalidate_product(pk, catalog=False)
+    return len(products) - len(existing), len(existing), ids
+
+
+def apply_images(results):
+    """
+    results：[(商品 id, 存储文件名, 内容哈希, 宽度列表)]，批量写回图片字段
+    """
+    products = [
+        Product(
+            pk=pk, image=name,
+            image_variants={'source': name, 'hash': digest, 'widths': widths},
+        )
+        for pk, name, digest, widths in results
+    ]
+    Product.objects.bulk_update(products, ['image', 'image_variants'], batch_size=BATCH_SIZE)
+    for product in products:
+        caching.invalidate_product(product.pk, catalog=False)
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """
+    逐行生成导出用 dict（按 id 顺序）
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    for row in queryset.order_by('id').values(*FIELDS).iterator(chunk_size=chunk_size):
+        row['price'] = str(row['price'])
+        row['sku'] = row['sku'] or ''
+        row['image'] = row['image'] or ''
+        yield row
+
+
+def write_rows(rows, f, fmt):
+    """
+    写入 CSV / JSON Lines，返回行数
+    """
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            count += 1
+    return count
@@ -0,0 +1,146 @@
+"""
+订单结算引擎（集合式写入）
+
+- 扣库存：一条带条件的 UPDATE
+    UPDATE store_product SET stock = CASE id WHEN .. THEN stock - n .. END
+    WHERE (id = .. AND stock >= n) OR ...
+  根据受影响行数判断是否超卖，不足则整体回滚
+- 开启库存分片的热门商品改为扣减随机分片（store.inventory），不再争用商品行
+- 订单项：bulk_create 一次插入；单价与总额按扣库存之后、同一事务内读到的价格计算，
+  不使用事务开始前读取的购物车行（其间商品可能已改价）
+- 语句数量与购物车行数无关，行锁持有时间最短
+- 销售汇总只在事务内追加一行 SalesDelta（store.rollup），不更新汇总行
+- 提交后通知实时推送进程（store.live）库存已变化
+"""
+import uuid
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+
+from .models import CartItem, Order, OrderItem, Product
+from . import inventory, live, rollup
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    """
+    库存不足：product 为缺货商品，available 为当前库存
+    """
+
+    def __init__(self, product, available):
+        self.product = product
+        self.available = available
+        super().__init__(f'{product.name} 库存不足，当前库存：{available}')
+
+
+class _StockShortage(Exception):
+    pass
+
+
+def _decrement_stock(quantities, products):
+    """
+    扣减所有商品库存；存在库存不足的商品时抛出 _StockShortage
+    - 普通商品：一条 UPDATE
+    - 分片商品：各自在随机分片上扣减（见 store.inventory）
+    """
+    plain = {pid: n for pid, n in quantities.items() if not products[pid].stock_shard_count}
+    sharded = {pid: n for pid, n in quantities.items() if products[pid].stock_shard_count}
+
+    if plain:
+        guard = reduce(or_, (Q(pk=pid, stock__gte=n) for pid, n in plain.items()))
+        updated = Product.objects.filter(guard).update(
+            stock=Case(
+                *(When(pk=pid, then=F('stock') - n) for pid, n in plain.items()),
+                default=F('stock'),
+                output_field=PositiveIntegerField(),
+            )
+        )
+        if updated != len(plain):
+            raise _StockShortage
+
+    for pid, n in sharded.items():
+        if not inventory.take(pid, n, products[pid].stock_shard_count):
+            raise _StockShortage
+
+
+def _find_shortage(quantities, products):
+    """
+    回滚后定位第一个库存不足的商品（仅在失败路径上执行）
+    """
+    stock = inventory.available(list(quantities))
+    for pid, n in quantities.items():
+        available = stock.get(pid, 0)
+        if available < n:
+            return products[pid], available
+    # 并发下库存已被补回，按第一个商品提示
+    pid = next(iter(quantities))
+    return products[pid], stock.get(pid, 0)
+
+
+def place_order(user, address, items=None):
+    """
+    将用户购物车转换为已支付订单
+    - items 为 select_related('product') 取出的购物车行，缺省时自动查询；
+      其中的商品只用于判断是否分片与缺货提示，价格在事务内重新读取
+    - 成功返回 Order；库存不足抛出 OutOfStock，购物车为空抛出 EmptyCart
+    """
+    if items is None:
+        items = list(CartItem.objects.filter(user=user).select_related('product'))
+    if not items:
+        raise EmptyCart('购物车为空')
+
+    quantities = defaultdict(int)
+    products = {}
+    for it in items:
+        quantities[it.product_id] += it.quantity
+        products[it.product_id] = it.product
+
+    try:
+        with transaction.atomic():
+            _decrement_stock(quantities, products)
+
+            # 普通商品的行已被上面的 UPDATE 锁住，价格在提交前不会再变
+            current = {
+                pk: (price, name)
+                for pk, price, name in Product.objects.filter(pk__in=quantities)
+                .values_list('pk', 'price', 'name')
+            }
+            total = sum(current[it.product_id][0] * it.quantity for it in items)
+
+            order = Order.objects.create(
+                user=user,
+                total_amount=total,
+                address=address,
+                status='paid',
+                confirm_code=uuid.uuid4().hex,
+            )
+
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product_id=it.product_id,
+                    product_name=current[it.product_id][1],
+                    quantity=it.quantity,
+                    unit_price=current[it.product_id][0],
+                )
+                for it in items
+            ])
+
+            CartItem.objects.filter(id__in=[it.id for it in items]).delete()
+            # 只追加一行待合并记录，不更新当天汇总行与商品销量（由 fold_sales_rollup 批量合并）
+            rollup.record_order(order)
+            live.stock_changed(quantities)
+    except _StockShortage:
+        raise OutOfStock(*_find_shortage(quantities, products))
+
+    return order
@@ -0,0 +1,164 @@
+"""
+商品列表筛选与排序（分面）
+
+- 筛选：价格区间（price=50-100）、仅看有货（in_stock=1）
+- 排序：sort=newest / price / -price / sales，每种排序都有对应的 (键, id) 索引，
+  配合游标分页，翻到第几页都只扫描 per_page + 1 行
+- 分面计数：每个选项旁显示「选中它之后的结果数」，计算时套用其他分面的条件、
+  不套用本分面的条件；所有计数与当前结果总数用一条 COUNT(... FILTER ...) 聚合查询取出，
+  无关键词时走 (stock, price) 覆盖索引，不回表
+- 分片商品的 Product.stock 为定期汇总值（见 store.inventory），「仅看有货」按分片实际库存判断
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q
+from django.http import QueryDict
+
+from . import inventory
+
+# (参数值, 显示名称, 下限（含）, 上限（不含）)
+PRICE_RANGES = [
+    ('0-50', '50 元以下', None, Decimal('50')),
+    ('50-100', '50 - 100 元', Decimal('50'), Decimal('100')),
+    ('100-200', '100 - 200 元', Decimal('100'), Decimal('200')),
+    ('200-500', '200 - 500 元', Decimal('200'), Decimal('500')),
+    ('500-', '500 元以上', Decimal('500'), None),
+]
+
+# 参数值 → (显示名称, 游标分页排序键)；排序键与 Product.Meta.indexes 对应
+SORTS = {
+    'newest': ('最新上架', ('-created_at', '-id')),
+    'price': ('价格从低到高', ('price', 'id')),
+    '-price': ('价格从高到低', ('-price', '-id')),
+    'sales': ('销量最高', ('-sales_count', '-id')),
+}
+
+_RANGES = {key: (low, high) for key, _, low, high in PRICE_RANGES}
+
+
+def _price_q(key):
+    low, high = _RANGES[key]
+    q = Q()
+    if low is not None:
+        q &= Q(price__gte=low)
+    if high is not None:
+        q &= Q(price__lt=high)
+    return q
+
+
+def _count(condition):
+    # 空条件直接计数，避免生成 CASE WHEN 1=1
+    return Count('pk', filter=condition) if condition else Count('pk')
+
+
+class ProductFilters:
+    """
+    从查询参数解析出的筛选与排序条件；非法取值按未选择处理
+    """
+
+    def __init__(self, price=None, in_stock=False, sort=None, params=None):
+        self.price = price if price in _RANGES else None
+        self.in_stock = bool(in_stock)
+        self.sort = sort if sort in SORTS else None
+        # 其余查询参数（如 q），生成各选项链接时原样保留
+        self.params = params.copy() if params is not None else QueryDict(mutable=True)
+        for name in ('cursor', 'format'):
+            self.params.pop(name, None)
+
+    @classmethod
+    def from_query(cls, params):
+        return cls(
+            price=params.get('price'),
+            in_stock=params.get('in_stock') in ('1', 'true', 'on'),
+            sort=params.get('sort'),
+            params=params,
+        )
+
+    def _query(self, **changes):
+        """
+        修改部分参数后的查询字符串（切换筛选条件后从第一页开始）
+        """
+        params = self.params.copy()
+        for name, value in changes.items():
+            if value:
+                params[name] = value
+            else:
+                params.pop(name, None)
+        return params.urlencode()
+
+    @property
+    def volatile(self):
+        """
+        结果依赖库存 / 销量（变化时不递增目录版本号），列表片段只能短时间缓存
+        """
+        return self.in_stock or self.sort == 'sales'
+
+    def _price_condition(self):
+        return _price_q(self.price) if self.price else Q()
+
+    def _stock_condition(self):
+        return inventory.in_stock_condition() if self.in_stock else Q()
+
+    def apply(self, queryset):
+        return queryset.filter(self._price_condition() & self._stock_condition())
+
+    def ordering(self, default):
+        """
+        未指定排序时使用 default（关键词检索时为相关度排序）
+        """
+        return SORTS[self.sort][1] if self.sort else default
+
+    def aggregates(self):
+        """
+        分面计数的聚合表达式 {名称: Count(..., filter=...)}
+        """
+        price, stock = self._price_condition(), self._stock_condition()
+        aggregates = {
+            'total': _count(price & stock),
+            'price_any': _count(stock),
+            'stock_any': _count(price),
+            'stock_in': _count(price & inventory.in_stock_condition()),
+        }
+        for key, *_ in PRICE_RANGES:
+            aggregates[f'price_{key}'] = _count(_price_q(key) & stock)
+        return aggregates
+
+    def _facets(self, row):
+        def option(name, value, label, count=None, selected=False):
+            return {
+                'value': value, 'label': label, 'count': count, 'selected': selected,
+                'query': self._query(**{name: value}),
+            }
+
+        return {
+            'total': row['total'],
+            'price': [
+                option('price', '', '全部价格', row['price_any'], not self.price),
+                *(
+                    option('price', key, label, row[f'price_{key}'], key == self.price)
+                    for key, label, *_ in PRICE_RANGES
+                ),
+            ],
+            # 「仅看有货」为开关：已选中时链接取消筛选
+            'in_stock': {
+                **option('in_stock', '' if self.in_stock else '1', '仅看有货', row['stock_in'], self.in_stock),
+                'any': row['stock_any'],
+            },
+            'sort': [
+                # 未指定排序：关键词检索按相关度，否则按上架时间
+                option('sort', '', '综合排序', selected=not self.sort),
+                *(
+                    option('sort', key, label, selected=key == self.sort)
+                    for key, (label, _) in SORTS.items()
+                ),
+            ],
+        }
+
+    def facets(self, queryset):
+        """
+        queryset 为未套用本对象筛选条件的商品集合（全部商品或关键词检索结果）
+        """
+        return self._facets(queryset.order_by().aggregate(**self.aggregates()))
+
+    async def afacets(self, queryset):
+        return self._facets(await queryset.order_by().aaggregate(**self.aggregates()))
@@ -35,7 +35,7 @@ class LoginForm(forms.Form):
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price', 'stock', 'image']
+        fields = ['sku', 'name', 'description', 'price', 'stock', 'image']
         widgets = {
             'description': forms.Textarea(attrs={'rows':4}),
         }
@@ -0,0 +1,169 @@
+"""
+商品图片衍生图（缩略图 / 响应式图片）
+
+- 上传原图后，在进程池中按 WIDTHS 生成 WebP 与 JPEG 两种格式，
+  文件名包含原图内容哈希（products/derived/<hash>-<宽度>w.<ext>），可长期缓存
+- 生成结果记录在 Product.image_variants：
+  {'source': 原图文件名, 'hash': 内容哈希, 'widths': [已生成的宽度]}
+- 模板通过 Product.webp_srcset / jpeg_srcset 输出 srcset
+- 批量导入（import_products）通过 import_image 在子进程中复制原图并生成衍生图
+
+注意：进程池中执行的 render_variants 只依赖 Pillow 与文件系统，
+本模块顶层不导入模型，子进程无需初始化 Django。
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 生成的宽度（像素）；不超过原图宽度
+WIDTHS = (320, 640, 1280)
+# (扩展名, Pillow 格式, 保存参数)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+DERIVED_DIR = 'products/derived'
+# 批量导入的原图按内容哈希命名，重复导入同一图片不会产生新文件
+IMPORT_DIR = 'products/imported'
+
+
+def derivative_name(digest, width, ext):
+    return f'{DERIVED_DIR}/{digest}-{width}w.{ext}'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def render_variants(source_path, media_root):
+    """
+    生成全部衍生图（在子进程中执行），返回 (内容哈希, 已生成的宽度列表)
+    - 同一内容的衍生图已存在时直接跳过
+    """
+    from PIL import Image, ImageOps
+
+    digest = file_digest(source_path)
+    os.makedirs(os.path.join(media_root, DERIVED_DIR), exist_ok=True)
+
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+        # 原图比最小宽度还窄时，也按原宽度生成一份
+        widths = [w for w in WIDTHS if w <= img.width] or [img.width]
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = None
+            for ext, fmt, params in FORMATS:
+                target = os.path.join(media_root, derivative_name(digest, width, ext))
+                if os.path.exists(target):
+                    continue
+                if resized is None:
+                    resized = img.resize((width, height), Image.LANCZOS)
+                out = resized.convert('RGB') if fmt == 'JPEG' else resized
+                tmp = f'{target}.{os.getpid()}.tmp'
+                out.save(tmp, fmt, **params)
+                os.replace(tmp, target)
+
+    return digest, widths
+
+
+def import_image(source_path, media_root):
+    """
+    复制外部图片到 MEDIA_ROOT 并生成衍生图（在子进程中执行）
+    返回 (存储文件名, 内容哈希, 已生成的宽度列表)
+    """
+    digest = file_digest(source_path)
+    ext = os.path.splitext(source_path)[1].lower() or '.jpg'
+    name = f'{IMPORT_DIR}/{digest}{ext}'
+    target = os.path.join(media_root, name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f'{target}.{os.getpid()}.tmp'
+        shutil.copyfile(source_path, tmp)
+        os.replace(tmp, target)
+    _, widths = render_variants(target, media_root)
+    return name, digest, widths
+
+
+# ----------------------
+# 进程池（惰性创建）
+# ----------------------
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+            # spawn：子进程不继承父进程的数据库连接与线程
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _executor
+
+
+def needs_variants(product):
+    return bool(product.image) and product.image_variants.get('source') != product.image.name
+
+
+def _source_path(product):
+    try:
+        return product.image.path
+    except NotImplementedError:
+        # 非本地存储（如对象存储）暂不支持
+        return None
+
+
+def save_variants(product_id, source_name, digest, widths):
+    """
+    写回生成结果；若期间商品已换图则丢弃本次结果
+    """
+    from . import caching
+    from .models import Product
+
+    updated = Product.objects.filter(pk=product_id, image=source_name).update(
+        image_variants={'source': source_name, 'hash': digest, 'widths': widths},
+    )
+    if updated:
+        caching.invalidate_product(product_id)
+    return updated
+
+
+def schedule(product):
+    """
+    提交衍生图生成任务，不阻塞当前请求
+    """
+    path = _source_path(product)
+    if path is None:
+        return None
+
+    product_id, source_name = product.pk, product.image.name
+    future = executor().submit(render_variants, path, str(settings.MEDIA_ROOT))
+
+    def done(f):
+        from django.db import connections
+
+        try:
+            digest, widths = f.result()
+            save_variants(product_id, source_name, digest, widths)
+        except Exception:
+            logger.exception('商品 %s 衍生图生成失败', product_id)
+        finally:
+            # 回调运行在进程池的管理线程中，用完即关闭该线程的数据库连接
+            connections.close_all()
+
+    future.add_done_callback(done)
+    return future
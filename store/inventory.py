@@ -0,0 +1,167 @@
+"""
+库存分片（热门商品防止单行锁争用）
+
+- enable_sharding 把商品库存平均拆到 N 个 StockShard 行
+- 结算时随机选择一个分片做带条件的 UPDATE（stock >= n），
+  不同请求大概率落在不同分片上，互不阻塞；单个分片不够时锁定该商品全部分片合并扣减
+- 分片后的 Product.stock 只作列表展示用，由 consolidate（manage.py consolidate_stock）定期汇总；
+  加购、结算前检查与「仅看有货」筛选按分片实际库存判断（available_for / in_stock_condition）
+- 所有扣减都带 stock >= n 条件，任何时刻都不会超卖
+"""
+import random
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockShard
+
+
+def _split(total, shards):
+    base, extra = divmod(total, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def _write_shards(product_id, total, shards):
+    StockShard.objects.filter(product_id=product_id).delete()
+    StockShard.objects.bulk_create([
+        StockShard(product_id=product_id, index=i, stock=s)
+        for i, s in enumerate(_split(total, shards))
+    ])
+
+
+def _rebalance(shards, total):
+    """
+    在已加锁的分片行上原地重新分配库存
+    """
+    for shard, value in zip(shards, _split(total, len(shards))):
+        if shard.stock != value:
+            StockShard.objects.filter(pk=shard.pk).update(stock=value)
+
+
+def available(product_ids):
+    """
+    实际可售库存 {商品 id: 数量}；分片商品取分片之和
+    """
+    rows = Product.objects.filter(pk__in=product_ids).values_list('id', 'stock', 'stock_shard_count')
+    result = {pid: stock for pid, stock, shards in rows if not shards}
+    result.update(_shard_totals([pid for pid, _, shards in rows if shards]))
+    return result
+
+
+def _shard_totals(product_ids):
+    if not product_ids:
+        return {}
+    sums = dict(
+        StockShard.objects.filter(product_id__in=product_ids)
+        .values_list('product_id').annotate(total=Sum('stock'))
+    )
+    return {pid: sums.get(pid, 0) for pid in product_ids}
+
+
+def available_for(products):
+    """
+    已取出的商品的实际可售库存 {商品 id: 数量}：普通商品直接取 stock，只为分片商品查询分片
+    """
+    result = {p.pk: p.stock for p in products if not p.stock_shard_count}
+    result.update(_shard_totals([p.pk for p in products if p.stock_shard_count]))
+    return result
+
+
+def in_stock_condition():
+    """
+    「有货」的筛选条件：普通商品看 stock，分片商品看是否还有未耗尽的分片
+    """
+    return Q(stock__gt=0, stock_shard_count=0) | Q(
+        Exists(StockShard.objects.filter(product=OuterRef('pk'), stock__gt=0)), stock_shard_count__gt=0,
+    )
+
+
+def enable_sharding(product, shards):
+    """
+    将商品库存拆分为 shards 个分片；shards 为 0 时取消分片并把库存合并回 Product.stock
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        total = available([product.pk])[product.pk]
+        if shards > 0:
+            _write_shards(product.pk, total, shards)
+        else:
+            StockShard.objects.filter(product_id=product.pk).delete()
+        Product.objects.filter(pk=product.pk).update(stock=total, stock_shard_count=shards)
+    return total
+
+
+def set_stock(product, total):
+    """
+    管理员设置分片商品的总库存（重新平均分配）
+    """
+    with transaction.atomic():
+        shards = list(
+            StockShard.objects.select_for_update()
+            .filter(product_id=product.pk).order_by('index')
+        )
+        if shards:
+            _rebalance(shards, total)
+        else:
+            _write_shards(product.pk, total, product.stock_shard_count)
+        Product.objects.filter(pk=product.pk).update(stock=total)
+
+
+def take(product_id, quantity, shard_count):
+    """
+    从分片中扣减库存，成功返回 True；库存不足返回 False（调用方负责回滚事务）
+    """
+    start = random.randrange(shard_count)
+    for k in range(shard_count):
+        index = (start + k) % shard_count
+        if StockShard.objects.filter(
+            product_id=product_id, index=index, stock__gte=quantity,
+        ).update(stock=F('stock') - quantity):
+            return True
+
+    # 没有单个分片足够：锁定全部分片，跨分片扣减
+    shards = list(
+        StockShard.objects.select_for_update()
+        .filter(product_id=product_id).order_by('index')
+    )
+    if sum(s.stock for s in shards) < quantity:
+        return False
+    remaining = quantity
+    for shard in shards:
+        if not remaining:
+            break
+        used = min(shard.stock, remaining)
+        if used:
+            StockShard.objects.filter(pk=shard.pk, stock__gte=used).update(stock=F('stock') - used)
+            remaining -= used
+    return True
+
+
+def consolidate(product_ids=None, rebalance=True):
+    """
+    汇总分片库存到 Product.stock（一条 UPDATE）
+    - rebalance 时把已耗尽分片的商品重新平均分配，保持各分片都有库存可扣
+    """
+    shard_sum = (
+        StockShard.objects.filter(product=OuterRef('pk'))
+        .values('product').annotate(total=Sum('stock')).values('total')
+    )
+    qs = Product.objects.filter(stock_shard_count__gt=0)
+    if product_ids is not None:
+        qs = qs.filter(pk__in=product_ids)
+    updated = qs.update(stock=Coalesce(Subquery(shard_sum), 0))
+
+    if rebalance:
+        drained = (
+            StockShard.objects.filter(product__in=qs, stock=0)
+            .values_list('product_id', flat=True).distinct()
+        )
+        for pid in list(drained):
+            with transaction.atomic():
+                shards = list(
+                    StockShard.objects.select_for_update()
+                    .filter(product_id=pid).order_by('index')
+                )
+                _rebalance(shards, sum(s.stock for s in shards))
+    return updated
@@ -0,0 +1,273 @@
+"""
+库存与订单状态实时推送
+
+- 发布端（Django 视图 / 结算引擎 / 后台）：事务提交后向本机推送进程发一个 UDP 数据报，
+  只携带「哪些商品 / 订单变了」，不等待、不重试，推送进程未运行时静默丢弃
+- 推送进程（manage.py live_hub）：
+    * 基于 websockets 维护所有 WebSocket 连接，按商品 / 用户建立订阅索引
+    * 收到的变更先合并（同一商品多次变化只记一次），每 LIVE_FLUSH_INTERVAL 秒
+      用一条查询取出有订阅者的商品库存、有在线用户的订单状态
+    * 同一商品的消息只序列化一次，websockets.broadcast 一次性写入所有订阅连接
+      （不逐个 await，慢连接不拖慢其他连接）
+- 协议：连接 ws://主机:端口/ws/live?products=1,2，之后可发送
+  {"subscribe": [id, ...]} / {"unsubscribe": [id, ...]}
+  推送 {"type": "stock", "product": id, "stock": 当前库存, "delta": 相对上次推送的变化}
+       {"type": "order", "order": id, "status": 状态}（只推给订单所属用户，凭会话 Cookie 识别）
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# 单个连接最多订阅的商品数
+MAX_SUBSCRIPTIONS = 200
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ----------------------
+# 发布端
+# ----------------------
+_local = threading.local()
+
+
+def _send(payload):
+    addr = _setting('LIVE_EVENTS_ADDR', None)
+    if not addr:
+        return
+    sock = getattr(_local, 'sock', None)
+    if sock is None:
+        sock = _local.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+    try:
+        sock.sendto(json.dumps(payload, separators=(',', ':')).encode(), tuple(addr))
+    except OSError as e:
+        logger.debug('live event dropped: %s', e)
+
+
+def _publish(kind, ids):
+    ids = sorted({int(pk) for pk in ids})
+    # UDP 数据报不宜过大，按块发送
+    for start in range(0, len(ids), 1000):
+        payload = {'t': kind, 'ids': ids[start:start + 1000]}
+        transaction.on_commit(lambda payload=payload: _send(payload))
+
+
+def stock_changed(product_ids):
+    """
+    商品库存发生变化（在事务内调用时提交后才发送）
+    """
+    _publish('stock', product_ids)
+
+
+def orders_changed(order_ids):
+    """
+    订单状态发生变化
+    """
+    _publish('order', order_ids)
+
+
+# ----------------------
+# 推送进程
+# ----------------------
+def _session_user_id(headers):
+    """
+    从握手请求的 Cookie 中解析登录用户 id（同步，在线程中调用）
+    """
+    from importlib import import_module
+
+    from django.contrib.auth import SESSION_KEY
+
+    cookie = SimpleCookie()
+    try:
+        cookie.load(headers.get('Cookie', ''))
+    except Exception:
+        return None
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    store = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    user_id = store.get(SESSION_KEY)
+    return int(user_id) if user_id is not None else None
+
+
+def _parse_ids(values):
+    ids = set()
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if part.isdigit():
+                ids.add(int(part))
+    return ids
+
+
+class _EventProtocol(asyncio.DatagramProtocol):
+    def __init__(self, hub):
+        self.hub = hub
+
+    def datagram_received(self, data, addr):
+        try:
+            event = json.loads(data)
+            self.hub.mark(event['t'], event['ids'])
+        except (ValueError, KeyError, TypeError):
+            logger.warning('invalid live event from %s', addr)
+
+
+class LiveHub:
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval or _setting('LIVE_FLUSH_INTERVAL', 0.25)
+        # 订阅索引：商品 id → 连接集合；用户 id → 连接集合
+        self.product_subs = {}
+        self.user_conns = {}
+        # 待推送的变更（合并）
+        self.dirty_products = set()
+        self.dirty_orders = set()
+        # 最近一次推送的库存，用于计算 delta
+        self.last_stock = {}
+
+    # ---- 订阅 ----
+    def subscribe(self, conn, product_ids, subscribed):
+        added = []
+        for pid in product_ids:
+            if len(subscribed) >= MAX_SUBSCRIPTIONS:
+                break
+            if pid not in subscribed:
+                subscribed.add(pid)
+                self.product_subs.setdefault(pid, set()).add(conn)
+                added.append(pid)
+        return added
+
+    def unsubscribe(self, conn, product_ids, subscribed):
+        for pid in product_ids:
+            if pid in subscribed:
+                subscribed.discard(pid)
+                conns = self.product_subs.get(pid)
+                if conns is not None:
+                    conns.discard(conn)
+                    if not conns:
+                        del self.product_subs[pid]
+                        self.last_stock.pop(pid, None)
+
+    # ---- 变更 ----
+    def mark(self, kind, ids):
+        if kind == 'stock':
+            self.dirty_products.update(ids)
+        elif kind == 'order':
+            self.dirty_orders.update(ids)
+
+    def _load(self, product_ids, order_ids, user_ids):
+        from django.db import close_old_connections
+
+        from . import inventory
+        from .models import Order
+
+        close_old_connections()
+        stock = inventory.available(product_ids) if product_ids else {}
+        orders = list(
+            Order.objects.filter(pk__in=order_ids, user_id__in=user_ids)
+            .values_list('id', 'user_id', 'status')
+        ) if order_ids and user_ids else []
+        return stock, orders
+
+    async def _snapshot(self, conn, product_ids):
+        stock, _ = await sync_to_async(self._load, thread_sensitive=False)(product_ids, (), ())
+        for pid, value in stock.items():
+            self.last_stock.setdefault(pid, value)
+            await conn.send(json.dumps({'type': 'stock', 'product': pid, 'stock': value, 'delta': None}))
+
+    async def flush(self):
+        from websockets.asyncio.server import broadcast
+
+        # 只处理有订阅者的商品、在线用户的订单
+        products = [pid for pid in self.dirty_products if pid in self.product_subs]
+        order_ids = list(self.dirty_orders)
+        self.dirty_products.clear()
+        self.dirty_orders.clear()
+        if not products and not (order_ids and self.user_conns):
+            return
+
+        stock, orders = await sync_to_async(self._load, thread_sensitive=False)(
+            products, order_ids, list(self.user_conns),
+        )
+        for pid, value in stock.items():
+            last = self.last_stock.get(pid)
+            if last == value or pid not in self.product_subs:
+                continue
+            self.last_stock[pid] = value
+            message = json.dumps({
+                'type': 'stock', 'product': pid, 'stock': value,
+                'delta': None if last is None else value - last,
+            })
+            broadcast(self.product_subs[pid], message)
+        for order_id, user_id, status in orders:
+            conns = self.user_conns.get(user_id)
+            if conns:
+                broadcast(conns, json.dumps({'type': 'order', 'order': order_id, 'status': status}))
+
+    async def flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception('live hub flush failed')
+
+    # ---- 连接 ----
+    async def handler(self, conn):
+        url = urlsplit(conn.request.path)
+        if url.path.rstrip('/') != '/ws/live':
+            await conn.close(code=1008, reason='not found')
+            return
+
+        user_id = await sync_to_async(_session_user_id, thread_sensitive=False)(conn.request.headers)
+        if user_id is not None:
+            self.user_conns.setdefault(user_id, set()).add(conn)
+
+        subscribed = set()
+        try:
+            added = self.subscribe(conn, _parse_ids(parse_qs(url.query).get('products', [])), subscribed)
+            if added:
+                await self._snapshot(conn, added)
+            async for raw in conn:
+                try:
+                    message = json.loads(raw)
+                    if 'subscribe' in message:
+                        added = self.subscribe(conn, _parse_ids(message['subscribe']), subscribed)
+                        if added:
+                            await self._snapshot(conn, added)
+                    if 'unsubscribe' in message:
+                        self.unsubscribe(conn, _parse_ids(message['unsubscribe']), subscribed)
+                except (ValueError, TypeError, AttributeError):
+                    continue
+        finally:
+            self.unsubscribe(conn, list(subscribed), subscribed)
+            if user_id is not None:
+                conns = self.user_conns.get(user_id)
+                if conns is not None:
+                    conns.discard(conn)
+                    if not conns:
+                        del self.user_conns[user_id]
+
+    async def serve(self, host, port, events_addr):
+        from websockets.asyncio.server import serve
+
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _EventProtocol(self), local_addr=tuple(events_addr),
+        )
+        try:
+            async with serve(self.handler, host, port, max_size=4096, compression=None):
+                await self.flush_forever()
+        finally:
+            transport.close()
@@ -0,0 +1,139 @@
+"""
+异步邮件发件箱
+
+- queue_mail：请求内只插入一行 OutboundEmail，不连接 SMTP
+- deliver_pending：后台进程（manage.py send_queued_mail）批量取出待发邮件，
+  复用同一个 SMTP 连接逐封发送，失败按指数退避重试
+- 使用 Django 邮件后端，测试时可切换为 locmem / console 后端
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# 最大尝试次数，超过后标记为 failed
+MAX_ATTEMPTS = 5
+# 退避基数（秒）：30s, 60s, 120s, ...
+BACKOFF_SECONDS = 30
+# 领取后的租约时长，防止多个 worker 重复发送
+LEASE_SECONDS = 300
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """
+    写入发件箱，参数与 django.core.mail.send_mail 保持一致
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=','.join(recipient_list),
+    )
+
+
+def queue_many(messages, from_email=None):
+    """
+    批量写入发件箱：messages 为 (subject, message, recipient_list) 列表，一条 INSERT
+    """
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(subject=subject, body=message, from_email=from_email, to=','.join(recipients))
+        for subject, message, recipients in messages
+    ])
+
+
+async def aqueue_mail(subject, message, recipient_list, from_email=None):
+    """
+    queue_mail 的异步版本，供异步视图使用
+    """
+    return await OutboundEmail.objects.acreate(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=','.join(recipient_list),
+    )
+
+
+def backoff(attempts):
+    return timedelta(seconds=BACKOFF_SECONDS * 2 ** max(attempts - 1, 0))
+
+
+def _claim(batch_size):
+    """
+    领取一批到期的待发邮件，并把 next_attempt_at 推后作为租约
+    - 支持 SKIP LOCKED 的数据库上多个 worker 可并行领取
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if ids:
+            OutboundEmail.objects.filter(id__in=ids).update(
+                next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def _mark_failed(msg, error):
+    msg.attempts += 1
+    msg.last_error = str(error)[:2000]
+    if msg.attempts >= MAX_ATTEMPTS:
+        msg.status = 'failed'
+    else:
+        msg.next_attempt_at = timezone.now() + backoff(msg.attempts)
+    msg.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_pending(batch_size=50):
+    """
+    投递一批邮件，返回 (成功数, 失败数)
+    """
+    batch = _claim(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning('SMTP 连接失败：%s', e)
+        for msg in batch:
+            _mark_failed(msg, e)
+        return 0, len(batch)
+
+    try:
+        for msg in batch:
+            try:
+                EmailMessage(
+                    subject=msg.subject,
+                    body=msg.body,
+                    from_email=msg.from_email or None,
+                    to=msg.recipients(),
+                    connection=connection,
+                ).send()
+            except Exception as e:
+                logger.warning('邮件 %s 发送失败：%s', msg.id, e)
+                _mark_failed(msg, e)
+                failed += 1
+            else:
+                msg.attempts += 1
+                msg.status = 'sent'
+                msg.sent_at = timezone.now()
+                msg.save(update_fields=['attempts', 'status', 'sent_at'])
+                sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
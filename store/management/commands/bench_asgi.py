@@ -0,0 +1,88 @@
+import asyncio
+import itertools
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from store.bench import (
+    free_port, http_load, seed_dataset, start_django_asgi, start_django_wsgi, summarize,
+    temporary_database, write_report,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        '对比 WSGI（多线程）与 ASGI（uvicorn）部署下商品列表、详情、验证码接口的吞吐量与尾延迟'
+        '（在临时数据库中运行，服务器与压测客户端同进程，结果用于相对比较）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='每种部署发送的请求总数')
+        parser.add_argument('--concurrency', type=int, default=32, help='并发连接数')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--servers', default='wsgi,asgi', help='参与对比的部署，逗号分隔')
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        starters = {'wsgi': start_django_wsgi, 'asgi': start_django_asgi}
+        servers = [s.strip() for s in options['servers'].split(',') if s.strip()]
+
+        with temporary_database():
+            _, products = seed_dataset(products=options['products'], users=1)
+            connection.close()
+            report = {
+                'config': {k: options[k] for k in ('requests', 'concurrency', 'products')},
+                'database': connection.vendor,
+                'servers': {},
+            }
+            with override_settings(PROFILING_SAMPLE_RATE=0):
+                for name in servers:
+                    cache.clear()
+                    port = free_port()
+                    stop = starters[name](port)
+                    try:
+                        report['servers'][name] = self._run(name, port, products, options)
+                    finally:
+                        stop()
+        write_report(report, options['output'], self.stdout)
+
+    def _requests(self, server, products, total):
+        detail = itertools.cycle(products)
+        counter = itertools.count()
+        mix = itertools.cycle(('list', 'search', 'detail', 'detail', 'send_code'))
+        for _ in range(total):
+            kind = next(mix)
+            if kind == 'list':
+                yield kind, reverse('product_list')
+            elif kind == 'search':
+                yield kind, reverse('product_list') + '?q=%E5%8E%8B%E6%B5%8B'
+            elif kind == 'detail':
+                yield kind, reverse('product_detail', args=[next(detail).pk])
+            else:
+                yield kind, reverse('send_code') + f'?email={server}{next(counter)}@example.com'
+
+    def _run(self, server, port, products, options):
+        requests = list(self._requests(server, products, options['requests']))
+        start = time.perf_counter()
+        results = asyncio.run(http_load(port, requests, options['concurrency']))
+        elapsed = time.perf_counter() - start
+
+        all_ms = [ms for samples in results.values() for ms, _ in samples]
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'rps': round(len(all_ms) / elapsed, 2) if elapsed else 0,
+            'errors': sum(not ok for samples in results.values() for _, ok in samples),
+            'latency_ms': summarize(all_ms),
+            'paths': {
+                name: {
+                    'requests': len(samples),
+                    'errors': sum(not ok for _, ok in samples),
+                    'latency_ms': summarize([ms for ms, _ in samples]),
+                }
+                for name, samples in sorted(results.items())
+            },
+        }
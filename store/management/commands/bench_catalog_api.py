@@ -0,0 +1,112 @@
+import asyncio
+import itertools
+import json
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from store.bench import (
+    free_port, http_load, seed_dataset, start_django_asgi, start_django_wsgi, start_uvicorn,
+    summarize, temporary_database, write_report,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        '对比商品目录的 Django HTML 视图、Django JSON（?format=json）与独立目录服务（catalog_api）'
+        '的吞吐量与尾延迟；请求混合为列表首页、列表翻页与商品详情（临时数据库，同进程压测，结果用于相对比较）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='每个目标发送的请求总数')
+        parser.add_argument('--concurrency', type=int, default=32, help='并发连接数')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--targets', default='html,json,api', help='参与对比的目标，逗号分隔')
+        parser.add_argument(
+            '--django-server', choices=('wsgi', 'asgi'), default='wsgi',
+            help='Django 视图的部署方式（多线程 WSGI 或 uvicorn ASGI）',
+        )
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        from catalog_api.app import create_app
+
+        targets = [t.strip() for t in options['targets'].split(',') if t.strip()]
+        start_django = start_django_wsgi if options['django_server'] == 'wsgi' else start_django_asgi
+
+        with temporary_database():
+            _, products = seed_dataset(products=options['products'], users=1)
+            db = dict(connection.settings_dict)
+            connection.close()
+            report = {
+                'config': {k: options[k] for k in ('requests', 'concurrency', 'products', 'django_server')},
+                'database': connection.vendor,
+                'targets': {},
+            }
+            with override_settings(PROFILING_SAMPLE_RATE=0):
+                for target in targets:
+                    cache.clear()
+                    port = free_port()
+                    if target == 'api':
+                        stop = start_uvicorn(create_app(db, media_url=settings.MEDIA_URL), port)
+                    else:
+                        stop = start_django(port)
+                    try:
+                        report['targets'][target] = self._run(target, port, products, options)
+                    finally:
+                        stop()
+        write_report(report, options['output'], self.stdout)
+
+    def _requests(self, target, port, products, total):
+        if target == 'api':
+            list_path = first_page_json = '/api/products'
+            details = [f'/api/products/{p.pk}' for p in products]
+        else:
+            suffix = '?format=json' if target == 'json' else ''
+            list_path = reverse('product_list') + suffix
+            first_page_json = reverse('product_list') + '?format=json'
+            details = [reverse('product_detail', args=[p.pk]) + suffix for p in products]
+
+        # 第二页游标从首页 JSON 中取（两边游标格式相同）
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{first_page_json}') as r:
+            cursor = json.load(r)['next']
+        page2 = f'{list_path}{"&" if "?" in list_path else "?"}cursor={cursor}'
+
+        detail = itertools.cycle(details)
+        mix = itertools.cycle(('list', 'page2', 'detail', 'detail'))
+        for _ in range(total):
+            kind = next(mix)
+            if kind == 'list':
+                yield kind, list_path
+            elif kind == 'page2':
+                yield kind, page2
+            else:
+                yield kind, next(detail)
+
+    def _run(self, target, port, products, options):
+        requests = list(self._requests(target, port, products, options['requests']))
+        start = time.perf_counter()
+        results = asyncio.run(http_load(port, requests, options['concurrency']))
+        elapsed = time.perf_counter() - start
+
+        all_ms = [ms for samples in results.values() for ms, _ in samples]
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'rps': round(len(all_ms) / elapsed, 2) if elapsed else 0,
+            'errors': sum(not ok for samples in results.values() for _, ok in samples),
+            'latency_ms': summarize(all_ms),
+            'paths': {
+                name: {
+                    'requests': len(samples),
+                    'errors': sum(not ok for _, ok in samples),
+                    'latency_ms': summarize([ms for ms, _ in samples]),
+                }
+                for name, samples in sorted(results.items())
+            },
+        }
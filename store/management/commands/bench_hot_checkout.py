@@ -0,0 +1,94 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.db.models import Sum
+
+from store import checkout, inventory
+from store.bench import seed_dataset, summarize, temporary_database, write_report
+from store.models import CartItem, OrderItem
+
+
+class Command(BaseCommand):
+    help = (
+        '热门商品结算压测：并发用户反复购买同一个商品，'
+        '对比单行库存与分片库存的吞吐量、延迟与超卖情况（在临时数据库中运行）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=16, help='并发用户数')
+        parser.add_argument('--orders', type=int, default=50, help='每个用户下单次数')
+        parser.add_argument('--stock', type=int, default=500, help='热门商品初始库存（小于总下单量时可观察售罄）')
+        parser.add_argument('--shards', type=int, default=8, help='分片模式下的分片数量')
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            # 两个商品：0 号保持单行库存，1 号开启分片
+            users, products = seed_dataset(
+                products=2, users=options['users'], stock=options['stock'],
+            )
+            plain, sharded = products
+            inventory.enable_sharding(sharded, options['shards'])
+            sharded.refresh_from_db()
+
+            report = {
+                'config': {k: options[k] for k in ('users', 'orders', 'stock', 'shards')},
+                'database': connection.vendor,
+                'results': {
+                    'single_row': self._run(users, plain, options),
+                    'sharded': self._run(users, sharded, options),
+                },
+            }
+            if connection.vendor == 'sqlite':
+                report['note'] = 'SQLite 为库级写锁，分片无法提升并行度；请在 PostgreSQL / MySQL 上对比'
+        write_report(report, options['output'], self.stdout)
+
+    def _run(self, users, product, options):
+        latency = []
+        counts = {'ok': 0, 'sold_out': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def buyer(user):
+            try:
+                for _ in range(options['orders']):
+                    CartItem.objects.create(user=user, product=product, quantity=1)
+                    start = time.perf_counter()
+                    try:
+                        checkout.place_order(user, '压测地址')
+                        outcome = 'ok'
+                    except checkout.OutOfStock:
+                        CartItem.objects.filter(user=user).delete()
+                        outcome = 'sold_out'
+                    except DatabaseError:
+                        CartItem.objects.filter(user=user).delete()
+                        outcome = 'errors'
+                    ms = (time.perf_counter() - start) * 1000
+                    with lock:
+                        latency.append(ms)
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buyer, args=(u,)) for u in users]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        inventory.consolidate([product.pk])
+        sold = OrderItem.objects.filter(product=product).aggregate(n=Sum('quantity'))['n'] or 0
+        remaining = inventory.available([product.pk])[product.pk]
+        return {
+            **counts,
+            'elapsed_s': round(elapsed, 3),
+            'orders_per_s': round(counts['ok'] / elapsed, 2) if elapsed else 0,
+            'latency_ms': summarize(latency),
+            'sold': sold,
+            'remaining': remaining,
+            'oversold': max(sold - options['stock'], 0),
+            'stock_consistent': sold + remaining == options['stock'],
+        }
@@ -0,0 +1,93 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from store import search
+from store.bench import summarize, timed, write_report
+from store.models import Product
+
+# 生成测试词表用的中文字符（常用汉字区段）与英文字母
+HANZI = [chr(0x4e00 + i) for i in range(3000)]
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def build_vocabulary(rng, size=4000):
+    """
+    生成中英混合词表，规模接近真实商品库的词汇分布
+    """
+    words = set()
+    while len(words) < size:
+        if rng.random() < 0.5:
+            words.add(''.join(rng.choices(HANZI, k=rng.randint(2, 4))))
+        else:
+            words.add(''.join(rng.choices(LETTERS, k=rng.randint(4, 8))))
+    return sorted(words)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = '对比倒排索引检索与 icontains 全表扫描的查询耗时（数据在事务中生成并回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='测试的商品数量规模',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='每个查询重复次数')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = build_vocabulary(rng)
+        report = {'repeat': options['repeat'], 'results': []}
+
+        for size in options['sizes']:
+            self.stderr.write(f'生成 {size} 个商品并建立索引 ...')
+            try:
+                with transaction.atomic():
+                    report['results'].append(self._run(size, rng, vocabulary, options['repeat']))
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        write_report(report, options['output'], self.stdout)
+
+    def _run(self, size, rng, vocabulary, repeat):
+        batch = 5000
+        for start in range(0, size, batch):
+            products = Product.objects.bulk_create([
+                Product(
+                    name=' '.join(rng.sample(vocabulary, 3)) + f' {start + i}',
+                    description=' '.join(rng.choices(vocabulary, k=20)),
+                    price=rng.randint(1, 9999),
+                    stock=rng.randint(0, 100),
+                )
+                for i in range(min(batch, size - start))
+            ])
+            search.index_products(products)
+
+        # 命中词：来自词表；未命中词：词表外的新词（icontains 的最坏情况，需扫完整表）
+        vocab = set(vocabulary)
+        misses = [w for w in build_vocabulary(rng, 200) if w not in vocab][:5]
+        result = {'products': size}
+        for label, queries in (('hit', rng.sample(vocabulary, 5)), ('miss', misses)):
+            scan_ms, index_ms = [], []
+            for q in queries:
+                for _ in range(repeat):
+                    _, ms = timed(lambda: list(
+                        Product.objects.filter(Q(name__icontains=q) | Q(description__icontains=q))[:20]
+                    ))
+                    scan_ms.append(ms)
+                    _, ms = timed(lambda: list(search.search_products(q)[:20]))
+                    index_ms.append(ms)
+            result[label] = {
+                'icontains_scan_ms': summarize(scan_ms),
+                'inverted_index_ms': summarize(index_ms),
+            }
+        return result
@@ -0,0 +1,121 @@
+import gc
+import os
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from store import suggest
+from store.bench import summarize, write_report
+
+# 合成商品名用的词表
+CN_WORDS = [
+    '苹果', '华为', '小米', '手机', '保护', '壳', '无线', '蓝牙', '耳机', '运动', '跑步', '鞋',
+    '纯棉', '短袖', '衬衫', '牛仔', '外套', '保温', '水杯', '电动', '牙刷', '机械', '键盘', '鼠标',
+    '充电', '宝', '数据线', '智能', '手表', '儿童', '玩具', '厨房', '收纳', '盒', '床上', '四件套',
+]
+EN_WORDS = [
+    'apple', 'iphone', 'galaxy', 'pixel', 'case', 'wireless', 'charger', 'usb', 'cable', 'pro',
+    'max', 'mini', 'ultra', 'air', 'book', 'watch', 'band', 'sport', 'shoes', 'cotton', 'shirt',
+]
+
+
+def _names(n, seed):
+    rnd = random.Random(seed)
+    for pk in range(1, n + 1):
+        words = CN_WORDS if rnd.random() < 0.7 else EN_WORDS
+        sep = '' if words is CN_WORDS else ' '
+        yield pk, sep.join(rnd.choices(words, k=rnd.randint(2, 4))) + f' {rnd.randint(1, 9999)}'
+
+
+def _rss():
+    """
+    当前进程常驻内存（字节），仅 Linux 可用
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _timed_us(fn, args_list):
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return summarize(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        '用合成商品名（默认 100 万个，七成中文）测试搜索联想前缀索引：构建耗时、内存占用、'
+        '前缀查询与增量更新的延迟（微秒）；不访问数据库'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=1_000_000)
+        parser.add_argument('--max-products', type=int, default=None, help='索引收录上限，缺省不限')
+        parser.add_argument('--lookups', type=int, default=20000)
+        parser.add_argument('--updates', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--trace-memory', action='store_true',
+            help='用 tracemalloc 统计内存与构建峰值（构建耗时会明显变长）',
+        )
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        n = options['names']
+        rnd = random.Random(options['seed'])
+
+        gc.collect()
+        rss_before = _rss()
+        if options['trace_memory']:
+            tracemalloc.start()
+        start = time.perf_counter()
+        index = suggest.SuggestIndex.build(_names(n, options['seed']), options['max_products'])
+        build_s = time.perf_counter() - start
+        gc.collect()
+        memory = {
+            'estimated_mb': round(index.memory_usage() / 2 ** 20, 1),
+            'rss_delta_mb': round((_rss() - rss_before) / 2 ** 20, 1) if rss_before is not None else None,
+        }
+        if options['trace_memory']:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            memory.update(traced_mb=round(current / 2 ** 20, 1), build_peak_mb=round(peak / 2 ** 20, 1))
+
+        products = len(index)
+        # 查询前缀：从已收录的名称中截取 1 ~ 4 个字符，另有一成为拼音 / 英文前缀
+        sample = rnd.sample(sorted(index._names.items()), min(2000, products))
+        prefixes = []
+        for _ in range(options['lookups']):
+            _, name = rnd.choice(sample)
+            if rnd.random() < 0.1:
+                prefixes.append((rnd.choice(('pg', 'sh', 'ip', 'wu', 'ch')), 10))
+            else:
+                prefixes.append((name[:rnd.randint(1, 4)], 10))
+        hits = sum(bool(index.lookup(q, limit)) for q, limit in prefixes[:1000])
+
+        renames = [
+            ([(pk, name + ' 新款')],) for pk, name in rnd.sample(sample, min(options['updates'], len(sample)))
+        ]
+
+        report = {
+            'config': {k: options[k] for k in ('names', 'max_products', 'lookups', 'updates')},
+            'pinyin': suggest.lazy_pinyin is not None,
+            'products': products,
+            'keys': len(index._keys),
+            'build_s': round(build_s, 2),
+            'memory': {
+                **memory,
+                'bytes_per_product': round(memory['estimated_mb'] * 2 ** 20 / products, 1) if products else 0,
+            },
+            'lookup_hit_rate': round(hits / min(1000, len(prefixes)), 3) if prefixes else 0,
+            'lookup_us': _timed_us(index.lookup, prefixes),
+            'update_us': _timed_us(index.update, renames),
+        }
+        write_report(report, options['output'], self.stdout)
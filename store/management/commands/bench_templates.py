@@ -0,0 +1,117 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.backends.jinja2 import Jinja2
+from django.test import RequestFactory
+from django.utils import timezone
+
+from store.bench import summarize, write_report
+from store.facets import ProductFilters
+from store.models import Order, OrderItem, Product
+from store.pagination import KeysetPage
+
+PAGES = ('product_list.html', 'order_list.html', 'admin/admin_orders.html')
+
+
+def _jinja2_engine():
+    for engine in engines.all():
+        if isinstance(engine, Jinja2):
+            return engine
+    # 未开启 JINJA2_TEMPLATES 时按同一配置临时创建
+    params = {k: v for k, v in settings.JINJA2_BACKEND.items() if k != 'BACKEND'}
+    return Jinja2({**params, 'NAME': 'jinja2'})
+
+
+def _contexts(rows):
+    """
+    构造每个页面 rows 行数据的上下文（内存对象，不访问数据库）
+    """
+    now = timezone.now()
+    user = User(pk=1, username='bench', is_superuser=True, is_staff=True)
+
+    products = [
+        Product(
+            pk=i, name=f'压测商品 {i}', description=f'benchmark product {i}',
+            price=Decimal(i % 500) + Decimal('0.99'), stock=50,
+            created_at=now - datetime.timedelta(minutes=i),
+        )
+        for i in range(1, rows + 1)
+    ]
+    orders = []
+    for i in range(1, rows + 1):
+        order = Order(
+            pk=i, user=user, total_amount=Decimal('99.50'), status='paid', address='压测地址',
+        )
+        order.created_at = now - datetime.timedelta(minutes=i)
+        # 预取的订单项，o.items.all 不访问数据库
+        order._prefetched_objects_cache = {'items': [
+            OrderItem(pk=i * 10 + j, order=order, product=products[(i + j) % rows],
+                      quantity=j + 1, unit_price=Decimal('19.90'))
+            for j in range(2)
+        ]}
+        orders.append(order)
+
+    def page(items):
+        return KeysetPage(lambda: (items, 'next-cursor', 'prev-cursor'), 'q=x')
+
+    product_page = page(products)
+    order_page = page(orders)
+    filters = ProductFilters()
+    facet_counts = filters._facets(dict.fromkeys(filters.aggregates(), rows))
+    return user, {
+        'product_list.html': {
+            'products': product_page, 'page': product_page, 'q': '',
+            'filters': filters, 'facets': facet_counts,
+            'catalog_version': 0, 'cache_timeout': 0, 'grid_timeout': 0, 'facets_timeout': 0,
+        },
+        'order_list.html': {'orders': order_page, 'page': order_page, 'live_ws_url': ''},
+        'admin/admin_orders.html': {'orders': order_page, 'page': order_page},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        '分别用 Django 模板与 Jinja2 渲染商品列表、我的订单、后台订单列表（每页 --rows 行），'
+        '对比渲染耗时；片段缓存在每次渲染前清空，测的是未命中缓存时的渲染开销'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        backends = {'django': engines['django'], 'jinja2': _jinja2_engine()}
+        user, contexts = _contexts(options['rows'])
+        request = RequestFactory().get('/')
+        request.user = user
+
+        report = {
+            'config': {k: options[k] for k in ('rows', 'iterations')},
+            'pages': {},
+        }
+        for name in PAGES:
+            result = {}
+            for engine_name, engine in backends.items():
+                template = engine.get_template(name)
+                # 预热：模板编译、URL 解析缓存
+                cache.clear()
+                size = len(template.render(contexts[name], request))
+                timings = []
+                for _ in range(options['iterations']):
+                    cache.clear()
+                    start = time.perf_counter()
+                    template.render(contexts[name], request)
+                    timings.append((time.perf_counter() - start) * 1000)
+                result[engine_name] = {'bytes': size, 'render_ms': summarize(timings)}
+            result['speedup'] = round(
+                result['django']['render_ms']['p50'] / result['jinja2']['render_ms']['p50'], 2,
+            ) if result['jinja2']['render_ms']['p50'] else None
+            report['pages'][name] = result
+        write_report(report, options['output'], self.stdout)
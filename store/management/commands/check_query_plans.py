@@ -0,0 +1,115 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Value
+from django.utils import timezone
+
+from store import search
+from store.facets import ProductFilters
+from store.models import (
+    CartItem,
+    DailySales,
+    Order,
+    OrderItem,
+    OutboundEmail,
+    Product,
+    ProductComment,
+    ProductDailySales,
+    StockShard,
+)
+from store.pagination import KeysetPaginator, encode_cursor
+
+
+def hot_queries():
+    """
+    热点查询清单：(名称, 查询集)；与视图 / 模块中的实际写法保持一致
+    """
+    now = timezone.now()
+    week_ago = now - datetime.timedelta(days=7)
+
+    def page(qs, ordering, values=None):
+        # 与 store.pagination 生成的 SQL 相同：有游标时带 seek 条件
+        cursor = encode_cursor(values, 'n') if values else None
+        return KeysetPaginator(qs, 20, ordering)._prepare(cursor)[0]
+
+    return [
+        ('商品列表首页', page(Product.objects.all(), ('-created_at', '-id'))),
+        ('商品列表翻页', page(Product.objects.all(), ('-created_at', '-id'), [now, 1])),
+        ('商品搜索', search.search_products('手机 壳')[:20]),
+        ('商品按价格排序（仅看有货）', page(ProductFilters(in_stock=True).apply(Product.objects.all()),
+                                ('price', 'id'), [Decimal('99.00'), 1])),
+        ('商品按销量排序（价格区间）', page(ProductFilters(price='50-100').apply(Product.objects.all()),
+                                ('-sales_count', '-id'), [10, 1])),
+        # 与 ProductFilters.facets 的聚合 SQL 相同（按常量分组以得到可 EXPLAIN 的查询集）
+        ('商品分面计数', Product.objects.annotate(g=Value(1)).values('g')
+                       .annotate(**ProductFilters(price='50-100', in_stock=True).aggregates())),
+        ('商品评论翻页', page(ProductComment.objects.filter(product_id=1).select_related('user'),
+                          ('-created_at', '-id'), [now, 1])),
+        ('用户订单列表', page(Order.objects.filter(user_id=1), ('-created_at', '-id'), [now, 1])),
+        ('后台订单列表', page(Order.objects.select_related('user'), ('-created_at', '-id'), [now, 1])),
+        ('订单项预取', OrderItem.objects.filter(order_id__in=[1, 2, 3]).select_related('product')),
+        ('按状态与日期筛选订单', Order.objects.filter(status='paid', created_at__gte=week_ago)),
+        ('购物车查询', CartItem.objects.filter(user_id=1).select_related('product')),
+        ('加入购物车 get_or_create', CartItem.objects.filter(user_id=1, product_id=1)),
+        ('邮箱登录 / 找回密码', User.objects.filter(email='user@example.com')),
+        ('发件箱领取', OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+                       .order_by('next_attempt_at')[:50]),
+        ('库存分片扣减', StockShard.objects.filter(product_id=1, index=0)),
+        ('每日销售报表', DailySales.objects.filter(order_count__gt=0).order_by('day')),
+        ('商品日汇总累加', ProductDailySales.objects.filter(day=now.date(), product_id=1)),
+        ('分片商品汇总', StockShard.objects.filter(product_id__in=[1, 2]).values('product_id')
+                       .annotate(n=Count('id'))),
+    ]
+
+
+def _full_scans(plan, vendor):
+    """
+    从执行计划中找出全表扫描的行
+    """
+    lines = plan.splitlines()
+    if vendor == 'sqlite':
+        # "SCAN store_order" 为全表扫描；"SCAN ... USING INDEX" / "SEARCH ..." 均走索引
+        return [l.strip() for l in lines if ' SCAN ' in f' {l.strip()} ' and 'USING' not in l
+                and 'TEMP B-TREE' not in l and 'SUBQUERY' not in l]
+    if vendor == 'postgresql':
+        return [l.strip() for l in lines if 'Seq Scan on' in l]
+    if vendor == 'mysql':
+        return [l.strip() for l in lines if '"access_type": "ALL"' in l]
+    return []
+
+
+class Command(BaseCommand):
+    help = (
+        '对热点查询执行 EXPLAIN，出现全表扫描时以非零状态退出（可放入 CI 作为索引回归检查）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='打印每条查询的完整执行计划')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # 小表上 PostgreSQL 会倾向顺序扫描，关闭后可检查是否存在可用索引
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, qs in hot_queries():
+                plan = qs.explain(format='JSON') if vendor == 'mysql' else qs.explain()
+                scans = _full_scans(plan, vendor)
+                status = self.style.ERROR('全表扫描') if scans else self.style.SUCCESS('OK')
+                self.stdout.write(f'[{status}] {name}')
+                for line in scans:
+                    self.stdout.write(f'    {line}')
+                if options['verbose_plans']:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'      | {line}')
+                if scans:
+                    failures.append(name)
+
+        if failures:
+            raise CommandError(f'{len(failures)} 条热点查询出现全表扫描：{"、".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('所有热点查询均命中索引。'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import inventory
+
+
+class Command(BaseCommand):
+    help = '汇总分片商品的库存到 Product.stock，并重新分配已耗尽的分片（--loop 时常驻运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='持续运行，定期汇总')
+        parser.add_argument('--interval', type=float, default=5.0, help='汇总间隔（秒）')
+        parser.add_argument('--no-rebalance', action='store_true', help='只汇总，不重新分配分片')
+
+    def handle(self, *args, **options):
+        while True:
+            updated = inventory.consolidate(rebalance=not options['no_rebalance'])
+            if options['verbosity'] > 1 or not options['loop']:
+                self.stdout.write(f'已汇总 {updated} 个分片商品')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
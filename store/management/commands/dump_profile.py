@@ -0,0 +1,44 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from store import profiling
+
+
+class Command(BaseCommand):
+    help = '合并各进程写出的性能采样文件，输出每个视图的分位数统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='以 JSON 输出')
+        parser.add_argument('--sort', default='wall_ms', choices=profiling.METRICS,
+                            help='按该指标的 p95 降序排列')
+
+    def handle(self, *args, **options):
+        merged = defaultdict(lambda: defaultdict(list))
+        for path in sorted(profiling.profile_dir().glob('profile-*.json')):
+            for view, metrics in json.loads(path.read_text()).items():
+                for metric, values in metrics.items():
+                    merged[view][metric].extend(values)
+
+        stats = profiling.summarize_raw(merged)
+        if options['json']:
+            self.stdout.write(json.dumps(stats, ensure_ascii=False, indent=2))
+            return
+
+        if not stats:
+            self.stdout.write(f'{profiling.profile_dir()} 中没有采样数据。')
+            return
+
+        key = options['sort']
+        rows = sorted(stats.items(), key=lambda kv: kv[1][key]['p95'], reverse=True)
+        header = f"{'view':<28}{'n':>7}{'wall p50':>10}{'wall p95':>10}{'wall p99':>10}" \
+                 f"{'sql n p95':>10}{'sql ms p95':>11}{'tpl ms p95':>11}{'alloc KB p95':>13}"
+        self.stdout.write(header)
+        for view, s in rows:
+            self.stdout.write(
+                f"{view:<28}{s['samples']:>7}"
+                f"{s['wall_ms']['p50']:>10.1f}{s['wall_ms']['p95']:>10.1f}{s['wall_ms']['p99']:>10.1f}"
+                f"{s['query_count']['p95']:>10.0f}{s['query_ms']['p95']:>11.1f}"
+                f"{s['render_ms']['p95']:>11.1f}{s['alloc_peak_kb']['p95']:>13.1f}"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store import catalog_io
+
+
+class Command(BaseCommand):
+    help = '导出全部商品为 CSV / JSON Lines（字段与 import_products 一致，image 为相对 MEDIA_ROOT 的路径）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=catalog_io.FORMATS, default='csv')
+        parser.add_argument('--output', help='输出文件，缺省写到标准输出')
+
+    def handle(self, *args, **options):
+        rows = catalog_io.export_rows()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                count = catalog_io.write_rows(rows, f, options['format'])
+            self.stderr.write(f'已导出 {count} 个商品到 {options["output"]}')
+        else:
+            # 写入 self.stdout 包装的底层流（call_command(stdout=...) 时为调用方传入的对象），
+            # OutputWrapper.write 会给每次写入补换行
+            catalog_io.write_rows(rows, self.stdout._out, options['format'])
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import rollup
+
+
+class Command(BaseCommand):
+    help = '将待合并的订单变化批量计入每日销售汇总与商品销量（--loop 时常驻运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true', help='持续运行，定期合并')
+        parser.add_argument('--interval', type=float, default=5.0, help='没有待合并记录时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            folded = 0
+            # 连续处理直到本轮待合并记录全部取完
+            while True:
+                n = rollup.fold_pending(batch_size)
+                folded += n
+                if n < batch_size:
+                    break
+            if options['verbosity'] > 1 or not options['loop']:
+                self.stdout.write(f'已合并 {folded} 条订单变化')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,48 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store import images
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = '为已有商品图片批量生成衍生图（缩略图 / 响应式 srcset）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'IMAGE_WORKERS', 2))
+        parser.add_argument('--force', action='store_true', help='已生成的商品也重新处理')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_variants')
+        todo = [p for p in products.iterator() if options['force'] or images.needs_variants(p)]
+        if not todo:
+            self.stdout.write('没有需要处理的商品图片。')
+            return
+
+        done = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            futures = {}
+            for p in todo:
+                path = images._source_path(p)
+                if path is None:
+                    continue
+                futures[pool.submit(images.render_variants, path, str(settings.MEDIA_ROOT))] = p
+
+            for future in as_completed(futures):
+                p = futures[future]
+                try:
+                    digest, widths = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'商品 {p.pk} 处理失败：{e}')
+                    continue
+                images.save_variants(p.pk, p.image.name, digest, widths)
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'完成 {done} 个，失败 {failed} 个。'))
@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store import caching, catalog_io, images
+
+
+class Command(BaseCommand):
+    help = (
+        '从 CSV / JSON Lines 批量导入商品（按 SKU upsert）。'
+        '字段：sku, name, description, price, stock, image（相对 --image-root 的图片路径）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=catalog_io.FORMATS, help='缺省按扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=catalog_io.BATCH_SIZE)
+        parser.add_argument('--image-root', help='图片路径的根目录，缺省为导入文件所在目录')
+        parser.add_argument('--no-images', action='store_true', help='忽略 image 列')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'IMAGE_WORKERS', 2),
+                            help='图片处理进程数')
+        parser.add_argument('--skip-invalid', action='store_true', help='跳过非法行继续导入（缺省有错误即中止）')
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = catalog_io.detect_format(path, options['format'])
+        image_root = None
+        if not options['no_images']:
+            image_root = options['image_root'] or os.path.dirname(os.path.abspath(path))
+
+        start = time.perf_counter()
+        # 第一遍：只校验
+        try:
+            valid, errors = catalog_io.validate(
+                catalog_io.read_rows(path, fmt), image_root,
+                max_errors=None if options['skip_invalid'] else 20,
+            )
+        except OSError as e:
+            raise CommandError(f'无法读取文件：{e}')
+        for e in errors[:20]:
+            self.stderr.write(str(e))
+        if errors and not options['skip_invalid']:
+            raise CommandError('校验未通过，未写入任何数据（可使用 --skip-invalid 跳过非法行）')
+        self.stdout.write(f'校验完成：有效 {valid} 行，非法 {len(errors)} 行')
+        if options['dry_run']:
+            return
+
+        # 第二遍：分批写入，图片交给进程池并行处理
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            created, updated, images_done, images_failed = self._import(
+                path, fmt, image_root, pool, options['batch_size'],
+            )
+        caching.invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：新建 {created}，更新 {updated}，图片 {images_done}（失败 {images_failed}），'
+            f'耗时 {time.perf_counter() - start:.1f}s'
+        ))
+
+    def _import(self, path, fmt, image_root, pool, batch_size):
+        media_root = str(settings.MEDIA_ROOT)
+        created = updated = images_done = images_failed = 0
+        pending = {}
+        results = []
+
+        def collect(block):
+            nonlocal images_done, images_failed
+            if not pending:
+                return
+            done, _ = wait(list(pending), return_when=ALL_COMPLETED if block else FIRST_COMPLETED)
+            for future in done:
+                pk, source = pending.pop(future)
+                try:
+                    results.append((pk, *future.result()))
+                    images_done += 1
+                except Exception as e:
+                    images_failed += 1
+                    self.stderr.write(f'图片处理失败 {source}：{e}')
+            if block or len(results) >= batch_size:
+                catalog_io.apply_images(results)
+                results.clear()
+
+        def flush(batch):
+            nonlocal created, updated
+            n_created, n_updated, ids = catalog_io.upsert_batch(batch)
+            created += n_created
+            updated += n_updated
+            for data in batch:
+                if data['image']:
+                    future = pool.submit(images.import_image, data['image'], media_root)
+                    pending[future] = (ids[data['sku']], data['image'])
+            # 待处理图片过多时先等待一部分，控制内存占用
+            while len(pending) > batch_size * 2:
+                collect(block=False)
+            self.stdout.write(f'已写入 {created + updated} 行')
+
+        seen = set()
+        batch = []
+        for line, row in catalog_io.read_rows(path, fmt):
+            try:
+                data = catalog_io.clean_row(line, row, image_root)
+            except catalog_io.RowError:
+                continue
+            if data['sku'] in seen:
+                continue
+            seen.add(data['sku'])
+            batch.append(data)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        collect(block=True)
+        return created, updated, images_done, images_failed
@@ -0,0 +1,30 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store.live import LiveHub
+
+
+class Command(BaseCommand):
+    help = '运行库存 / 订单状态 WebSocket 推送进程（每台机器一个，接收本机 Django 进程的变更通知）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='0.0.0.0')
+        parser.add_argument('--port', type=int, default=8002, help='WebSocket 监听端口')
+        parser.add_argument('--flush-interval', type=float, help='合并推送的间隔（秒），缺省 LIVE_FLUSH_INTERVAL')
+
+    def handle(self, *args, **options):
+        events_addr = getattr(settings, 'LIVE_EVENTS_ADDR', None)
+        if not events_addr:
+            self.stderr.write('LIVE_EVENTS_ADDR 未配置，Django 进程不会发送变更通知')
+            return
+        hub = LiveHub(options['flush_interval'])
+        self.stdout.write(
+            f'WebSocket：ws://{options["host"]}:{options["port"]}/ws/live，'
+            f'变更通知：udp://{events_addr[0]}:{events_addr[1]}'
+        )
+        try:
+            asyncio.run(hub.serve(options['host'], options['port'], events_addr))
+        except KeyboardInterrupt:
+            pass
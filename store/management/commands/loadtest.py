@@ -0,0 +1,168 @@
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, override_settings
+from django.urls import resolve, reverse
+
+from store.bench import seed_dataset, summarize, temporary_database, write_report
+from store.models import CartItem, OrderItem, Product
+
+
+class _Recorder:
+    """
+    线程安全地收集各 URL 名称的延迟、错误与库存 UPDATE 等待时间
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_wait = []
+
+    def request(self, url_name, ms, ok):
+        with self.lock:
+            self.latency[url_name].append(ms)
+            if not ok:
+                self.errors[url_name] += 1
+
+    def stock_update(self, ms):
+        with self.lock:
+            self.lock_wait.append(ms)
+
+
+class Command(BaseCommand):
+    help = (
+        '压力测试：在临时数据库中生成数据，模拟并发用户完成 '
+        '浏览 → 加购 → 修改数量 → 结算 → 查看订单 的完整流程，输出 JSON 报告'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='并发用户数')
+        parser.add_argument('--iterations', type=int, default=5, help='每个用户完成的购物流程次数')
+        parser.add_argument('--products', type=int, default=200, help='商品数量')
+        parser.add_argument('--stock', type=int, default=50, help='每个商品的初始库存')
+        parser.add_argument('--hot-products', type=int, default=0,
+                            help='只在前 N 个商品中挑选购买对象，用于制造库存争用（0 为不限制）')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='JSON 报告输出路径，缺省打印到终端')
+
+    def handle(self, *args, **options):
+        with temporary_database():
+            users, products = seed_dataset(
+                products=options['products'], users=options['users'],
+                stock=options['stock'], seed=options['seed'],
+            )
+            # 压测期间关闭性能采样中间件，避免 tracemalloc 干扰结果
+            with override_settings(PROFILING_SAMPLE_RATE=0):
+                report = self._run(users, products, options)
+        write_report(report, options['output'], self.stdout)
+
+    def _run(self, users, products, options):
+        recorder = _Recorder()
+        pool = products[:options['hot_products']] if options['hot_products'] else products
+        initial_stock = {p.id: p.stock for p in products}
+
+        threads = [
+            threading.Thread(
+                target=self._user_session,
+                args=(user, pool, options['iterations'], recorder, options['seed'] + i),
+            )
+            for i, user in enumerate(users)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        total_requests = sum(len(v) for v in recorder.latency.values())
+        return {
+            'config': {k: options[k] for k in ('users', 'iterations', 'products', 'stock', 'hot_products')},
+            'database': connection.vendor,
+            'elapsed_s': round(elapsed, 3),
+            'requests': total_requests,
+            'throughput_rps': round(total_requests / elapsed, 2) if elapsed else 0,
+            'urls': {
+                name: {
+                    'requests': len(values),
+                    'errors': recorder.errors[name],
+                    'rps': round(len(values) / elapsed, 2) if elapsed else 0,
+                    'latency_ms': summarize(values),
+                }
+                for name, values in sorted(recorder.latency.items())
+            },
+            'lock_wait_ms': summarize(recorder.lock_wait),
+            'errors': sum(recorder.errors.values()),
+            'oversell': self._oversell(initial_stock),
+        }
+
+    def _user_session(self, user, pool, iterations, recorder, seed):
+        rng = random.Random(seed)
+        client = Client()
+        client.force_login(user)
+
+        def stock_update_timer(execute, sql, params, many, context):
+            # 库存扣减语句的耗时主要是等待写锁
+            begin = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                if sql.startswith('UPDATE "store_product"'):
+                    recorder.stock_update((time.perf_counter() - begin) * 1000)
+
+        def call(method, path, data=None):
+            url_name = resolve(path.split('?')[0]).url_name
+            begin = time.perf_counter()
+            try:
+                response = getattr(client, method)(path, data or {})
+                ok = response.status_code < 500
+            except Exception:
+                ok = False
+            recorder.request(url_name, (time.perf_counter() - begin) * 1000, ok)
+
+        try:
+            with connection.execute_wrapper(stock_update_timer):
+                for _ in range(iterations):
+                    call('get', reverse('product_list'))
+                    picks = rng.sample(pool, min(len(pool), rng.randint(1, 3)))
+                    for p in picks:
+                        call('get', reverse('product_detail', args=[p.id]))
+                        call('get', reverse('add_to_cart', args=[p.id]))
+                    for item_id in CartItem.objects.filter(user=user).values_list('id', flat=True):
+                        call('post', reverse('update_cart_quantity'), {
+                            'cart_id': item_id, 'quantity': rng.randint(1, 3),
+                        })
+                    call('post', reverse('checkout'), {'address': '压测地址'})
+                    call('get', reverse('order_list'))
+        finally:
+            connection.close()
+
+    def _oversell(self, initial_stock):
+        """
+        超卖检查：已售数量 + 剩余库存 应等于初始库存，且已售不得超过初始库存
+        """
+        sold = dict(
+            OrderItem.objects.values_list('product_id').annotate(qty=Sum('quantity'))
+        )
+        remaining = dict(Product.objects.values_list('id', 'stock'))
+        oversold_products = 0
+        oversold_units = 0
+        mismatched = 0
+        for pid, initial in initial_stock.items():
+            s = sold.get(pid, 0)
+            if s > initial:
+                oversold_products += 1
+                oversold_units += s - initial
+            if s + remaining.get(pid, 0) != initial:
+                mismatched += 1
+        return {
+            'oversold_products': oversold_products,
+            'oversold_units': oversold_units,
+            'stock_mismatched_products': mismatched,
+        }
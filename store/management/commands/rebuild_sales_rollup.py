@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from store import rollup
+from store.models import DailySales, ProductDailySales
+
+
+class Command(BaseCommand):
+    help = '从订单表全量重建每日销售汇总表与商品累计销量（历史回填 / 数据修复）'
+
+    def handle(self, *args, **options):
+        rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'重建完成：{DailySales.objects.count()} 天，'
+            f'{ProductDailySales.objects.count()} 条商品日汇总。'
+        ))
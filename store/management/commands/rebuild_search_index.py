@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from store import search
+from store.models import ProductSearchToken
+
+
+class Command(BaseCommand):
+    help = '全量重建商品搜索倒排索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'索引重建完成，共 {ProductSearchToken.objects.count()} 个词元。'
+        ))
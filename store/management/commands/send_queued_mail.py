@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store import mail
+
+
+class Command(BaseCommand):
+    help = '投递发件箱中的待发送邮件（--loop 时作为常驻后台进程运行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='持续运行，轮询发件箱')
+        parser.add_argument('--interval', type=float, default=2.0, help='发件箱为空时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            # 连续处理直到本轮到期邮件全部取完
+            while True:
+                sent, failed = mail.deliver_pending(batch_size)
+                if sent or failed:
+                    self.stdout.write(f'已发送 {sent} 封，失败 {failed} 封')
+                if sent + failed < batch_size:
+                    break
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
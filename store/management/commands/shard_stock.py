@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store import caching, inventory
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = '将热门商品的库存拆分为多个分片，降低结算时的行锁争用（--shards 0 取消分片）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='+', type=int)
+        parser.add_argument('--shards', type=int, default=8, help='分片数量，0 为取消分片')
+
+    def handle(self, *args, **options):
+        shards = options['shards']
+        if shards < 0:
+            raise CommandError('--shards 不能为负数')
+
+        for pid in options['product_ids']:
+            try:
+                product = Product.objects.get(pk=pid)
+            except Product.DoesNotExist:
+                raise CommandError(f'商品 {pid} 不存在')
+            total = inventory.enable_sharding(product, shards)
+            caching.invalidate_product(pid)
+            if shards:
+                self.stdout.write(f'{product.name}：库存 {total} 已拆分为 {shards} 个分片')
+            else:
+                self.stdout.write(f'{product.name}：已取消分片，库存 {total}')
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from store.models import EmailVerification
+
+
+class Command(BaseCommand):
+    help = '清理旧版验证码表 EmailVerification 中的过期记录（--all 清空整张表），分批删除避免长时间锁表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='删除全部记录（验证码已不再存储在该表中）')
+        parser.add_argument('--older-than', type=int, default=60, help='删除创建时间早于 N 秒前的记录')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        qs = EmailVerification.objects.all()
+        if not options['all']:
+            qs = qs.filter(created_at__lt=timezone.now() - timedelta(seconds=options['older_than']))
+
+        deleted = 0
+        while True:
+            ids = list(qs.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += EmailVerification.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'已删除 {deleted} 条验证码记录。'))
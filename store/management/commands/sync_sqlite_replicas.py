@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        '本地测试读写分离：用 SQLite 在线备份把主库复制到各副本文件'
+        '（--loop 时定期复制，间隔即模拟的复制延迟）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=2.0, help='复制间隔（秒）')
+
+    def handle(self, *args, **options):
+        aliases = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not aliases:
+            raise CommandError('未配置副本（设置环境变量 SHOP_REPLICA_DBS）')
+        databases = [settings.DATABASES[a] for a in [DEFAULT_DB_ALIAS, *aliases]]
+        if any(db['ENGINE'] != 'django.db.backends.sqlite3' for db in databases):
+            raise CommandError('仅支持 SQLite 主库与副本')
+
+        while True:
+            source = sqlite3.connect(str(databases[0]['NAME']))
+            try:
+                for alias, db in zip(aliases, databases[1:]):
+                    target = sqlite3.connect(str(db['NAME']))
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+                    if options['verbosity'] > 1 or not options['loop']:
+                        self.stdout.write(f'已同步 {alias} ← {databases[0]["NAME"]}')
+            finally:
+                source.close()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
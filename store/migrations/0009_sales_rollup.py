@@ -0,0 +1,85 @@
+# Generated by Django 4.2 on 2026-10-17 11:58
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+# 计入销售额的订单状态（迁移内固定一份，不随 store.rollup 改动）
+REVENUE_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+def backfill_rollup(apps, schema_editor):
+    # 由历史订单回填汇总表
+    Order = apps.get_model('store', 'Order')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    DailySales = apps.get_model('store', 'DailySales')
+    ProductDailySales = apps.get_model('store', 'ProductDailySales')
+
+    daily = (
+        Order.objects.filter(status__in=REVENUE_STATUSES)
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(order_count=Count('id'), total=Sum('total_amount'))
+        .order_by('day')
+    )
+    DailySales.objects.bulk_create([
+        DailySales(day=row['day'], order_count=row['order_count'], total_amount=row['total'])
+        for row in daily
+    ], batch_size=1000)
+
+    line_amount = ExpressionWrapper(
+        F('quantity') * F('unit_price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    per_product = (
+        OrderItem.objects.filter(order__status__in=REVENUE_STATUSES)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product_id', 'product__name')
+        .annotate(qty=Sum('quantity'), amount=Sum(line_amount))
+        .order_by('day')
+    )
+    ProductDailySales.objects.bulk_create([
+        ProductDailySales(
+            day=row['day'],
+            product_id=row['product_id'],
+            product_name=row['product__name'] or '',
+            quantity=row['qty'],
+            amount=row['amount'],
+        )
+        for row in per_product
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('product_name', models.CharField(max_length=200)),
+                ('quantity', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='store.product')),
+            ],
+            options={
+                'unique_together': {('day', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 12:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    # 一条 UPDATE 回填已有评论数
+    Product = apps.get_model('store', 'Product')
+    ProductComment = apps.get_model('store', 'ProductComment')
+    counts = (
+        ProductComment.objects.filter(product=OuterRef('pk'))
+        .values('product').annotate(n=Count('id')).values('n')
+    )
+    Product.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_stock_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productcomment',
+            index=models.Index(fields=['product', 'created_at', 'id'], name='store_comment_prod_idx'),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2 on 2026-10-17 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+USER_EMAIL_INDEX = 'store_auth_user_email_idx'
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # 合并同一用户同一商品的重复购物车行（数量相加，保留最早的一行）
+    CartItem = apps.get_model('store', 'CartItem')
+    duplicates = (
+        CartItem.objects.filter(user__isnull=False)
+        .values('user_id', 'product_id')
+        .annotate(n=Count('id'), keep=Min('id'), total=Sum('quantity'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        CartItem.objects.filter(pk=row['keep']).update(quantity=row['total'])
+        CartItem.objects.filter(
+            user_id=row['user_id'], product_id=row['product_id'],
+        ).exclude(pk=row['keep']).delete()
+
+
+def _user_email_index(apps):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    return User, models.Index(fields=['email'], name=USER_EMAIL_INDEX)
+
+
+def add_user_email_index(apps, schema_editor):
+    # auth_user 不属于本应用，无法在模型 Meta 中声明索引；登录 / 找回密码按邮箱精确查询
+    User, index = _user_email_index(apps)
+    schema_editor.add_index(User, index)
+
+
+def remove_user_email_index(apps, schema_editor):
+    User, index = _user_email_index(apps)
+    schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('store', '0013_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='store_order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='store_order_status_created_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='store_cart_user_product_uniq'),
+        ),
+        migrations.RunPython(add_user_email_index, remove_user_email_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-17 12:33
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+# 计入销量的订单状态（迁移内固定一份，不随 store.rollup 改动）
+REVENUE_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+def backfill_sales_count(apps, schema_editor):
+    # 由历史订单回填商品累计销量
+    Product = apps.get_model('store', 'Product')
+    OrderItem = apps.get_model('store', 'OrderItem')
+
+    sold = (
+        OrderItem.objects.filter(product_id=OuterRef('pk'), order__status__in=REVENUE_STATUSES)
+        .order_by()
+        .values('product_id')
+        .annotate(qty=Sum('quantity'))
+        .values('qty')
+    )
+    Product.objects.update(sales_count=Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sales_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_sales_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='store_prod_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['sales_count', 'id'], name='store_prod_sales_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock', 'price'], name='store_prod_stock_price_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-17 12:52
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_product_name(apps, schema_editor):
+    # 已有订单项取商品当前名称；商品已删除的订单项无从得知，留空
+    Product = apps.get_model('store', 'Product')
+    OrderItem = apps.get_model('store', 'OrderItem')
+
+    OrderItem.objects.filter(product__isnull=False).update(
+        product_name=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_facets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_product_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-17 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_sales_delta'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_prod_stock_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock', 'price', 'stock_shard_count'], name='store_prod_stock_price_sh_idx'),
+        ),
+    ]
@@ -2,23 +2,96 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .images import derivative_name
+
 class Product(models.Model):
+    # 商品编码，批量导入 / 导出以此为唯一键；手工添加的商品可以为空
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     stock = models.PositiveIntegerField(default=0)
+    # 库存分片数：0 表示不分片；分片后 stock 为定期汇总的展示值，见 store.inventory
+    stock_shard_count = models.PositiveSmallIntegerField(default=0, editable=False)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # 衍生图信息，由 store.images 在后台生成后写入
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # 评论数（冗余字段），评论增删时由 store.signals 维护
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # 累计销量（冗余字段，计入有效订单的件数），由 store.rollup 随销售汇总一起维护
+    sales_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # 列表页游标分页 (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='store_prod_created_id_idx'),
+            # 按价格 / 销量排序的游标分页（store.facets）
+            models.Index(fields=['price', 'id'], name='store_prod_price_id_idx'),
+            models.Index(fields=['sales_count', 'id'], name='store_prod_sales_id_idx'),
+            # 分面计数与「仅看有货」筛选：覆盖索引，聚合时不回表（分片商品另查 StockShard）
+            models.Index(fields=['stock', 'price', 'stock_shard_count'], name='store_prod_stock_price_sh_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    def _variant_urls(self, ext):
+        """
+        [(宽度, URL)]；衍生图尚未生成或已过期时返回空列表
+        """
+        v = self.image_variants or {}
+        if not self.image or v.get('source') != self.image.name:
+            return []
+        storage = self.image.storage
+        return [(w, storage.url(derivative_name(v['hash'], w, ext))) for w in v['widths']]
+
+    @property
+    def webp_srcset(self):
+        return ', '.join(f'{url} {w}w' for w, url in self._variant_urls('webp'))
+
+    @property
+    def jpeg_srcset(self):
+        return ', '.join(f'{url} {w}w' for w, url in self._variant_urls('jpg'))
+
+    @property
+    def thumbnail_url(self):
+        """
+        最小尺寸的 JPEG 衍生图，尚未生成时退回原图
+        """
+        urls = self._variant_urls('jpg')
+        if urls:
+            return urls[0][1]
+        return self.image.url if self.image else ''
+
+class StockShard(models.Model):
+    """
+    热门商品的库存分片
+    - 并发结算随机扣减不同分片，避免所有请求排队等待同一行锁
+    """
+    product = models.ForeignKey(Product, related_name='stock_shards', on_delete=models.CASCADE)
+    index = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'index')
+
+    def __str__(self):
+        return f'{self.product_id}#{self.index}: {self.stock}'
+
 class CartItem(models.Model):
     user = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # 同一用户同一商品只保留一行（get_or_create 依赖此约束防止并发重复插入），
+            # 同时作为 (user, product) / (user) 查询的索引
+            models.UniqueConstraint(fields=['user', 'product'], name='store_cart_user_product_uniq'),
+        ]
+
     def subtotal(self):
         return self.product.price * self.quantity
 
@@ -37,6 +110,16 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     confirm_code = models.CharField(max_length=64, blank=True)
 
+    class Meta:
+        indexes = [
+            # 后台订单列表游标分页 (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='store_order_created_id_idx'),
+            # 用户订单列表：按用户过滤后按 (created_at, id) 分页
+            models.Index(fields=['user', 'created_at', 'id'], name='store_order_user_created_idx'),
+            # 按状态 + 下单时间范围筛选（报表重建、明细导出）
+            models.Index(fields=['status', 'created_at'], name='store_order_status_created_idx'),
+        ]
+
     def __str__(self):
         if self.user:
             return f'Order {self.id} - {self.user.username}'
@@ -46,8 +129,17 @@ class Order(models.Model):
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    # 下单时的商品名称快照：商品删除后销售汇总仍按名称区分
+    product_name = models.CharField(max_length=200, blank=True, editable=False)
     quantity = models.PositiveIntegerField(default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def save(self, *args, **kwargs):
+        # 后台手工添加的订单项也记录名称快照（结算走 bulk_create，直接传入）
+        if not self.product_name and self.product_id is not None:
+            self.product_name = self.product.name
+        super().save(*args, **kwargs)
+
     @property
     def price(self):
         return self.unit_price
@@ -57,6 +149,10 @@ class OrderItem(models.Model):
         return self.unit_price * self.quantity
 
 class EmailVerification(models.Model):
+    """
+    旧版验证码表：验证码已改由 store.verification 存储，
+    遗留数据由 manage.py sweep_email_verifications 清理
+    """
     email = models.EmailField(unique=True)
     code = models.CharField(max_length=10)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -71,6 +167,110 @@ class ProductComment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # 详情页按商品取最新评论（游标分页）
+            models.Index(fields=['product', 'created_at', 'id'], name='store_comment_prod_idx'),
+        ]
+
     def __str__(self):
         return f'Comment by {self.user} on {self.product}'
 
+
+
+class ProductSearchToken(models.Model):
+    """
+    商品搜索倒排索引
+    - 每行记录「词元 → 商品」及其权重，由 store.search 维护
+    - 查询走 token 索引，替代 icontains 全表扫描
+    """
+    token = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, related_name='search_tokens', on_delete=models.CASCADE)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('token', 'product')
+
+    def __str__(self):
+        return f'{self.token} → {self.product_id}'
+
+
+class OutboundEmail(models.Model):
+    """
+    邮件发件箱
+    - 视图只负责写入，由 send_queued_mail 后台进程批量投递
+    - 失败后按指数退避重试，超过最大次数标记为 failed
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.TextField(help_text='收件人，逗号分隔')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # 后台进程按 (status, next_attempt_at) 取待发送邮件
+            models.Index(fields=['status', 'next_attempt_at'], name='store_outbox_due_idx'),
+        ]
+
+    def recipients(self):
+        return [addr for addr in self.to.split(',') if addr]
+
+    def __str__(self):
+        return f'{self.subject} → {self.to} ({self.status})'
+
+
+class SalesDelta(models.Model):
+    """
+    待计入销售汇总的订单变化（只追加）
+    - 下单、订单状态跨越「有效 / 无效」边界时在订单事务内插入一行，不更新汇总行
+    - 由 manage.py fold_sales_rollup 批量合并进汇总表后删除
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='+')
+    sign = models.SmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.order_id}: {self.sign:+d}'
+
+
+class DailySales(models.Model):
+    """
+    每日销售汇总（预聚合表）
+    - 下单、订单状态变化先记入 SalesDelta，由 store.rollup 批量合并
+    - 可用 manage.py rebuild_sales_rollup 从订单表全量重建
+    """
+    day = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.day}: {self.total_amount}'
+
+
+class ProductDailySales(models.Model):
+    """
+    商品每日销量汇总
+    - product_name 冗余保存，商品删除后报表仍可显示
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    product_name = models.CharField(max_length=200)
+    quantity = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('day', 'product')
+
+    def __str__(self):
+        return f'{self.day} {self.product_name}: {self.quantity}'
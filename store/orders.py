@@ -0,0 +1,185 @@
+"""
+订单状态流转
+
+- ALLOWED_TRANSITIONS 定义合法的状态迁移，所有修改订单状态的入口都应经过这里
+- transition：单个订单的状态迁移，比较并交换（CAS）：
+    UPDATE store_order SET status = 新状态 WHERE id = ? AND status = 原状态
+  只写 status 一列，不先读取订单、不加行锁；受影响行数为 0 即表示迁移未发生
+- bulk_transition：批量修改一组订单的状态（后台批量操作 / 发货批次）
+    * 先锁定候选订单，逐单校验迁移是否合法，不合法的记入失败列表
+    * 合法订单按批一条 UPDATE 写入，不逐单 save()
+    * 跨越「有效 / 无效」边界的订单一次性写入销售汇总的待合并记录
+    * 可选地为每个订单写入一封通知邮件（批量插入发件箱）
+"""
+from django.db import transaction
+
+from . import live, mail, rollup
+from .models import Order
+
+# 当前状态 → 允许迁移到的状态
+ALLOWED_TRANSITIONS = {
+    'pending': {'paid', 'cancelled'},
+    'paid': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+# 每批处理的订单数（受数据库单条语句参数个数限制）
+BATCH_SIZE = 500
+
+STATUS_LABELS = {
+    'pending': '待支付',
+    'paid': '已支付',
+    'shipped': '已发货',
+    'delivered': '已送达',
+    'cancelled': '已取消',
+}
+
+
+class TransitionError(ValueError):
+    pass
+
+
+class _Conflict(Exception):
+    pass
+
+
+def can_transition(old_status, new_status):
+    return new_status in ALLOWED_TRANSITIONS.get(old_status, ())
+
+
+def sources_for(new_status):
+    """
+    可以迁移到 new_status 的所有状态
+    """
+    return [old for old, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+
+def _check_status(new_status):
+    if new_status not in ALLOWED_TRANSITIONS:
+        raise TransitionError(f'未知订单状态：{new_status}')
+
+
+def transition(order_id, new_status, expected=None, **filters):
+    """
+    将订单迁移到 new_status，返回迁移前的状态；未发生迁移（订单不存在、
+    状态已被他人修改、不满足 filters）时返回 None
+    - expected：订单当前应处的状态；不传时依次尝试所有可迁移到 new_status 的状态
+    - filters：附加的 WHERE 条件，例如 user=request.user、confirm_code=code
+    - 非法迁移（未知状态，或 expected 不能迁移到 new_status）抛出 TransitionError
+    """
+    _check_status(new_status)
+    if expected is None:
+        candidates = sources_for(new_status)
+    elif can_transition(expected, new_status):
+        candidates = [expected]
+    else:
+        raise TransitionError(f'订单状态不能从 {expected} 变更为 {new_status}')
+
+    with transaction.atomic():
+        for old_status in candidates:
+            updated = Order.objects.filter(pk=order_id, status=old_status, **filters).update(status=new_status)
+            if updated:
+                break
+        else:
+            return None
+
+        # 跨越「有效 / 无效」边界时追加一行待合并记录，不需要读取订单
+        rollup.record_status_change(Order(pk=order_id), old_status, new_status)
+        live.orders_changed([order_id])
+    return old_status
+
+
+class BulkResult:
+    """
+    批量操作结果：updated 为成功的订单 id，failed 为 {订单 id: 失败原因}
+    """
+
+    def __init__(self):
+        self.updated = []
+        self.failed = {}
+
+    def as_dict(self):
+        return {
+            'updated': len(self.updated),
+            'failed': [{'id': pk, 'reason': reason} for pk, reason in sorted(self.failed.items())],
+        }
+
+
+def _notification(order, new_status):
+    label = STATUS_LABELS.get(new_status, new_status)
+    return (
+        f'您的订单 {order.id} 状态已更新：{label}',
+        f'您的订单 {order.id}（金额 {order.total_amount} 元）状态已更新为：{label}。',
+        [order.user.email],
+    )
+
+
+def _transition_batch(ids, new_status, notify, result):
+    with transaction.atomic():
+        orders = {
+            o.id: o
+            for o in Order.objects.select_for_update(of=('self',))
+            .filter(pk__in=ids)
+            .select_related('user')
+            .only('id', 'status', 'created_at', 'total_amount', 'user__email')
+        }
+
+        eligible = []
+        for pk in ids:
+            order = orders.get(pk)
+            if order is None:
+                result.failed[pk] = '订单不存在'
+            elif order.status == new_status:
+                result.failed[pk] = f'订单已是{STATUS_LABELS.get(new_status, new_status)}状态'
+            elif not can_transition(order.status, new_status):
+                result.failed[pk] = (
+                    f'不能从{STATUS_LABELS.get(order.status, order.status)}'
+                    f'变更为{STATUS_LABELS.get(new_status, new_status)}'
+                )
+            else:
+                eligible.append(order)
+        if not eligible:
+            return
+
+        # 行已锁定，条件中的状态只是兜底，受影响行数应与合法订单数一致
+        updated = Order.objects.filter(
+            pk__in=[o.id for o in eligible], status__in=sources_for(new_status),
+        ).update(status=new_status)
+        if updated != len(eligible):
+            raise _Conflict
+
+        # 销售汇总：只处理跨越「有效 / 无效」边界的订单
+        entering = [o for o in eligible if not rollup.is_revenue(o.status) and rollup.is_revenue(new_status)]
+        leaving = [o for o in eligible if rollup.is_revenue(o.status) and not rollup.is_revenue(new_status)]
+        rollup.queue_orders(entering, +1)
+        rollup.queue_orders(leaving, -1)
+
+        if notify:
+            mail.queue_many([
+                _notification(o, new_status) for o in eligible if o.user and o.user.email
+            ])
+
+        live.orders_changed(o.id for o in eligible)
+        result.updated.extend(o.id for o in eligible)
+
+
+def bulk_transition(order_ids, new_status, notify=False):
+    """
+    批量修改订单状态，返回 BulkResult
+    - order_ids：订单 id 列表（重复的 id 只处理一次）
+    - 每批一个事务，某一批失败不影响已提交的批次
+    """
+    _check_status(new_status)
+    ids = list(dict.fromkeys(int(pk) for pk in order_ids))
+    result = BulkResult()
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        try:
+            _transition_batch(batch, new_status, notify, result)
+        except _Conflict:
+            # 整批已回滚
+            for pk in batch:
+                result.failed.setdefault(pk, '订单状态被并发修改，请重试')
+    return result
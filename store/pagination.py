@@ -0,0 +1,230 @@
+"""
+游标（Keyset）分页
+
+- 按排序键 (如 created_at, id) 的取值定位下一页，不使用 OFFSET，
+  翻到第几页都只扫描 per_page + 1 行
+- 游标为排序键取值的 JSON 经 base64 编码后的字符串，可直接放进 URL
+- 页面对象惰性求值：模板片段命中缓存时不会触发数据库查询
+- 异步视图使用 apaginate，在返回前用异步 ORM 取出本页数据
+"""
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'k': [_encode_value(v) for v in values], 'd': direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标，返回 (取值列表, 方向)；非法游标抛出 ValueError
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, direction = payload['k'], payload['d']
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError('invalid cursor') from e
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise ValueError('invalid cursor')
+    return values, direction
+
+
+class KeysetPage:
+    """
+    一页数据
+    - 可直接在模板中迭代 / 判断真假
+    - next_cursor / prev_cursor 为 None 表示没有下一页 / 上一页
+    """
+
+    def __init__(self, loader, base_query=''):
+        self._loader = loader
+        self._loaded = False
+        self.base_query = base_query
+
+    def _load(self):
+        if not self._loaded:
+            self._rows, self._next, self._prev = self._loader()
+            self._loaded = True
+
+    @property
+    def object_list(self):
+        self._load()
+        return self._rows
+
+    @property
+    def next_cursor(self):
+        self._load()
+        return self._next
+
+    @property
+    def prev_cursor(self):
+        self._load()
+        return self._prev
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def as_dict(self):
+        """
+        供 JSON 接口使用的分页信息
+        """
+        return {
+            'next': self.next_cursor,
+            'previous': self.prev_cursor,
+        }
+
+
+class KeysetPaginator:
+    """
+    ordering 为排序键序列，最后一个键必须唯一（通常是 id），
+    每个键可单独指定升降序，例如 ('-created_at', '-id')、('price', 'id')
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [o.lstrip('-') for o in self.ordering]
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # 注解字段（如 search_score），原样使用
+            return value
+        try:
+            return field.to_python(value)
+        except ValidationError as e:
+            raise ValueError('invalid cursor') from e
+
+    def _seek(self, values, forward):
+        """
+        构造「位于游标之后 / 之前」的过滤条件：
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        for i, key in enumerate(self.ordering):
+            descending = key.startswith('-')
+            name = key.lstrip('-')
+            op = 'lt' if descending == forward else 'gt'
+            term = Q(**{f'{name}__{op}': values[i]})
+            for prev_name, prev_value in zip(self.fields[:i], values[:i]):
+                term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
+
+    def _reversed_ordering(self):
+        return [o[1:] if o.startswith('-') else f'-{o}' for o in self.ordering]
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def _prepare(self, cursor):
+        """
+        解析游标并构造本页查询，返回 (查询集, 游标取值, 方向)
+        """
+        values, direction = None, 'n'
+        if cursor:
+            try:
+                raw, direction = decode_cursor(cursor)
+                if len(raw) != len(self.fields):
+                    raise ValueError('invalid cursor')
+                values = [self._to_python(n, v) for n, v in zip(self.fields, raw)]
+            except ValueError:
+                # 非法游标按第一页处理
+                values, direction = None, 'n'
+
+        qs = self.queryset
+        if direction == 'n':
+            if values is not None:
+                qs = qs.filter(self._seek(values, forward=True))
+            qs = qs.order_by(*self.ordering)
+        else:
+            qs = qs.filter(self._seek(values, forward=False))
+            qs = qs.order_by(*self._reversed_ordering())
+        return qs[:self.per_page + 1], values, direction
+
+    def _finish(self, rows, values, direction):
+        if direction == 'n':
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_next, has_prev = has_more, values is not None
+        else:
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next, has_prev = True, has_more
+
+        next_cursor = encode_cursor(self._key(rows[-1]), 'n') if rows and has_next else None
+        prev_cursor = encode_cursor(self._key(rows[0]), 'p') if rows and has_prev else None
+        return rows, next_cursor, prev_cursor
+
+    def _load(self, cursor):
+        qs, values, direction = self._prepare(cursor)
+        return self._finish(list(qs), values, direction)
+
+    def page(self, cursor=None, base_query=''):
+        return KeysetPage(lambda: self._load(cursor), base_query)
+
+    async def apage(self, cursor=None, base_query=''):
+        """
+        异步版本：立即用异步 ORM 取出本页数据，模板渲染时不再访问数据库
+        """
+        qs, values, direction = self._prepare(cursor)
+        result = self._finish([obj async for obj in qs], values, direction)
+        return KeysetPage(lambda: result, base_query)
+
+
+def _cursor_params(request):
+    params = request.GET.copy()
+    cursor = params.pop('cursor', [''])[-1]
+    params.pop('format', None)
+    return cursor, params.urlencode()
+
+
+def paginate(request, queryset, per_page, ordering=DEFAULT_ORDERING):
+    """
+    视图入口：从 request.GET['cursor'] 读取游标，返回惰性求值的 KeysetPage
+    - base_query 为去掉 cursor 后的其余查询参数，供模板拼接翻页链接
+    """
+    cursor, base_query = _cursor_params(request)
+    return KeysetPaginator(queryset, per_page, ordering).page(cursor, base_query)
+
+
+async def apaginate(request, queryset, per_page, ordering=DEFAULT_ORDERING):
+    """
+    异步视图入口，返回已取出数据的 KeysetPage
+    """
+    cursor, base_query = _cursor_params(request)
+    return await KeysetPaginator(queryset, per_page, ordering).apage(cursor, base_query)
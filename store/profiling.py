@@ -0,0 +1,289 @@
+"""
+请求性能采样
+
+- ProfilingMiddleware 按 PROFILING_SAMPLE_RATE 抽样请求，仅统计 store.views 中的视图：
+  总耗时、SQL 条数与耗时、模板渲染耗时（Django 模板与 Jinja2）、tracemalloc 峰值分配
+- tracemalloc 的峰值是进程级的，同一时刻只跟踪一个被采样请求；
+  与之重叠的其他采样请求不记录分配峰值（其余指标照常记录）
+- 样本保存在进程内（每个视图每项指标最多 PROFILING_MAX_SAMPLES 个），
+  并定期写入 PROFILING_DIR/profile-<pid>.json，供 dump_profile 命令合并各进程数据
+- 管理员可通过 /admin/profiling/ 查看当前进程的分位数统计
+- 同时支持同步与异步请求处理（ASGI 下不会把异步视图退化为线程执行）
+"""
+import contextlib
+import contextvars
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .bench import summarize
+
+METRICS = ('wall_ms', 'query_count', 'query_ms', 'render_ms', 'alloc_peak_kb')
+
+_current = contextvars.ContextVar('store_profile', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profile_dir():
+    return Path(_setting('PROFILING_DIR', Path(tempfile.gettempdir()) / 'shop-profiling'))
+
+
+class ProfileStore:
+    """
+    进程内样本存储（线程安全）
+    """
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: {m: deque(maxlen=self.max_samples) for m in METRICS})
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def record(self, view, sample):
+        """
+        sample 中取值为 None 的指标（本次未测量）不记录
+        """
+        with self._lock:
+            bucket = self._samples[view]
+            for metric in METRICS:
+                if sample[metric] is not None:
+                    bucket[metric].append(sample[metric])
+            self._pending += 1
+
+    def raw(self):
+        with self._lock:
+            return {
+                view: {m: list(values) for m, values in bucket.items()}
+                for view, bucket in self._samples.items()
+            }
+
+    def snapshot(self):
+        return summarize_raw(self.raw())
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._pending = 0
+
+    def maybe_flush(self, every, interval):
+        """
+        样本累计 every 个或距上次写入超过 interval 秒时，写入本进程的快照文件
+        """
+        with self._lock:
+            due = self._pending >= every or (
+                self._pending and time.monotonic() - self._last_flush >= interval
+            )
+            if not due:
+                return
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'profile-{os.getpid()}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.raw()))
+        os.replace(tmp, path)
+
+
+def summarize_raw(raw):
+    """
+    原始样本 → {视图: {'samples': n, 指标: {p50, p95, ...}}}
+    """
+    return {
+        view: {
+            'samples': len(metrics['wall_ms']),
+            **{m: summarize(values) for m, values in metrics.items()},
+        }
+        for view, metrics in sorted(raw.items())
+    }
+
+
+STORE = ProfileStore()
+
+
+class _RequestStats:
+    def __init__(self):
+        self.view = None
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.render_ms = 0.0
+
+
+# ----------------------
+# SQL 计数
+# ----------------------
+_cursor_patched = False
+
+
+def _patch_cursor_execute():
+    """
+    包装 CursorWrapper 执行 SQL 的入口，按 contextvar 找到当前被采样的请求
+    - 不依赖具体连接：异步视图的 ORM 调用在 sync_to_async 的工作线程中、用该线程自己的连接执行，
+      sync_to_async 会复制 contextvars，这些查询同样计入发起它们的请求
+    """
+    global _cursor_patched
+    if _cursor_patched:
+        return
+    from django.db.backends.utils import CursorWrapper
+
+    original = CursorWrapper._execute_with_wrappers
+
+    def _execute_with_wrappers(self, sql, params, many, executor):
+        stats = _current.get()
+        if stats is None:
+            return original(self, sql, params, many, executor)
+        start = time.perf_counter()
+        try:
+            return original(self, sql, params, many, executor)
+        finally:
+            stats.query_count += 1
+            stats.query_ms += (time.perf_counter() - start) * 1000
+
+    CursorWrapper._execute_with_wrappers = _execute_with_wrappers
+    _cursor_patched = True
+
+
+# ----------------------
+# 模板渲染计时
+# ----------------------
+_render_patched = False
+
+
+def _timed_render(original):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return original(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.render_ms += (time.perf_counter() - start) * 1000
+
+    return render
+
+
+def _patch_template_render():
+    """
+    包装 Django 模板与 Jinja2 后端的 Template.render，只在被采样的请求中计时
+    """
+    global _render_patched
+    if _render_patched:
+        return
+    from django.template.backends.django import Template
+
+    Template.render = _timed_render(Template.render)
+    try:
+        from django.template.backends.jinja2 import Template as Jinja2Template
+    except ImportError:  # 未安装 jinja2
+        pass
+    else:
+        Jinja2Template.render = _timed_render(Jinja2Template.render)
+    _render_patched = True
+
+
+# ----------------------
+# tracemalloc：同一时刻只跟踪一个被采样请求
+# ----------------------
+# reset_peak() 与峰值都是进程级的，并发跟踪时一个请求会清掉另一个请求的峰值，
+# 测得的结果既不是上界也不是下界；取不到锁的请求不测量分配
+_trace_lock = threading.Lock()
+
+
+def _trace_start():
+    """
+    开始跟踪，返回基线分配量；已有请求在跟踪时返回 None
+    """
+    if not _trace_lock.acquire(blocking=False):
+        return None
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _trace_stop(baseline):
+    try:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        _trace_lock.release()
+    return max(peak - baseline, 0) / 1024
+
+
+class ProfilingMiddleware:
+    """
+    放在 MIDDLEWARE 最前面，使总耗时覆盖其余中间件
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = _setting('PROFILING_SAMPLE_RATE', 0.01)
+        self.trace_alloc = _setting('PROFILING_TRACEMALLOC', True)
+        self.flush_every = _setting('PROFILING_FLUSH_EVERY', 100)
+        self.flush_interval = _setting('PROFILING_FLUSH_INTERVAL', 30)
+        self.view_module = _setting('PROFILING_VIEW_MODULE', 'store.views')
+        _patch_template_render()
+        _patch_cursor_execute()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        with self._profile():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        with self._profile():
+            return await self.get_response(request)
+
+    @contextlib.contextmanager
+    def _profile(self):
+        stats = _RequestStats()
+        token = _current.set(stats)
+        baseline = _trace_start() if self.trace_alloc else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            alloc_kb = _trace_stop(baseline) if baseline is not None else None
+            _current.reset(token)
+
+        if stats.view:
+            STORE.record(stats.view, {
+                'wall_ms': wall_ms,
+                'query_count': stats.query_count,
+                'query_ms': stats.query_ms,
+                'render_ms': stats.render_ms,
+                'alloc_peak_kb': alloc_kb,
+            })
+            STORE.maybe_flush(self.flush_every, self.flush_interval)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = _current.get()
+        if stats is not None and getattr(view_func, '__module__', '') == self.view_module:
+            stats.view = view_func.__name__
+        return None
@@ -0,0 +1,243 @@
+"""
+销售报表预聚合
+
+- DailySales / ProductDailySales 按天累计有效订单（已支付 / 已发货 / 已送达）
+- 下单、状态在「有效 ↔ 无效」之间变化时只在订单事务内追加一行 SalesDelta，
+  不更新当天汇总行与商品行（否则热门商品 / 当天汇总又成为结算的锁争用点）；
+  fold_pending（manage.py fold_sales_rollup）按批合并，报表与销量排序相应有几秒延迟
+- 订单删除时直接扣减已计入的部分
+- 报表视图只读汇总表，开销与天数相关，与订单数量无关
+- 同时维护 Product.sales_count（累计销量），供商品列表按销量排序
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from .models import DailySales, Order, OrderItem, Product, ProductDailySales, SalesDelta
+
+# 计入销售额的订单状态
+REVENUE_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+def is_revenue(status):
+    return status in REVENUE_STATUSES
+
+
+def _line_amount():
+    return ExpressionWrapper(
+        F('quantity') * F('unit_price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def _bump_day(day, count, amount):
+    DailySales.objects.bulk_create([DailySales(day=day)], ignore_conflicts=True)
+    DailySales.objects.filter(day=day).update(
+        order_count=F('order_count') + count,
+        total_amount=F('total_amount') + amount,
+    )
+
+
+def _line_key(day, line):
+    """
+    订单项所属的商品日汇总行：(日期, 商品 id, 名称)
+    - 商品存在时按商品 id 归并，名称取当前名称；已删除的商品按下单时的名称快照归并
+    """
+    if line['product_id'] is not None:
+        return day, line['product_id'], ''
+    return day, None, line['product_name']
+
+
+def _line_name(line):
+    return line['product__name'] or line['product_name'] or ''
+
+
+def _bump_product(day, product_id, name, quantity, amount):
+    if product_id is None:
+        # 商品已删除：按 (日期, 名称) 累计；唯一约束对 NULL 不生效，取最早的一行
+        row = (
+            ProductDailySales.objects.filter(day=day, product=None, product_name=name)
+            .order_by('pk').first()
+        ) or ProductDailySales.objects.create(day=day, product=None, product_name=name)
+        qs = ProductDailySales.objects.filter(pk=row.pk)
+    else:
+        ProductDailySales.objects.bulk_create(
+            [ProductDailySales(day=day, product_id=product_id, product_name=name)],
+            ignore_conflicts=True,
+        )
+        qs = ProductDailySales.objects.filter(day=day, product_id=product_id)
+    qs.update(
+        quantity=F('quantity') + quantity,
+        amount=F('amount') + amount,
+    )
+
+
+def apply_orders(orders, sign):
+    """
+    将一批订单按 sign（+1 / -1）计入或移出汇总表
+    - orders 需包含 id、created_at、total_amount
+    """
+    orders = list(orders)
+    if not orders:
+        return
+
+    day_of = {o.id: o.created_at.date() for o in orders}
+
+    days = defaultdict(lambda: [0, Decimal('0')])
+    for o in orders:
+        days[day_of[o.id]][0] += sign
+        days[day_of[o.id]][1] += sign * o.total_amount
+
+    lines = (
+        OrderItem.objects.filter(order_id__in=day_of)
+        .values('order_id', 'product_id', 'product__name', 'product_name')
+        .annotate(qty=Sum('quantity'), amount=Sum(_line_amount()))
+    )
+    products = defaultdict(lambda: [0, Decimal('0')])
+    sales = defaultdict(int)
+    names = {}
+    for line in lines:
+        key = _line_key(day_of[line['order_id']], line)
+        products[key][0] += sign * line['qty']
+        products[key][1] += sign * line['amount']
+        names[key] = _line_name(line)
+        if line['product_id'] is not None:
+            sales[line['product_id']] += sign * line['qty']
+
+    with transaction.atomic():
+        for day, (count, amount) in days.items():
+            _bump_day(day, count, amount)
+        for key, (qty, amount) in products.items():
+            day, product_id, _ = key
+            _bump_product(day, product_id, names[key], qty, amount)
+        # 按商品 id 顺序更新，并发结算时加锁顺序一致
+        for product_id, qty in sorted(sales.items()):
+            if qty:
+                Product.objects.filter(pk=product_id).update(sales_count=F('sales_count') + qty)
+
+
+def queue_orders(orders, sign):
+    """
+    记录一批订单待计入（+1）或移出（-1）汇总表：一条 INSERT，在调用方的事务内提交
+    """
+    SalesDelta.objects.bulk_create([SalesDelta(order_id=o.id, sign=sign) for o in orders])
+
+
+def record_order(order):
+    """
+    新订单写入后调用
+    """
+    if is_revenue(order.status):
+        queue_orders([order], +1)
+
+
+def record_status_change(order, old_status, new_status):
+    """
+    订单状态变化后调用；只有跨越「有效 / 无效」边界时才需要更新
+    """
+    if is_revenue(old_status) == is_revenue(new_status):
+        return
+    queue_orders([order], +1 if is_revenue(new_status) else -1)
+
+
+def remove_order(order):
+    """
+    订单删除前调用：扣减已计入汇总的部分（待合并的记录随订单级联删除）
+    """
+    pending = SalesDelta.objects.filter(order=order).aggregate(n=Sum('sign'))['n'] or 0
+    applied = int(is_revenue(order.status)) - pending
+    if applied:
+        apply_orders([order], -applied)
+
+
+def fold_pending(batch_size=1000):
+    """
+    将一批待合并记录计入汇总表并删除，返回处理的记录数
+    - 同一订单的多条记录先相加，一批内每天 / 每个商品只更新一次
+    """
+    with transaction.atomic():
+        deltas = list(
+            SalesDelta.objects.select_for_update(skip_locked=True)
+            .order_by('id').values_list('id', 'order_id', 'sign')[:batch_size]
+        )
+        if not deltas:
+            return 0
+        net = defaultdict(int)
+        for _, order_id, sign in deltas:
+            net[order_id] += sign
+        by_sign = defaultdict(list)
+        for order in Order.objects.filter(pk__in=[pk for pk, n in net.items() if n]).only(
+            'id', 'created_at', 'total_amount',
+        ):
+            by_sign[net[order.id]].append(order)
+        for sign, orders in sorted(by_sign.items()):
+            apply_orders(orders, sign)
+        SalesDelta.objects.filter(pk__in=[pk for pk, _, _ in deltas]).delete()
+    return len(deltas)
+
+
+def _rebuild(order_model, item_model, daily_model, product_daily_model):
+    daily_model.objects.all().delete()
+    product_daily_model.objects.all().delete()
+
+    daily = (
+        order_model.objects.filter(status__in=REVENUE_STATUSES)
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(order_count=Count('id'), total=Sum('total_amount'))
+        .order_by('day')
+    )
+    daily_model.objects.bulk_create([
+        daily_model(day=row['day'], order_count=row['order_count'], total_amount=row['total'])
+        for row in daily
+    ], batch_size=1000)
+
+    per_product = (
+        item_model.objects.filter(order__status__in=REVENUE_STATUSES)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product_id', 'product__name', 'product_name')
+        .annotate(qty=Sum('quantity'), amount=Sum(_line_amount()))
+        .order_by('day')
+    )
+    # 同一商品在不同名称快照下的行合并为一行，与增量维护的归并方式一致
+    rows = {}
+    for line in per_product:
+        key = _line_key(line['day'], line)
+        row = rows.get(key)
+        if row is None:
+            rows[key] = product_daily_model(
+                day=line['day'],
+                product_id=line['product_id'],
+                product_name=_line_name(line),
+                quantity=line['qty'],
+                amount=line['amount'],
+            )
+        else:
+            row.quantity += line['qty']
+            row.amount += line['amount']
+    product_daily_model.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+def _rebuild_sales_count(product_model, item_model):
+    sold = (
+        item_model.objects.filter(product_id=OuterRef('pk'), order__status__in=REVENUE_STATUSES)
+        .order_by()
+        .values('product_id')
+        .annotate(qty=Sum('quantity'))
+        .values('qty')
+    )
+    product_model.objects.update(sales_count=Coalesce(Subquery(sold), 0))
+
+
+def rebuild():
+    """
+    从订单表全量重建汇总表与商品销量（历史数据回填 / 数据修复）
+    """
+    with transaction.atomic():
+        # 全量结果已包含所有待合并的记录
+        SalesDelta.objects.all().delete()
+        _rebuild(Order, OrderItem, DailySales, ProductDailySales)
+        _rebuild_sales_count(Product, OrderItem)
@@ -0,0 +1,166 @@
+"""
+读写分离（主库 + 只读副本）
+
+- 写操作一律走主库（default）
+- 请求内的只读查询：商品目录、评论、订单历史、报表等 store 模型走 DATABASE_REPLICAS 中的副本
+  （随机选择）；会话、用户、购物车等需要读到最新数据的模型始终走主库
+- 以下情况读主库：
+    * 处于 transaction.atomic 事务中（事务内读写必须在同一连接上）
+    * 非 GET / HEAD 请求，或用 use_primary 标记的视图（结算、购物车修改）
+    * 读己之写：同一请求内发生写操作之后；用户发生写操作后 REPLICA_STICKY_SECONDS 秒内（Cookie 记录）
+- 请求之外（管理命令、后台 worker、shell）一律使用主库
+"""
+import contextlib
+import contextvars
+import functools
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'db_primary_until'
+
+# 允许读副本的模型（app_label.model_name 小写）
+REPLICA_MODELS = {
+    'store.product',
+    'store.productcomment',
+    'store.productsearchtoken',
+    'store.order',
+    'store.orderitem',
+    'store.dailysales',
+    'store.productdailysales',
+}
+
+
+class _RequestState:
+    def __init__(self, primary):
+        self.primary = primary
+        self.wrote = False
+
+
+_request = contextvars.ContextVar('store_db_request', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextlib.contextmanager
+def primary():
+    """
+    代码块内的读查询全部走主库
+    """
+    state = _request.get()
+    if state is None:
+        yield
+        return
+    old = state.primary
+    state.primary = True
+    try:
+        yield
+    finally:
+        state.primary = old
+
+
+def use_primary(view):
+    """
+    视图装饰器：整个视图只读写主库（支持同步 / 异步视图）
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with primary():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with primary():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request.get()
+        # 本请求已写过主库：之后的读取可能依赖刚写入的数据，副本可能尚未同步
+        if state is None or state.primary or state.wrote:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        if not aliases or model._meta.label_lower not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据，允许跨库关联（例如用副本读出的商品创建购物车行）
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 副本的表结构由主库复制而来
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    为每个请求决定是否读主库，并在发生写操作后下发 Cookie，
+    使该用户随后 REPLICA_STICKY_SECONDS 秒内的读取也走主库
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        try:
+            pinned = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        state = _RequestState(primary=pinned or request.method not in ('GET', 'HEAD'))
+        return state, _request.set(state)
+
+    def _finish(self, state, token, response):
+        _request.reset(token)
+        if state.wrote and replicas():
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + self.sticky_seconds:.3f}',
+                max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _request.reset(token)
+            raise
+        return self._finish(state, token, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            _request.reset(token)
+            raise
+        return self._finish(state, token, response)
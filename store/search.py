@@ -0,0 +1,157 @@
+"""
+商品全文检索（倒排索引）
+
+- 分词：英文/数字按单词切分；中文连续片段按「单字 + 二元组」切分，
+  无需额外分词词典即可支持任意中文子串查询
+- 与原先的 icontains 子串匹配不同，英文/数字只能整词命中：
+  「phone」「pho」都查不到「iphone」（前缀联想见 store.suggest）
+- 索引：ProductSearchToken 表，商品保存 / 删除时由信号自动维护
+- 排序：按命中词元的权重之和排序（名称权重高于描述）
+"""
+import re
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .models import Product, ProductSearchToken
+
+# 名称中的词元权重高于描述
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+# 与 ProductSearchToken.token 的 max_length 保持一致
+MAX_TOKEN_LENGTH = 64
+
+_RUN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+')
+
+
+def _is_cjk(run):
+    return not run[0].isascii()
+
+
+def _bigrams(run):
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def index_terms(text):
+    """
+    建索引用分词，返回 Counter(词元 → 出现次数)
+    - 中文同时写入单字与二元组，保证单字查询也能命中
+    """
+    terms = Counter()
+    for run in _RUN_RE.findall((text or '').lower()):
+        if _is_cjk(run):
+            terms.update(run)
+            terms.update(_bigrams(run))
+        else:
+            terms[run[:MAX_TOKEN_LENGTH]] += 1
+    return terms
+
+
+def query_terms(q):
+    """
+    查询用分词，返回去重后的词元集合
+    - 中文片段长度 ≥ 2 时只用二元组，避免单字带来的大量误命中
+    """
+    terms = set()
+    for run in _RUN_RE.findall((q or '').lower()):
+        if _is_cjk(run) and len(run) > 1:
+            terms.update(_bigrams(run))
+        else:
+            terms.add(run[:MAX_TOKEN_LENGTH])
+    return terms
+
+
+def token_weights(name, description):
+    """
+    计算单个商品的「词元 → 权重」
+    """
+    weights = Counter()
+    for term, n in index_terms(name).items():
+        weights[term] += n * NAME_WEIGHT
+    for term, n in index_terms(description).items():
+        weights[term] += n * DESCRIPTION_WEIGHT
+    return weights
+
+
+def _product_tokens(product):
+    return [
+        (term, product.pk, w)
+        for term, w in token_weights(product.name, product.description).items()
+    ]
+
+
+def _insert_tokens(rows, batch_size):
+    """
+    词元行数通常是商品数的十几倍，直接 executemany 插入，
+    省去逐行构造模型实例的开销（批量导入时差距明显）
+    """
+    meta = ProductSearchToken._meta
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(meta.get_field(f).column) for f in ('token', 'product', 'weight'))
+    sql = f'INSERT INTO {qn(meta.db_table)} ({columns}) VALUES (%s, %s, %s)'
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[i:i + batch_size])
+
+
+def index_products(products, batch_size=1000):
+    """
+    批量（重）建指定商品的索引：先删旧词元，再批量插入
+    """
+    products = list(products)
+    if not products:
+        return
+    with transaction.atomic():
+        ProductSearchToken.objects.filter(
+            product_id__in=[p.pk for p in products]
+        ).delete()
+        rows = []
+        for p in products:
+            rows.extend(_product_tokens(p))
+        _insert_tokens(rows, batch_size)
+
+
+def index_product(product):
+    index_products([product])
+
+
+def rebuild_index(batch_size=1000):
+    """
+    全量重建索引（数据迁移 / 批量导入后使用）
+    """
+    ProductSearchToken.objects.all().delete()
+    batch = []
+    for p in Product.objects.only('id', 'name', 'description').iterator(chunk_size=batch_size):
+        batch.append(p)
+        if len(batch) >= batch_size:
+            index_products(batch, batch_size=batch_size)
+            batch = []
+    index_products(batch, batch_size=batch_size)
+
+
+def search_products(q, queryset=None):
+    """
+    按关键词检索商品
+    - 所有查询词元都必须命中（AND 语义）
+    - 中文：包含查询子串的商品一定命中；二元组不要求相邻，偶有不连续出现的商品也会命中
+    - 英文/数字：按整词匹配，不再匹配单词内部的子串（「pho」查不到「iphone」）
+    - 结果带 search_score 注解，按相关度降序、上架时间降序排列
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    terms = query_terms(q)
+    if not terms:
+        return queryset.none()
+
+    return (
+        queryset.filter(search_tokens__token__in=terms)
+        .annotate(
+            search_score=Sum('search_tokens__weight'),
+            search_hits=Count('search_tokens__token', distinct=True),
+        )
+        .filter(search_hits=len(terms))
+        .order_by('-search_score', '-created_at', '-id')
+    )
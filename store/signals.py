@@ -0,0 +1,75 @@
+"""
+模型信号处理
+- 商品通过 ProductForm、后台 admin 保存或删除时，同步维护派生数据
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Order, Product, ProductComment
+from . import caching, images, rollup, search, suggest
+
+
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance, raw=False, **kwargs):
+    # 商品删除时索引行随外键级联删除，无需额外处理
+    if raw:
+        return
+    search.index_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def update_suggest_index(sender, instance, raw=False, **kwargs):
+    # 事务提交后再更新进程内联想索引，回滚的修改不会出现在联想结果中
+    if raw:
+        return
+    pk, name = instance.pk, instance.name
+    transaction.on_commit(lambda: suggest.products_changed([(pk, name)]))
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_suggest_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: suggest.products_changed(removed=[pk]))
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_rollup(sender, instance, **kwargs):
+    # 订单项此时尚未被级联删除，可以据此扣减汇总
+    rollup.remove_order(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    caching.invalidate_product(instance.pk)
+
+
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+def invalidate_comment_cache(sender, instance, **kwargs):
+    # 评论只出现在详情页，不影响列表页
+    caching.invalidate_product(instance.product_id, catalog=False)
+
+
+@receiver(post_save, sender=ProductComment)
+def increment_comment_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Product.objects.filter(pk=instance.product_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=ProductComment)
+def decrement_comment_count(sender, instance, **kwargs):
+    # 商品删除级联删除评论时，商品行已不存在，UPDATE 不影响任何行
+    Product.objects.filter(pk=instance.product_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1,
+    )
+
+
+@receiver(post_save, sender=Product)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    # 新上传或更换图片后，事务提交时再交给进程池生成衍生图
+    if raw or not images.needs_variants(instance):
+        return
+    transaction.on_commit(lambda: images.schedule(instance))
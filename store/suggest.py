@@ -0,0 +1,335 @@
+"""
+搜索框联想（输入即提示）
+
+- 进程内前缀索引：按检索键排好序的数组（keys）+ 对应商品销量名次数组，
+  bisect 定位前缀区间，不访问数据库
+- 排序：前缀区间内的商品按销量名次（构建时的顺序）排列，热门商品排在前面；
+  一两个字符的前缀区间很大，预先保存其前 HEAD_SIZE 个商品；更长的前缀只比较区间前
+  MAX_CANDIDATES 个检索键（区间更大时结果为近似排序）
+- 检索键：商品名称规范化（小写，只保留字母、数字、汉字）；中文名称另加全拼与首字母
+  （pypinyin，见 requirements.txt），例如「苹果手机」→ pingguoshouji、pgsj
+- 增量维护：商品保存 / 删除（store.signals）与批量导入（store.catalog_io）提交后更新本进程索引；
+  其他进程的修改不经过本进程，索引每 SUGGEST_REFRESH_INTERVAL 秒在后台线程全量重建，
+  重建期间旧索引继续提供服务
+- 内存有上限：检索键截断为 MAX_KEY_LENGTH 个字符，最多收录 SUGGEST_MAX_PRODUCTS 个商品（销量优先）；
+  100 万商品名的内存占用见 manage.py bench_suggest
+"""
+import bisect
+import heapq
+import logging
+import sys
+import threading
+import time
+from array import array
+
+from django.conf import settings
+
+from .search import _RUN_RE, _is_cjk
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 未安装时只按名称前缀匹配（requirements.txt 中已列出）
+    lazy_pinyin = None
+
+logger = logging.getLogger(__name__)
+
+# 检索键最大长度（更长的前缀按前 MAX_KEY_LENGTH 个字符匹配）
+MAX_KEY_LENGTH = 24
+# 预存头部列表的前缀长度与列表长度（单次联想最多返回 HEAD_SIZE 条）
+HEAD_LENGTH = 2
+HEAD_SIZE = 20
+# 更长的前缀单次查询最多比较的检索键数
+MAX_CANDIDATES = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize(text):
+    return ''.join(_RUN_RE.findall((text or '').lower()))[:MAX_KEY_LENGTH]
+
+
+def index_keys(name):
+    """
+    商品名称的检索键集合
+    """
+    keys = {normalize(name)}
+    if lazy_pinyin is not None and any(_is_cjk(run) for run in _RUN_RE.findall(name.lower())):
+        keys.add(normalize(''.join(lazy_pinyin(name))))
+        keys.add(normalize(''.join(lazy_pinyin(name, style=Style.FIRST_LETTER))))
+    keys.discard('')
+    return keys
+
+
+class SuggestIndex:
+    """
+    有序数组实现的前缀索引；读写都在锁内进行，单次修改为一次 bisect 加一次数组插入 / 删除
+    - 商品以销量名次（rank，越小越靠前）标识：_key_ranks 与 _keys 一一对应，_pks 由名次找回商品 id
+    - 不超过 HEAD_LENGTH 个字符的前缀区间很大，预先保存其前 HEAD_SIZE 个名次（_heads）；
+      删除商品后不完整的头部列表在下次查询时重新计算
+    """
+
+    def __init__(self, max_products=None):
+        self.max_products = max_products
+        self._keys = []
+        self._key_ranks = array('q')
+        # 商品 id → 名称（返回结果用）
+        self._names = {}
+        # 商品 id ↔ 名次；构建后新增的商品排在已有商品之后
+        self._ranks = {}
+        self._pks = {}
+        self._next_rank = 0
+        # 短前缀 → 升序的前 HEAD_SIZE 个名次
+        self._heads = {}
+        self._stale_heads = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, rows, max_products=None):
+        """
+        由 (商品 id, 名称) 序列批量构建（rows 按销量降序）：先收集再整体排序，比逐个插入快得多
+        """
+        index = cls(max_products)
+        keys, ranks = [], []
+        heads = index._heads
+        for pk, name in rows:
+            if max_products and len(index._names) >= max_products:
+                break
+            rank = len(index._ranks)
+            index._names[pk] = name
+            index._ranks[pk] = rank
+            index._pks[rank] = pk
+            for key in index_keys(name):
+                keys.append(key)
+                ranks.append(rank)
+                # 按名次顺序处理，追加即保持升序
+                for prefix in _head_prefixes(key):
+                    head = heads.setdefault(prefix, [])
+                    if len(head) < HEAD_SIZE and (not head or head[-1] != rank):
+                        head.append(rank)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        index._keys = [keys[i] for i in order]
+        index._key_ranks = array('q', (ranks[i] for i in order))
+        index._next_rank = len(index._ranks)
+        return index
+
+    def __len__(self):
+        return len(self._names)
+
+    def _remove(self, pk):
+        name = self._names.pop(pk, None)
+        if name is None:
+            return
+        rank = self._ranks.pop(pk)
+        del self._pks[rank]
+        for key in index_keys(name):
+            i = bisect.bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._key_ranks[i] == rank:
+                    del self._keys[i]
+                    del self._key_ranks[i]
+                    break
+                i += 1
+            for prefix in _head_prefixes(key):
+                head = self._heads.get(prefix)
+                if head and rank in head:
+                    head.remove(rank)
+                    # 列表原本是满的：区间内排在其后的商品需要补进来
+                    if len(head) == HEAD_SIZE - 1:
+                        self._stale_heads.add(prefix)
+
+    def _add(self, pk, name, rank=None):
+        if self.max_products and len(self._names) >= self.max_products:
+            # 已满：新商品等下次全量重建时按销量参与排名
+            return
+        if rank is None:
+            rank, self._next_rank = self._next_rank, self._next_rank + 1
+        self._names[pk] = name
+        self._ranks[pk] = rank
+        self._pks[rank] = pk
+        for key in index_keys(name):
+            i = bisect.bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._key_ranks.insert(i, rank)
+            for prefix in _head_prefixes(key):
+                head = self._heads.setdefault(prefix, [])
+                if rank not in head:
+                    i = bisect.bisect_left(head, rank)
+                    if i < HEAD_SIZE:
+                        head.insert(i, rank)
+                        del head[HEAD_SIZE:]
+
+    def update(self, products=(), removed=()):
+        """
+        products 为 (商品 id, 名称)：新增或改名；removed 为已删除的商品 id
+        """
+        with self._lock:
+            for pk in removed:
+                self._remove(pk)
+            for pk, name in products:
+                if self._names.get(pk) != name:
+                    # 改名保留原有名次
+                    rank = self._ranks.get(pk)
+                    self._remove(pk)
+                    self._add(pk, name, rank)
+
+    def _range(self, prefix):
+        # 前缀区间 [start, end)：上界为最后一个字符加一
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        start = bisect.bisect_left(self._keys, prefix)
+        return start, bisect.bisect_left(self._keys, upper, start)
+
+    def _top_ranks(self, start, end, n):
+        # 每个商品最多 3 个检索键，取 3n 个最小名次足以去重后得到 n 个商品
+        return sorted(set(heapq.nsmallest(n * 3, self._key_ranks[start:end])))[:n]
+
+    def _head(self, prefix):
+        if prefix in self._stale_heads:
+            self._heads[prefix] = self._top_ranks(*self._range(prefix), HEAD_SIZE)
+            self._stale_heads.discard(prefix)
+        return self._heads.get(prefix, [])
+
+    def lookup(self, q, limit=10):
+        """
+        返回 [(商品 id, 名称)]，按销量名次排列，同一商品只出现一次
+        - 短前缀取预存的头部列表；较长的前缀只比较区间前 MAX_CANDIDATES 个检索键
+        """
+        prefix = normalize(q)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            if len(prefix) <= HEAD_LENGTH and limit <= HEAD_SIZE:
+                ranks = self._head(prefix)[:limit]
+            else:
+                start, end = self._range(prefix)
+                ranks = self._top_ranks(start, min(end, start + MAX_CANDIDATES), limit)
+            return [(self._pks[r], self._names[self._pks[r]]) for r in ranks]
+
+    def memory_usage(self):
+        """
+        索引占用的内存（字节，近似值）：数组本身 + 检索键与名称字符串 + 名称、名次字典 + 短前缀头部列表
+        """
+        with self._lock:
+            size = sys.getsizeof(self._keys) + sys.getsizeof(self._key_ranks) + sys.getsizeof(self._names)
+            size += sys.getsizeof(self._ranks) + sys.getsizeof(self._pks)
+            size += sum(sys.getsizeof(r) for r in self._ranks.values())
+            size += sum(sys.getsizeof(k) for k in self._keys)
+            size += sum(sys.getsizeof(pk) + sys.getsizeof(name) for pk, name in self._names.items())
+            size += sys.getsizeof(self._heads)
+            size += sum(sys.getsizeof(p) + sys.getsizeof(h) for p, h in self._heads.items())
+        return size
+
+
+def _head_prefixes(key):
+    return {key[:n] for n in range(1, HEAD_LENGTH + 1)}
+
+
+# ----------------------
+# 本进程的索引
+# ----------------------
+_index = None
+_built_at = 0.0
+# _state_lock 只保护上面的状态与下面的待补修改，持有时间很短；首次构建由 _build_lock 串行化，
+# 构建期间不持有 _state_lock，products_changed 不会被阻塞
+_state_lock = threading.Lock()
+_build_lock = threading.Lock()
+_rebuilding = False
+# 构建 / 后台重建期间发生的修改，新索引构建完成后补上
+_pending_products = {}
+_pending_removed = set()
+
+
+def _load():
+    from django.db import close_old_connections
+
+    from .models import Product
+
+    close_old_connections()
+    rows = (
+        Product.objects.order_by('-sales_count', '-id')
+        .values_list('id', 'name')
+        .iterator(chunk_size=10000)
+    )
+    return SuggestIndex.build(rows, _setting('SUGGEST_MAX_PRODUCTS', None))
+
+
+def _install(index):
+    """
+    补上构建期间的修改后换入新索引
+    """
+    global _index, _built_at
+    with _state_lock:
+        index.update(_pending_products.items(), _pending_removed)
+        _pending_products.clear()
+        _pending_removed.clear()
+        _index, _built_at = index, time.monotonic()
+
+
+def _rebuild():
+    global _rebuilding
+    try:
+        _install(_load())
+    except Exception:
+        logger.exception('suggest index rebuild failed')
+    finally:
+        from django.db import connection
+
+        connection.close()
+        with _state_lock:
+            _rebuilding = False
+
+
+def current_index():
+    """
+    已构建的索引（过期时在后台线程重建）；尚未构建时返回 None
+    """
+    global _rebuilding
+    interval = _setting('SUGGEST_REFRESH_INTERVAL', 600)
+    if _index is not None and interval and time.monotonic() - _built_at > interval:
+        with _state_lock:
+            start, _rebuilding = not _rebuilding, True
+        if start:
+            threading.Thread(target=_rebuild, name='suggest-rebuild', daemon=True).start()
+    return _index
+
+
+def get_index():
+    """
+    取得索引，尚未构建时在当前线程构建（同步，访问数据库）
+    """
+    global _rebuilding
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                # 构建期间的修改记入待补队列（见 products_changed）
+                with _state_lock:
+                    _rebuilding = True
+                try:
+                    _install(_load())
+                finally:
+                    with _state_lock:
+                        _rebuilding = False
+    return current_index()
+
+
+def products_changed(products=(), removed=()):
+    """
+    商品新增 / 改名（(id, 名称) 序列）或删除（id 序列）后调用；索引尚未开始构建时忽略
+    """
+    products, removed = list(products), list(removed)
+    with _state_lock:
+        if _rebuilding:
+            for pk in removed:
+                _pending_products.pop(pk, None)
+                _pending_removed.add(pk)
+            for pk, name in products:
+                _pending_removed.discard(pk)
+                _pending_products[pk] = name
+        index = _index
+    if index is not None:
+        index.update(products, removed)
+
+
+def suggest(q, limit=10):
+    return get_index().lookup(q, limit)
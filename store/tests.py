@@ -0,0 +1,1098 @@
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail as django_mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    bench, checkout, exports, facets, images, inventory, live, mail, pagination, profiling, rollup, routers, search,
+    suggest, verification,
+)
+from .management.commands import loadtest
+from .management.commands.check_query_plans import _full_scans, hot_queries
+from .models import (
+    CartItem, DailySales, Order, OrderItem, OutboundEmail, Product, ProductComment, ProductDailySales,
+    SalesDelta, StockShard,
+)
+from .routers import ReplicaRouter
+
+# 测试默认不采样，避免 tracemalloc 等开销影响其他用例
+NO_PROFILING = override_settings(PROFILING_SAMPLE_RATE=0)
+
+
+def _products(n, **kwargs):
+    return [
+        Product.objects.create(name=f'测试商品 {i}', price=Decimal('19.90'), stock=10, **kwargs)
+        for i in range(n)
+    ]
+
+
+@NO_PROFILING
+class AsyncCatalogViewTests(TestCase):
+    """
+    商品列表、商品详情与验证码接口为异步视图（ASGI 下不占用工作线程）
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+
+    async def test_product_list_and_detail(self):
+        product = await Product.objects.acreate(name='异步商品', price=Decimal('9.90'), stock=3)
+        await ProductComment.objects.acreate(product=product, content='不错')
+
+        response = await self.client.get(reverse('product_list'))
+        self.assertContains(response, '异步商品')
+
+        response = await self.client.get(reverse('product_list'), {'format': 'json'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [product.pk])
+
+        response = await self.client.get(reverse('product_detail', args=[product.pk]))
+        self.assertContains(response, '不错')
+
+        response = await self.client.get(reverse('product_detail', args=[product.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_product_detail_for_logged_in_user(self):
+        # 会话与用户在渲染线程中加载，事件循环中访问会抛出 SynchronousOnlyOperation
+        product = await Product.objects.acreate(name='异步商品', price=Decimal('9.90'), stock=3)
+        user = await User.objects.acreate(username='async-buyer')
+        await sync_to_async(self.client.force_login)(user)
+
+        response = await self.client.get(reverse('product_detail', args=[product.pk]))
+        self.assertContains(response, '你好，async-buyer')
+
+    async def test_send_code_queues_mail(self):
+        response = await self.client.get(reverse('send_code'), {'email': 'a@example.com'})
+        self.assertEqual(response.json()['status'], 'ok')
+        self.assertEqual(await OutboundEmail.objects.filter(to='a@example.com').acount(), 1)
+        self.assertEqual(len(django_mail.outbox), 0)
+
+        # 同一邮箱 60 秒内再次请求被限流，不再写入发件箱
+        response = await self.client.get(reverse('send_code'), {'email': 'a@example.com'})
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(await OutboundEmail.objects.acount(), 1)
+
+
+@override_settings(
+    PROFILING_SAMPLE_RATE=1.0,
+    PROFILING_TRACEMALLOC=False,
+    PROFILING_FLUSH_EVERY=10 ** 6,
+    PROFILING_DIR=tempfile.gettempdir(),
+)
+class ProfilingQueryCountTests(TestCase):
+    """
+    采样中间件的 SQL 计数覆盖异步视图在工作线程中执行的查询
+    """
+
+    def setUp(self):
+        cache.clear()
+        profiling.STORE.clear()
+        _products(3)
+
+    def _query_counts(self, view):
+        return profiling.STORE.raw()[view]['query_count']
+
+    async def test_async_view_queries_are_counted(self):
+        client = AsyncClient()
+        await client.get(reverse('product_list'))
+        product = await Product.objects.afirst()
+        await client.get(reverse('product_detail', args=[product.pk]))
+
+        self.assertGreater(self._query_counts('product_list')[-1], 0)
+        self.assertGreater(self._query_counts('product_detail')[-1], 0)
+
+    def test_sync_view_queries_are_counted(self):
+        self.client.force_login(User.objects.create_user('p', 'p@example.com', 'pw'))
+        self.client.get(reverse('cart'))
+        self.assertGreater(self._query_counts('cart_view')[-1], 0)
+
+    def test_jinja2_render_is_timed(self):
+        from django.template.backends.jinja2 import Jinja2
+
+        profiling._patch_template_render()
+        engine = Jinja2({'NAME': 'jinja2', 'DIRS': [], 'APP_DIRS': False, 'OPTIONS': {}})
+        stats = profiling._RequestStats()
+        token = profiling._current.set(stats)
+        try:
+            engine.from_string('{% for i in range(1000) %}{{ i }}{% endfor %}').render({})
+        finally:
+            profiling._current.reset(token)
+        self.assertGreater(stats.render_ms, 0)
+
+
+class TracemallocSamplingTests(SimpleTestCase):
+    """
+    tracemalloc 的峰值是进程级的：同一时刻只跟踪一个请求，重叠的请求不记录分配峰值
+    """
+
+    def test_overlapping_requests_are_not_traced(self):
+        baseline = profiling._trace_start()
+        self.assertIsNotNone(baseline)
+        try:
+            self.assertIsNone(profiling._trace_start())
+        finally:
+            profiling._trace_stop(baseline)
+
+        baseline = profiling._trace_start()
+        self.assertIsNotNone(baseline)
+        self.assertGreaterEqual(profiling._trace_stop(baseline), 0)
+
+    def test_unmeasured_metrics_are_not_recorded(self):
+        store = profiling.ProfileStore()
+        sample = {'wall_ms': 5.0, 'query_count': 2, 'query_ms': 1.0, 'render_ms': 0.5}
+        store.record('v', {**sample, 'alloc_peak_kb': 12.0})
+        store.record('v', {**sample, 'alloc_peak_kb': None})
+
+        stats = store.snapshot()['v']
+        self.assertEqual(stats['samples'], 2)
+        self.assertEqual(stats['alloc_peak_kb']['n'], 1)
+        self.assertEqual(stats['alloc_peak_kb']['max'], 12.0)
+
+
+
+@NO_PROFILING
+class QueryBudgetTests(TestCase):
+    """
+    各页面的 SQL 条数固定，不随商品、购物车、订单、评论数量增长（无 N+1 查询）
+    - 条数含会话与当前用户各 1 条；片段缓存清空后测量（未命中缓存的最坏情况）
+    """
+    BUDGETS = {
+        'product_list': 4,
+        'product_detail': 4,
+        'cart': 3,
+        'order_list': 4,
+        'admin_orders': 3,
+    }
+
+    def _seed(self, n):
+        user = User.objects.create_superuser(f'budget{n}', f'budget{n}@example.com', 'pw')
+        products = _products(n)
+        for p in products:
+            CartItem.objects.create(user=user, product=p, quantity=2)
+            ProductComment.objects.create(product=products[0], user=user, content='评论')
+        for _ in range(n):
+            order = Order.objects.create(user=user, total_amount=Decimal('57.00'), status='paid')
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=p, quantity=1, unit_price=p.price) for p in products[:3]
+            ])
+        return user, products
+
+    def test_query_counts_do_not_grow_with_data(self):
+        for n in (3, 15):
+            user, products = self._seed(n)
+            self.client.force_login(user)
+            pages = {
+                'product_list': reverse('product_list'),
+                'product_detail': reverse('product_detail', args=[products[0].pk]),
+                'cart': reverse('cart'),
+                'order_list': reverse('order_list'),
+                'admin_orders': reverse('admin_orders'),
+            }
+            for name, url in pages.items():
+                with self.subTest(rows=n, page=name):
+                    cache.clear()
+                    with self.assertNumQueries(self.BUDGETS[name]):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_checkout_and_cart_update_do_not_grow_with_cart(self):
+        # 多商品购物车，第一个商品开启库存分片（检查库存时多一条分片汇总查询）
+        for n in (3, 15):
+            user = User.objects.create_user(f'buyer{n}', f'buyer{n}@example.com', 'pw')
+            products = _products(n)
+            inventory.enable_sharding(products[0], 2)
+            items = [CartItem.objects.create(user=user, product=p, quantity=2) for p in products]
+            self.client.force_login(user)
+
+            with self.subTest(rows=n, view='checkout'):
+                with self.assertNumQueries(4):
+                    response = self.client.get(reverse('checkout'))
+                self.assertEqual(response.status_code, 200)
+            for added, (item, budget) in enumerate(((items[0], 6), (items[1], 5)), 1):
+                with self.subTest(rows=n, view='update_cart_quantity', sharded=item is items[0]):
+                    with self.assertNumQueries(budget):
+                        response = self.client.post(
+                            reverse('update_cart_quantity'), {'cart_id': item.pk, 'quantity': 3},
+                        )
+                    self.assertEqual(Decimal(response.json()['total']), Decimal('19.90') * (2 * n + added))
+            with self.subTest(rows=n, view='checkout POST'):
+                # 含事务内的扣库存、分片扣减、订单 / 订单项写入、清空购物车与销售汇总待合并记录
+                with self.assertNumQueries(14):
+                    response = self.client.post(reverse('checkout'), {'address': '地址'})
+                self.assertRedirects(response, reverse('order_success'), fetch_redirect_response=False)
+                self.assertEqual(OrderItem.objects.filter(order__user=user).count(), n)
+
+    def test_product_list_cache_hit_skips_catalog_queries(self):
+        user, _ = self._seed(3)
+        self.client.force_login(user)
+        cache.clear()
+        for params in ({}, {'price': '0-50', 'in_stock': '1'}):
+            with self.subTest(params=params):
+                self.client.get(reverse('product_list'), params)
+                # 网格与分面片段均命中缓存：只剩会话与当前用户两条查询
+                with self.assertNumQueries(2):
+                    response = self.client.get(reverse('product_list'), params)
+                self.assertContains(response, '测试商品 0')
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    游标分页：前后翻页不重不漏（排序键相同的行按 id 区分），非法游标回到第一页
+    """
+
+    def setUp(self):
+        products = _products(7)
+        # 上架时间两两相同，只能靠 id 区分先后
+        for i, p in enumerate(products):
+            Product.objects.filter(pk=p.pk).update(created_at=datetime.datetime(2026, 1, 1 + i // 2))
+        self.expected = list(Product.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def _walk(self, page, attr):
+        pages = [[p.pk for p in page]]
+        while getattr(page, attr) is not None:
+            page = pagination.KeysetPaginator(Product.objects.all(), 3).page(getattr(page, attr))
+            pages.append([p.pk for p in page])
+        return pages, page
+
+    def test_forward_and_backward_cover_all_rows(self):
+        paginator = pagination.KeysetPaginator(Product.objects.all(), 3)
+        first = paginator.page()
+        self.assertFalse(first.has_previous)
+        pages, last = self._walk(first, 'next_cursor')
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+
+        back, _ = self._walk(last, 'prev_cursor')
+        self.assertEqual(back[::-1], pages)
+        self.assertEqual([p.pk for p in paginator.page('not-a-cursor')], self.expected[:3])
+
+    def test_json_exposes_cursors(self):
+        url = reverse('product_list')
+        with mock.patch('store.views.PRODUCTS_PER_PAGE', 4):
+            first = self.client.get(url, {'format': 'json'}).json()
+            second = self.client.get(url, {'format': 'json', 'cursor': first['next']}).json()
+        self.assertIsNone(first['previous'])
+        self.assertIsNone(second['next'])
+        self.assertEqual([r['id'] for r in first['results'] + second['results']], self.expected)
+
+
+class QueryPlanTests(TestCase):
+    """
+    热点查询的执行计划中不能出现全表扫描（与 manage.py check_query_plans 使用同一份清单）
+    """
+
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor == 'postgresql':
+            # 小表上 PostgreSQL 会倾向顺序扫描，关闭后检查是否存在可用索引（TestCase 事务内有效）
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, qs in hot_queries():
+            with self.subTest(query=name):
+                plan = qs.explain(format='JSON') if connection.vendor == 'mysql' else qs.explain()
+                self.assertEqual(_full_scans(plan, connection.vendor), [], plan)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    读写分离路由：GET 请求内的目录 / 订单读取走副本，写过主库之后改读主库
+    """
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.token = routers._request.set(routers._RequestState(primary=False))
+        self.addCleanup(routers._request.reset, self.token)
+
+    def test_reads_go_to_replica_until_request_writes(self):
+        self.assertEqual(self.router.db_for_read(Order), 'replica1')
+        self.assertEqual(self.router.db_for_read(CartItem), 'default')
+
+        self.assertEqual(self.router.db_for_write(Order), 'default')
+        self.assertEqual(self.router.db_for_read(Order), 'default')
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_reads_outside_requests_use_primary(self):
+        routers._request.set(None)
+        self.assertEqual(self.router.db_for_read(Order), 'default')
+
+
+@override_settings(VERIFICATION_EMAIL_RATE=(1, 60), VERIFICATION_IP_RATE=(1, 600))
+class VerificationRateLimitTests(SimpleTestCase):
+    """
+    验证码发送限流：被 IP 限流拒绝的请求不消耗邮箱的令牌
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_ip_limit_does_not_spend_email_bucket(self):
+        self.assertIsNotNone(verification.issue_code('a@example.com', ip='10.0.0.1')[0])
+        self.assertEqual(verification.issue_code('b@example.com', ip='10.0.0.1'), (None, 'ip'))
+
+        # b@example.com 的令牌未被上一次请求消耗，换个 IP 仍可立即发送
+        self.assertIsNotNone(verification.issue_code('b@example.com', ip='10.0.0.2')[0])
+        self.assertEqual(verification.issue_code('b@example.com', ip='10.0.0.3'), (None, 'email'))
+
+
+class MailOutboxTests(TestCase):
+    """
+    发件箱：后台进程复用一个连接批量投递，失败按指数退避重试，超过次数标记为 failed
+    """
+
+    def test_delivers_queued_mail_in_one_batch(self):
+        mail.queue_many([(f'主题 {i}', '正文', [f'u{i}@example.com']) for i in range(3)])
+        out = io.StringIO()
+        call_command('send_queued_mail', stdout=out)
+        self.assertIn('已发送 3 封', out.getvalue())
+        self.assertEqual(sorted(m.to[0] for m in django_mail.outbox), [f'u{i}@example.com' for i in range(3)])
+        self.assertEqual(set(OutboundEmail.objects.values_list('status', 'attempts')), {('sent', 1)})
+        self.assertEqual(mail.deliver_pending(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        msg = mail.queue_mail('主题', '正文', ['bad@example.com'])
+        with mock.patch('store.mail.EmailMessage.send', side_effect=OSError('refused')), \
+                self.assertLogs('store.mail', 'WARNING'):
+            self.assertEqual(mail.deliver_pending(), (0, 1))
+            msg.refresh_from_db()
+            self.assertEqual((msg.status, msg.attempts, msg.last_error), ('pending', 1, 'refused'))
+            self.assertGreater(msg.next_attempt_at, timezone.now() + mail.backoff(1) - datetime.timedelta(seconds=5))
+            # 退避期间不会被再次领取
+            self.assertEqual(mail.deliver_pending(), (0, 0))
+
+            for attempts in range(2, mail.MAX_ATTEMPTS + 1):
+                OutboundEmail.objects.filter(pk=msg.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(mail.deliver_pending(), (0, 1))
+        msg.refresh_from_db()
+        self.assertEqual((msg.status, msg.attempts), ('failed', mail.MAX_ATTEMPTS))
+        self.assertEqual(django_mail.outbox, [])
+
+
+class SalesRollupTests(TestCase):
+    """
+    销售汇总：已支付 / 已发货 / 已送达订单计入，增量维护与全量重建结果一致
+    """
+
+    def setUp(self):
+        self.product = _products(1)[0]
+
+    def _order(self, status, quantity=2, product=None):
+        product = product or self.product
+        order = Order.objects.create(total_amount=product.price * quantity, status=status)
+        OrderItem.objects.create(
+            order=order, product=product, quantity=quantity, unit_price=product.price,
+        )
+        rollup.record_order(order)
+        return order
+
+    def _change(self, order, status):
+        old, order.status = order.status, status
+        order.save(update_fields=['status'])
+        rollup.record_status_change(order, old, status)
+
+    def _totals(self):
+        rollup.fold_pending()
+        self.product.refresh_from_db()
+        day = DailySales.objects.get()
+        line = ProductDailySales.objects.get()
+        return day.order_count, day.total_amount, line.quantity, self.product.sales_count
+
+    def test_delivered_orders_count_as_revenue(self):
+        order = self._order('paid')
+        self._change(order, 'shipped')
+        self._change(order, 'delivered')
+        self._order('delivered', quantity=1)
+        self._order('pending')
+        self.assertEqual(self._totals(), (2, Decimal('59.70'), 3, 3))
+
+        self._change(order, 'cancelled')
+        self.assertEqual(self._totals(), (1, Decimal('19.90'), 1, 1))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self._change(self._order('paid'), 'delivered')
+        self._order('shipped', quantity=1)
+        self._order('cancelled')
+        incremental = self._totals()
+
+        rollup.rebuild()
+        self.assertEqual(self._totals(), incremental)
+        self.assertEqual(incremental, (2, Decimal('59.70'), 3, 3))
+
+    def _product_lines(self):
+        rollup.fold_pending()
+        return sorted(
+            (line.product_name, line.quantity)
+            for line in ProductDailySales.objects.filter(product=None).exclude(quantity=0)
+        )
+
+    def test_deleted_products_are_kept_apart_by_name(self):
+        other = Product.objects.create(name='其他商品', price=Decimal('5.00'), stock=10)
+        order = self._order('paid')
+        self._order('paid', quantity=1)
+        self._order('paid', product=other)
+        rollup.fold_pending()
+        Product.objects.filter(pk__in=[self.product.pk, other.pk]).delete()
+
+        # 商品删除后取消订单：从同名的汇总行中扣除，不另起一行
+        order.refresh_from_db()
+        self._change(order, 'cancelled')
+        self.assertEqual(self._product_lines(), [('其他商品', 2), ('测试商品 0', 1)])
+        self.assertEqual(ProductDailySales.objects.count(), 2)
+
+        rollup.rebuild()
+        self.assertEqual(self._product_lines(), [('其他商品', 2), ('测试商品 0', 1)])
+
+    def test_checkout_only_appends_deltas(self):
+        user = User.objects.create_user('buyer', password='pw')
+        CartItem.objects.create(user=user, product=self.product, quantity=2)
+        checkout.place_order(user, '地址')
+        self.assertFalse(DailySales.objects.exists())
+        self.assertEqual(SalesDelta.objects.count(), 1)
+
+        self.assertEqual(self._totals(), (1, Decimal('39.80'), 2, 2))
+        self.assertFalse(SalesDelta.objects.exists())
+
+    def test_deleting_order_with_pending_deltas(self):
+        folded = self._order('paid')
+        self._order('paid', quantity=1)
+        rollup.fold_pending()
+        # 已计入后取消、尚未合并即删除：汇总不应被重复扣减
+        self._change(folded, 'cancelled')
+        folded.delete()
+        pending = self._order('paid', quantity=3)
+        pending.delete()
+        self.assertEqual(self._totals(), (1, Decimal('19.90'), 1, 1))
+
+
+class BulkOrderTransitionTests(TestCase):
+    """
+    批量修改订单状态：逐单校验迁移，合法订单一起更新，失败原因逐单返回，可选写入通知邮件
+    """
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        buyer = User.objects.create_user('buyer', 'buyer@example.com', 'pw')
+        self.orders = {
+            status: Order.objects.create(user=buyer, total_amount=Decimal('19.90'), status=status)
+            for status in ('paid', 'pending', 'delivered')
+        }
+        self.second_paid = Order.objects.create(user=buyer, total_amount=Decimal('5.00'), status='paid')
+
+    def _post(self, **data):
+        return self.client.post(reverse('admin_orders_bulk_update') + '?format=json', data)
+
+    def test_ship_selected_orders_with_notifications(self):
+        ids = [o.pk for o in self.orders.values()] + [self.second_paid.pk, 99999]
+        response = self._post(to_status='shipped', ids=','.join(map(str, ids)), notify='1')
+        self.assertEqual(response.json(), {'updated': 2, 'failed': [
+            {'id': self.orders['pending'].pk, 'reason': '不能从待支付变更为已发货'},
+            {'id': self.orders['delivered'].pk, 'reason': '不能从已送达变更为已发货'},
+            {'id': 99999, 'reason': '订单不存在'},
+        ]})
+        self.assertEqual(
+            set(Order.objects.filter(status='shipped').values_list('pk', flat=True)),
+            {self.orders['paid'].pk, self.second_paid.pk},
+        )
+        self.assertEqual(OutboundEmail.objects.filter(to='buyer@example.com').count(), 2)
+        # 已支付 → 已发货仍计入销售额，不产生汇总变化
+        self.assertFalse(SalesDelta.objects.exists())
+
+    def test_cancel_by_filter_leaves_rollup(self):
+        response = self._post(to_status='cancelled', status='paid')
+        self.assertEqual(response.json(), {'updated': 2, 'failed': []})
+        self.assertEqual(sorted(SalesDelta.objects.values_list('sign', flat=True)), [-1, -1])
+        self.assertFalse(OutboundEmail.objects.exists())
+
+        self.assertEqual(self._post(to_status='bogus', ids='1').status_code, 400)
+        self.assertEqual(self._post(to_status='shipped').status_code, 400)
+
+
+class OrderAdminTests(TestCase):
+    """
+    后台订单修改页：状态只读，只能经由批量操作（orders.bulk_transition）修改
+    """
+
+    def test_status_is_read_only_when_editing(self):
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        response = self.client.get(reverse('admin:store_order_add'))
+        self.assertIn('status', response.context['adminform'].form.fields)
+
+        order = Order.objects.create(total_amount=Decimal('19.90'), status='paid')
+        response = self.client.get(reverse('admin:store_order_change', args=[order.pk]))
+        self.assertNotIn('status', response.context['adminform'].form.fields)
+        self.assertIn('status', response.context['adminform'].readonly_fields)
+
+
+@override_settings(SUGGEST_REFRESH_INTERVAL=0)
+class SuggestIndexTests(SimpleTestCase):
+    """
+    搜索联想索引：首次构建期间不阻塞商品修改，构建期间的修改在换入索引时补上
+    """
+
+    def setUp(self):
+        saved = suggest._index, suggest._built_at
+        suggest._index = None
+        self.addCleanup(setattr, suggest, '_index', saved[0])
+        self.addCleanup(setattr, suggest, '_built_at', saved[1])
+
+    def test_changes_during_first_build_are_applied(self):
+        def load():
+            # 构建进行中，另一个线程保存商品
+            writer = threading.Thread(target=suggest.products_changed, args=([(2, '新款手机')], [1]))
+            writer.start()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive(), 'products_changed 被首次构建阻塞')
+            return suggest.SuggestIndex.build([(1, '旧款手机'), (3, '手机壳')])
+
+        with mock.patch.object(suggest, '_load', load):
+            index = suggest.get_index()
+
+        self.assertEqual(index.lookup('新款'), [(2, '新款手机')])
+        self.assertEqual(index.lookup('旧款'), [])
+        self.assertEqual(index.lookup('手机壳'), [(3, '手机壳')])
+
+    def test_pinyin_and_initial_letters(self):
+        index = suggest.SuggestIndex.build([(1, '苹果手机'), (2, '苹果平板'), (3, '平底锅')])
+        self.assertEqual(index.lookup('pingguoshouji'), [(1, '苹果手机')])
+        self.assertEqual(index.lookup('pgsj'), [(1, '苹果手机')])
+        self.assertEqual(index.lookup('PingGuo'), [(1, '苹果手机'), (2, '苹果平板')])
+        self.assertEqual(index.lookup('pdg'), [(3, '平底锅')])
+
+    def test_matches_are_ranked_by_sales_order(self):
+        # 构建顺序即销量顺序：ultra 最畅销，但检索键 watchair 的字典序更小
+        index = suggest.SuggestIndex.build([(1, 'Watch Ultra'), (2, 'Watch Air')])
+        index.update([(3, 'Watch Band')])
+        self.assertEqual([pk for pk, _ in index.lookup('watch')], [1, 2, 3])
+        self.assertEqual([pk for pk, _ in index.lookup('watch', limit=1)], [1])
+
+        # 改名保留名次
+        index.update([(2, 'Watch Zen')])
+        self.assertEqual([pk for pk, _ in index.lookup('watch')], [1, 2, 3])
+
+    def test_short_prefix_refills_after_removal(self):
+        n = suggest.HEAD_SIZE + 5
+        index = suggest.SuggestIndex.build([(pk, f'Watch {pk}') for pk in range(n)])
+        self.assertEqual([pk for pk, _ in index.lookup('w', limit=3)], [0, 1, 2])
+        index.update(removed=[0, 1])
+        self.assertEqual([pk for pk, _ in index.lookup('w', limit=suggest.HEAD_SIZE)], list(range(2, suggest.HEAD_SIZE + 2)))
+
+
+class ImageVariantTests(TestCase):
+    """
+    商品图片衍生图：按原图内容哈希命名、不放大，结果写回后模板可取得 srcset
+    """
+
+    def setUp(self):
+        from PIL import Image
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        os.makedirs(os.path.join(self.media_root, 'products'))
+        self.source = os.path.join(self.media_root, 'products', 'a.png')
+        Image.new('RGB', (700, 350), 'red').save(self.source)
+
+    def test_render_and_save_variants(self):
+        from PIL import Image
+
+        digest, widths = images.render_variants(self.source, self.media_root)
+        self.assertEqual(widths, [320, 640])
+        with Image.open(os.path.join(self.media_root, images.derivative_name(digest, 320, 'webp'))) as img:
+            self.assertEqual(img.size, (320, 160))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, images.derivative_name(digest, 640, 'jpg'))))
+        # 同一内容再次生成：文件名不变，直接跳过
+        self.assertEqual(images.render_variants(self.source, self.media_root), (digest, widths))
+
+        with override_settings(MEDIA_ROOT=self.media_root, MEDIA_URL='/media/'):
+            product = Product.objects.create(name='图片商品', price=Decimal('1.00'), image='products/a.png')
+            self.assertTrue(images.needs_variants(product))
+            self.assertEqual(product.thumbnail_url, '/media/products/a.png')
+
+            self.assertEqual(images.save_variants(product.pk, 'products/a.png', digest, widths), 1)
+            product.refresh_from_db()
+            self.assertFalse(images.needs_variants(product))
+            self.assertEqual(product.webp_srcset, ', '.join(
+                f'/media/{images.derivative_name(digest, w, "webp")} {w}w' for w in widths
+            ))
+            self.assertEqual(product.thumbnail_url, f'/media/{images.derivative_name(digest, 320, "jpg")}')
+
+            # 生成期间商品已换图：丢弃过期结果
+            Product.objects.filter(pk=product.pk).update(image='products/b.png')
+            self.assertEqual(images.save_variants(product.pk, 'products/a.png', digest, widths), 0)
+
+
+class ProductCommentTests(TestCase):
+    """
+    商品评论：按时间倒序游标分页，评论数随发布 / 删除同步更新，评论区缓存随之失效
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.product = _products(1)[0]
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'pw')
+        self.client.force_login(self.admin)
+
+    def _detail(self, **params):
+        return self.client.get(reverse('product_detail', args=[self.product.pk]), params)
+
+    def test_comments_are_paginated_newest_first_and_counted(self):
+        self._detail()  # 填充片段缓存
+        for i in range(3):
+            self.client.post(reverse('add_comment', args=[self.product.pk]), {'content': f'评论 {i}'})
+        self.client.post(reverse('add_comment', args=[self.product.pk]), {'content': '  '})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 3)
+
+        with mock.patch('store.views.COMMENTS_PER_PAGE', 2):
+            response = self._detail()
+            self.assertContains(response, '用户评论（3）')
+            self.assertEqual([c.content for c in response.context['comments']], ['评论 2', '评论 1'])
+            cursor = response.context['page'].next_cursor
+            self.assertEqual([c.content for c in self._detail(cursor=cursor).context['comments']], ['评论 0'])
+
+        newest = ProductComment.objects.get(content='评论 2')
+        self.client.get(reverse('delete_comment', args=[newest.pk]))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 2)
+        response = self._detail()
+        self.assertNotContains(response, '评论 2')
+        self.assertContains(response, '用户评论（2）')
+
+
+class SearchTests(TestCase):
+    """
+    倒排索引检索：中文按子串命中，英文/数字按整词命中
+    """
+
+    def setUp(self):
+        self.phone = Product.objects.create(name='iPhone 15 苹果手机', price=Decimal('5999'), stock=1)
+        self.case = Product.objects.create(name='手机壳 phone case', price=Decimal('29'), stock=1)
+
+    def _names(self, q):
+        return sorted(p.name for p in search.search_products(q))
+
+    def test_cjk_substrings_match(self):
+        self.assertEqual(self._names('果手'), ['iPhone 15 苹果手机'])
+        self.assertEqual(self._names('手机'), ['iPhone 15 苹果手机', '手机壳 phone case'])
+
+    def test_latin_terms_match_whole_words_only(self):
+        self.assertEqual(self._names('IPHONE'), ['iPhone 15 苹果手机'])
+        self.assertEqual(self._names('phone'), ['手机壳 phone case'])
+        self.assertEqual(self._names('pho'), [])
+
+
+class CheckoutTests(TestCase):
+    """
+    结算：库存在同一事务内扣减，订单按事务内读到的价格计价
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pw')
+        self.product = Product.objects.create(name='测试商品', price=Decimal('10.00'), stock=5)
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+
+    def _cart(self):
+        return list(CartItem.objects.filter(user=self.user).select_related('product'))
+
+    def test_order_uses_price_read_inside_transaction(self):
+        items = self._cart()
+        # 读取购物车之后、结算之前商品改价
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('12.50'))
+
+        order = checkout.place_order(self.user, '地址', items)
+
+        item = order.items.get()
+        self.assertEqual(item.unit_price, Decimal('12.50'))
+        self.assertEqual(order.total_amount, Decimal('25.00'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+
+    def test_out_of_stock_rolls_back(self):
+        CartItem.objects.filter(user=self.user).update(quantity=6)
+        with self.assertRaises(checkout.OutOfStock) as cm:
+            checkout.place_order(self.user, '地址')
+        self.assertEqual(cm.exception.available, 5)
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+
+
+class StockShardingTests(TestCase):
+    """
+    库存分片：结算扣减分片且不超卖，consolidate 把分片之和汇总回 Product.stock
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user('buyer', 'buyer@example.com', 'pw')
+        self.product = Product.objects.create(name='热门商品', price=Decimal('10.00'), stock=10)
+        inventory.enable_sharding(self.product, 4)
+
+    def _buy(self, quantity):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=quantity)
+        try:
+            return checkout.place_order(self.user, '地址')
+        finally:
+            CartItem.objects.filter(user=self.user).delete()
+
+    def _shards(self):
+        return list(
+            StockShard.objects.filter(product=self.product).order_by('index').values_list('stock', flat=True)
+        )
+
+    def _stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def test_checkout_takes_from_shards_without_overselling(self):
+        self.assertEqual(self._shards(), [3, 3, 2, 2])
+
+        # 单个分片不够 4 件：锁定全部分片跨分片扣减
+        self._buy(4)
+        self.assertEqual(sum(self._shards()), 6)
+        self.assertEqual(inventory.available([self.product.pk]), {self.product.pk: 6})
+        # 分片商品的 Product.stock 只在汇总时更新
+        self.assertEqual(self._stock(), 10)
+
+        with self.assertRaises(checkout.OutOfStock) as cm:
+            self._buy(7)
+        self.assertEqual(cm.exception.available, 6)
+        self.assertEqual(sum(self._shards()), 6)
+
+        self._buy(6)
+        self.assertEqual(self._shards(), [0, 0, 0, 0])
+        with self.assertRaises(checkout.OutOfStock):
+            self._buy(1)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_consolidate_sums_and_rebalances_shards(self):
+        StockShard.objects.filter(product=self.product, index=0).update(stock=0)
+        self.assertEqual(inventory.consolidate(), 1)
+        self.assertEqual(self._stock(), 7)
+        self.assertEqual(self._shards(), [2, 2, 2, 1])
+
+        # 取消分片：库存合并回商品行
+        self.assertEqual(inventory.enable_sharding(self.product, 0), 7)
+        self.assertEqual(self._stock(), 7)
+        self.assertEqual(self._shards(), [])
+
+    def test_cart_and_in_stock_filter_read_shards(self):
+        # 分片只剩 1 件、尚未汇总：Product.stock 仍为 10
+        StockShard.objects.filter(product=self.product).exclude(index=0).update(stock=0)
+        StockShard.objects.filter(product=self.product, index=0).update(stock=1)
+        self.client.force_login(self.user)
+
+        self.client.get(reverse('add_to_cart', args=[self.product.pk]))
+        self.client.get(reverse('add_to_cart', args=[self.product.pk]))
+        item = CartItem.objects.get(user=self.user)
+        self.assertEqual(item.quantity, 1)
+
+        response = self.client.post(reverse('update_cart_quantity'), {'cart_id': item.pk, 'quantity': 5})
+        self.assertEqual(response.json()['max'], 1)
+
+        in_stock = facets.ProductFilters(in_stock=True)
+        self.assertTrue(in_stock.apply(Product.objects.all()).exists())
+        StockShard.objects.filter(product=self.product).update(stock=0)
+        self.assertFalse(in_stock.apply(Product.objects.all()).exists())
+        self.assertEqual(in_stock.facets(Product.objects.all())['in_stock']['count'], 0)
+        self.assertEqual(self._stock(), 10)
+
+    def test_admin_edit_consolidates_only_on_save(self):
+        StockShard.objects.filter(product=self.product, index=0).update(stock=0)
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+
+        response = self.client.get(reverse('admin_product_edit', args=[self.product.pk]))
+        self.assertEqual(response.context['form']['stock'].value(), 7)
+        self.assertEqual(self._stock(), 10)
+
+
+class ExportProductsCommandTests(TestCase):
+    """
+    manage.py export_products：未指定 --output 时写到命令的 stdout
+    """
+
+    def test_writes_to_command_stdout(self):
+        _products(2)
+        out = io.StringIO()
+        call_command('export_products', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([r['name'] for r in rows], ['测试商品 0', '测试商品 1'])
+
+        out = io.StringIO()
+        call_command('export_products', format='jsonl', stdout=out)
+        self.assertEqual([json.loads(line)['price'] for line in out.getvalue().splitlines()], ['19.90', '19.90'])
+
+
+class OrderItemExportTests(TestCase):
+    """
+    订单明细导出：ASGI 下逐块生成（不整体读入内存），已删除商品使用名称快照
+    """
+
+    def setUp(self):
+        self.staff = User.objects.create_superuser('staff', 'staff@example.com', 'pw')
+        kept, gone = _products(2)
+        order = Order.objects.create(user=self.staff, total_amount=Decimal('39.80'), status='paid')
+        for p in (kept, gone):
+            OrderItem.objects.create(order=order, product=p, quantity=1, unit_price=p.price)
+        gone.delete()
+
+    def _csv(self, content):
+        return list(csv.DictReader(io.StringIO(content.decode('utf-8-sig'))))
+
+    def test_deleted_product_keeps_snapshot_name(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_order_items'))
+        rows = self._csv(b''.join(response.streaming_content))
+        self.assertEqual([r['product_name'] for r in rows], ['测试商品 0', '测试商品 1'])
+        self.assertEqual(rows[1]['product_id'], '')
+
+    def test_async_chunks_are_pulled_one_at_a_time(self):
+        produced = []
+
+        def chunks():
+            for i in range(3):
+                produced.append(i)
+                yield str(i).encode()
+
+        async def first_chunk():
+            body = exports._aiter_chunks(chunks())
+            chunk = await body.__anext__()
+            await body.aclose()
+            return chunk
+
+        self.assertEqual(async_to_sync(first_chunk)(), b'0')
+        self.assertEqual(produced, [0])
+
+    async def test_asgi_response_streams_asynchronously(self):
+        client = AsyncClient()
+        await sync_to_async(client.force_login)(self.staff)
+        response = await client.get(reverse('export_order_items'), {'format': 'jsonl'})
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 2)
+
+
+class LoadTestReportTests(TestCase):
+    """
+    压测报告：最近秩法百分位数，超卖检查对比已售数量与剩余库存
+    """
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(bench.summarize(values), {
+            'n': 100, 'mean': 50.5, 'p50': 50, 'p95': 95, 'p99': 99, 'max': 100,
+        })
+        self.assertEqual(bench.percentile([3.0], 99), 3.0)
+        self.assertEqual(bench.summarize([])['p99'], 0.0)
+
+    def test_oversell_check(self):
+        a, b = _products(2)
+        initial = {a.pk: 10, b.pk: 10}
+        order = Order.objects.create(total_amount=Decimal('0'), status='paid')
+        OrderItem.objects.create(order=order, product=a, quantity=12, unit_price=a.price)
+        Product.objects.filter(pk=a.pk).update(stock=0)
+        self.assertEqual(loadtest.Command()._oversell(initial), {
+            'oversold_products': 1, 'oversold_units': 2, 'stock_mismatched_products': 1,
+        })
+
+        # 已售 10 件、剩余 0 件：与初始库存一致
+        OrderItem.objects.filter(order=order).update(quantity=10)
+        self.assertEqual(loadtest.Command()._oversell(initial), {
+            'oversold_products': 0, 'oversold_units': 0, 'stock_mismatched_products': 0,
+        })
+
+
+def _asgi_get(app, url, headers=()):
+    """
+    直接以 ASGI 协议调用应用，返回 (状态码, 响应头, 响应体)
+    """
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(k.encode(), v.encode()) for k, v in headers],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(app)(scope, receive, send)
+    start = messages[0]
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    return start['status'], {k.decode(): v.decode() for k, v in start['headers']}, body
+
+
+class CatalogApiTests(SimpleTestCase):
+    """
+    只读商品目录接口（catalog_api）：字段选择、游标分页、ETag 与评论查询
+    """
+
+    def setUp(self):
+        from sqlalchemy import create_engine
+        from sqlmodel import Session, SQLModel
+
+        from catalog_api import app as catalog_app, models as catalog_models
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        path = os.path.join(tmpdir, 'catalog.sqlite3')
+        # 测试库为内存库，接口又以只读方式打开文件，这里按映射建一份最小的表
+        engine = create_engine(f'sqlite:///{path}')
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(catalog_models.User(id=1, username='reader'))
+            session.add_all([
+                catalog_models.Product(
+                    id=i, name=f'商品 {i}', price=Decimal('9.90'), stock=i,
+                    created_at=datetime.datetime(2026, 1, i),
+                )
+                for i in (1, 2, 3)
+            ])
+            session.add(catalog_models.ProductComment(
+                id=1, product_id=1, user_id=1, content='不错', created_at=datetime.datetime(2026, 2, 1),
+            ))
+            session.commit()
+        engine.dispose()
+        self.app = catalog_app.create_app(
+            {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}, media_url='/media/', max_age=0,
+        )
+
+    def _get(self, url, **headers):
+        status, response_headers, body = _asgi_get(self.app, url, headers.items())
+        return status, response_headers, json.loads(body) if body else None
+
+    def test_list_pages_with_selected_fields_and_etag(self):
+        status, headers, first = self._get('/api/products?limit=2&fields=id,name')
+        self.assertEqual(status, 200)
+        self.assertEqual(first['results'], [{'id': 3, 'name': '商品 3'}, {'id': 2, 'name': '商品 2'}])
+        self.assertIsNone(first['previous'])
+
+        _, _, second = self._get(f'/api/products?limit=2&fields=id,name&cursor={first["next"]}')
+        self.assertEqual(second['results'], [{'id': 1, 'name': '商品 1'}])
+        self.assertIsNone(second['next'])
+
+        status, _, _ = self._get('/api/products?limit=2&fields=id,name', **{'if-none-match': headers['etag']})
+        self.assertEqual(status, 304)
+        self.assertEqual(self._get('/api/products?fields=secret')[0], 400)
+
+    def test_detail_and_comments(self):
+        status, _, product = self._get('/api/products/1?fields=price,stock')
+        self.assertEqual((status, product), (200, {'price': '9.90', 'stock': 1}))
+        self.assertEqual(self._get('/api/products/9')[0], 404)
+
+        _, _, comments = self._get('/api/products/1/comments')
+        self.assertEqual(
+            [(c['user'], c['content']) for c in comments['results']], [('reader', '不错')],
+        )
+        self.assertEqual(self._get('/api/products/9/comments')[0], 404)
+
+
+class LiveHubTests(SimpleTestCase):
+    """
+    实时推送进程：变更合并后每个商品只查询、推送一次，只推给订阅者，库存未变时不推送
+    """
+
+    def setUp(self):
+        self.hub = live.LiveHub(flush_interval=1)
+        self.stock = {1: 5, 2: 3}
+        self.loads = []
+
+        def load(product_ids, order_ids, user_ids):
+            self.loads.append((sorted(product_ids), sorted(order_ids)))
+            return {pid: self.stock[pid] for pid in product_ids}, [(pk, 7, 'shipped') for pk in order_ids]
+
+        self.hub._load = load
+
+    def _flush(self):
+        sent = []
+        with mock.patch(
+            'websockets.asyncio.server.broadcast',
+            side_effect=lambda conns, message: sent.append((set(conns), json.loads(message))),
+        ):
+            async_to_sync(self.hub.flush)()
+        return sent
+
+    def test_flush_coalesces_and_sends_deltas(self):
+        a, b = object(), object()
+        subs_a, subs_b = set(), set()
+        self.hub.subscribe(a, [1, 2], subs_a)
+        self.hub.subscribe(b, [1], subs_b)
+        self.hub.user_conns[7] = {b}
+
+        # 同一商品多次变化只查询一次；无人订阅的商品不查询
+        self.hub.mark('stock', [1, 2, 99])
+        self.hub.mark('stock', [1])
+        self.hub.mark('order', [42])
+        self.assertEqual(self._flush(), [
+            ({a, b}, {'type': 'stock', 'product': 1, 'stock': 5, 'delta': None}),
+            ({a}, {'type': 'stock', 'product': 2, 'stock': 3, 'delta': None}),
+            ({b}, {'type': 'order', 'order': 42, 'status': 'shipped'}),
+        ])
+        self.assertEqual(self.loads, [([1, 2], [42])])
+
+        self.stock[1] = 2
+        self.hub.mark('stock', [1, 2])
+        self.assertEqual(self._flush(), [({a, b}, {'type': 'stock', 'product': 1, 'stock': 2, 'delta': -3})])
+
+        # 最后一个订阅者退订后不再查询该商品
+        self.hub.unsubscribe(a, [2], subs_a)
+        self.hub.mark('stock', [2])
+        self.assertEqual(self._flush(), [])
+        self.assertEqual(len(self.loads), 2)
+
+
+class LivePublishTests(TestCase):
+    """
+    发布端：事务提交后才发送 UDP 事件
+    """
+
+    def test_events_are_sent_on_commit(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(receiver.close)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.setblocking(False)
+
+        with override_settings(LIVE_EVENTS_ADDR=receiver.getsockname()):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                live.stock_changed({3, 1})
+                live.orders_changed([5])
+                # 提交前不发送
+                with self.assertRaises(BlockingIOError):
+                    receiver.recv(4096)
+        self.assertEqual(len(callbacks), 2)
+        receiver.settimeout(2)
+        events = [json.loads(receiver.recv(4096)) for _ in range(2)]
+        self.assertEqual(events, [{'t': 'stock', 'ids': [1, 3]}, {'t': 'order', 'ids': [5]}])
+
+
+class BenchTemplatesCommandTests(SimpleTestCase):
+    """
+    bench_templates 的上下文与模板保持一致（模板新增变量后命令不能报错）
+    """
+
+    def test_renders_every_page_with_both_backends(self):
+        out = io.StringIO()
+        call_command('bench_templates', rows=3, iterations=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['pages']), {'product_list.html', 'order_list.html', 'admin/admin_orders.html'})
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.product_list, name='product_list'),
     path('product/<int:pk>/', views.product_detail, name='product_detail'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
 
     path('register/', views.register_view, name='register'),
     path('login/', views.login_view, name='login'),
@@ -40,10 +41,14 @@ urlpatterns = [
     path('admin/orders/', views.admin_orders, name='admin_orders'),
     path('admin/orders/<int:pk>/', views.admin_order_detail, name='admin_order_detail'),
     path('admin/orders/<int:pk>/update/', views.admin_order_update, name='admin_order_update'),
+    path('admin/orders/bulk-update/', views.admin_orders_bulk_update, name='admin_orders_bulk_update'),
 
     path('admin/report/', views.sales_report, name='sales_report'),
 
     path('admin/report/export/',views.export_sales_report_csv,name='export_sales_report_csv'),
+    path('admin/report/export/items/', views.export_order_items, name='export_order_items'),
+
+    path('admin/profiling/', views.profiling_report, name='profiling_report'),
 
     path('account/delete/', views.delete_account_view, name='delete_account'),
 
@@ -0,0 +1,191 @@
+"""
+邮箱验证码存储与发送限流
+
+- 验证码保存在带 TTL 的键值存储中，到期自动失效，不再读写 EmailVerification 表
+- 发送限流使用令牌桶：每个邮箱、每个 IP 各一个桶，超出速率直接拒绝
+- 存储后端由 VERIFICATION_STORE 选择：
+    'lru'   进程内 LRU（单机单进程部署）
+    'cache' Django 缓存（VERIFICATION_CACHE_ALIAS），多进程 / 多机部署时配合 Redis 等共享缓存
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# 同一验证码允许输错的次数，超过后作废
+MAX_ATTEMPTS = 5
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LRUBackend:
+    """
+    进程内 LRU + TTL 存储（线程安全）
+    """
+
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires = item
+        if expires <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key, value, ttl, now):
+        self._data[key] = (value, now + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key, time.monotonic())
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._set(key, value, ttl, time.monotonic())
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def update(self, key, fn, ttl):
+        """
+        原子地读取 → fn(旧值) → 写回；fn 返回 (新值, 结果)，新值为 None 时删除
+        """
+        with self._lock:
+            now = time.monotonic()
+            value, result = fn(self._get(key, now))
+            if value is None:
+                self._data.pop(key, None)
+            else:
+                self._set(key, value, ttl, now)
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CacheBackend:
+    """
+    Django 缓存存储
+    - update 为「读 → 写」两步，并发下令牌桶可能多放行个别请求，对限流场景可以接受
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, timeout=ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def update(self, key, fn, ttl):
+        value, result = fn(self.cache.get(key))
+        if value is None:
+            self.cache.delete(key)
+        else:
+            self.cache.set(key, value, timeout=ttl)
+        return result
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if _setting('VERIFICATION_STORE', 'cache') == 'lru':
+                _backend = LRUBackend(_setting('VERIFICATION_LRU_SIZE', 100_000))
+            else:
+                _backend = CacheBackend(_setting('VERIFICATION_CACHE_ALIAS', 'default'))
+        return _backend
+
+
+# ----------------------
+# 令牌桶
+# ----------------------
+def take_token(key, capacity, per_seconds, store=None):
+    """
+    从桶中取一个令牌：容量 capacity，每 per_seconds 秒补满；取到返回 True
+    """
+    store = store or backend()
+    rate = capacity / per_seconds
+    now = time.time()
+
+    def refill(state):
+        tokens, last = state or (capacity, now)
+        tokens = min(capacity, tokens + (now - last) * rate)
+        if tokens >= 1:
+            return (tokens - 1, now), True
+        return (tokens, now), False
+
+    # 桶在 per_seconds 内无访问时已补满，可随 TTL 一起过期
+    return store.update(f'verify:bucket:{key}', refill, per_seconds)
+
+
+# ----------------------
+# 验证码
+# ----------------------
+def _code_key(email):
+    return f'verify:code:{email.strip().lower()}'
+
+
+def issue_code(email, ip=None):
+    """
+    生成并保存验证码
+    - 返回 (验证码, None)；被限流时返回 (None, 'email' | 'ip')
+    """
+    # 先查 IP 桶：被 IP 限流的请求不能消耗邮箱的令牌，否则同一 IP 换着邮箱刷接口时，
+    # 被拒绝的请求仍会让这些邮箱的真实用户在 60 秒内收不到验证码
+    if ip:
+        ip_capacity, ip_period = _setting('VERIFICATION_IP_RATE', (10, 600))
+        if not take_token(f'ip:{ip}', ip_capacity, ip_period):
+            return None, 'ip'
+    email_capacity, email_period = _setting('VERIFICATION_EMAIL_RATE', (1, 60))
+    if not take_token(f'email:{email.strip().lower()}', email_capacity, email_period):
+        return None, 'email'
+
+    ttl = _setting('VERIFICATION_CODE_TTL', 60)
+    code = f'{secrets.randbelow(10 ** 6):06d}'
+    backend().set(_code_key(email), {'code': code, 'attempts': 0, 'expires': time.time() + ttl}, ttl)
+    return code, None
+
+
+def check_code(email, code):
+    """
+    校验验证码，返回 'ok' | 'missing'（不存在或已过期）| 'invalid'
+    - 校验成功后验证码立即作废；输错 MAX_ATTEMPTS 次也作废
+    """
+    def verify(record):
+        # 输错时写回会刷新存储的 TTL，以记录中的过期时间为准
+        if record is None or record['expires'] <= time.time():
+            return None, 'missing'
+        if secrets.compare_digest(record['code'], code or ''):
+            return None, 'ok'
+        attempts = record['attempts'] + 1
+        if attempts >= MAX_ATTEMPTS:
+            return None, 'invalid'
+        return {**record, 'attempts': attempts}, 'invalid'
+
+    return backend().update(_code_key(email), verify, _setting('VERIFICATION_CODE_TTL', 60))
@@ -2,14 +2,14 @@
 # Django 核心
 # ======================
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseRedirect, HttpResponseBadRequest, Http404
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import SimpleLazyObject
 from django.db import transaction
-from django.db.models import Sum, Count, Q
-from django.db.models.functions import TruncDate
+from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper, Prefetch
 
 # ======================
 # Django 认证与权限
@@ -23,8 +23,8 @@ from django.contrib.admin.views.decorators import staff_member_required
 # ======================
 # Django 其他组件
 # ======================
+from django.conf import settings
 from django.contrib import messages
-from django.core.mail import send_mail
 
 # ======================
 # 项目 Models
@@ -34,10 +34,18 @@ from .models import (
     CartItem,
     Order,
     OrderItem,
-    EmailVerification,
     ProductComment,
+    DailySales,
+    ProductDailySales,
 )
 
+from . import (
+    caching, checkout, exports, facets, inventory, live, mail, orders, profiling, search, suggest,
+    verification,
+)
+from .pagination import apaginate, paginate
+from .routers import use_primary
+
 # ======================
 # 项目 Forms
 # ======================
@@ -53,42 +61,155 @@ from .forms import (
 # ======================
 # Python 标准库
 # ======================
-import uuid
+import os
 from decimal import Decimal
 
+from asgiref.sync import sync_to_async
+
+
+# 每页条数（游标分页）
+PRODUCTS_PER_PAGE = 20
+ORDERS_PER_PAGE = 20
+ADMIN_PER_PAGE = 50
+COMMENTS_PER_PAGE = 20
+# 搜索联想条数（默认 / 上限）
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 20
+
+
+def _wants_json(request):
+    """
+    ?format=json 时列表页返回 JSON，供前端 / 移动端使用
+    """
+    return request.GET.get('format') == 'json'
+
+
+def _page_json(page, results, **extra):
+    return JsonResponse({'results': results, **page.as_dict(), **extra})
+
+
+def _product_json(p):
+    return {
+        'id': p.id,
+        'name': p.name,
+        'price': str(p.price),
+        'stock': p.stock,
+        'image': p.image.url if p.image else None,
+        'created_at': p.created_at.isoformat(),
+    }
+
+
+def _order_json(o):
+    return {
+        'id': o.id,
+        'status': o.status,
+        'total_amount': str(o.total_amount),
+        'created_at': o.created_at.isoformat(),
+    }
+
 
 # ======================
 # 商品展示功能
 # ======================
-def product_list(request):
+async def product_list(request):
     """
-    商品列表页
-    - 支持关键词查询
+    商品列表页（异步视图）
+    - 支持关键词查询（走倒排索引，按相关度排序）
+    - 支持价格区间、仅看有货筛选与按价格 / 上架时间 / 销量排序（store.facets），
+      结果总数与各选项数量由一条聚合查询取出
+    - 游标分页，深翻页与第一页开销相同
+    - JSON 接口使用异步 ORM，在 ASGI 下等待数据库时不占用工作线程
+    - HTML 页面的商品与分面计数惰性求值，在线程中渲染模板：
+      网格与分面片段都命中缓存时不查询商品表
     - GET 请求不修改服务器状态，符合 REST 设计原则
     """
     q = request.GET.get('q', '').strip()
+    filters = facets.ProductFilters.from_query(request.GET)
 
     products = Product.objects.all()
+    ordering = ('-created_at', '-id')
 
     if q:
-        products = products.filter(
-            Q(name__icontains=q) |
-            Q(description__icontains=q)
+        products = search.search_products(q, products)
+        ordering = ('-search_score', '-created_at', '-id')
+
+    if _wants_json(request):
+        counts = await filters.afacets(products)
+        page = await apaginate(
+            request, filters.apply(products), PRODUCTS_PER_PAGE, filters.ordering(ordering),
         )
+        return _page_json(page, [_product_json(p) for p in page], count=counts['total'], facets=counts)
 
-    return render(request, 'product_list.html', {
-        'products': products,
+    page = paginate(request, filters.apply(products), PRODUCTS_PER_PAGE, filters.ordering(ordering))
+    # 渲染在线程中进行（同步 ORM），惰性的本页数据与分面计数只在片段未命中缓存时查询
+    return await sync_to_async(render)(request, 'product_list.html', {
+        'products': page,
+        'page': page,
         'q': q,
+        'filters': filters,
+        'facets': SimpleLazyObject(lambda: filters.facets(products)),
+        'catalog_version': await caching.acatalog_version(),
+        'cache_timeout': caching.FRAGMENT_TIMEOUT,
+        # 库存 / 销量变化不递增目录版本号，依赖它们的列表只短时间缓存；分面中总有「有货」计数
+        'grid_timeout': caching.VOLATILE_FRAGMENT_TIMEOUT if filters.volatile else caching.FRAGMENT_TIMEOUT,
+        'facets_timeout': caching.VOLATILE_FRAGMENT_TIMEOUT,
     })
 
 
-def product_detail(request, pk):
+async def product_detail(request, pk):
     """
-    商品详情页
-    - 使用 get_object_or_404 防止非法资源访问
+    商品详情页（异步视图）
+    - 商品不存在时返回 404，防止非法资源访问
+    - 商品信息与评论区使用片段缓存，库存与购买按钮实时渲染
+    - 评论按时间倒序游标分页（走 (product, created_at, id) 索引），评论者一并 JOIN 取出
     """
-    product = get_object_or_404(Product, pk=pk)
-    return render(request, 'product_detail.html', {'product': product})
+    try:
+        product = await Product.objects.aget(pk=pk)
+    except Product.DoesNotExist:
+        raise Http404('商品不存在')
+
+    comments = await apaginate(
+        request,
+        ProductComment.objects.filter(product=product).select_related('user'),
+        COMMENTS_PER_PAGE,
+        ('-created_at', '-id'),
+    )
+
+    # 渲染在线程中进行：模板访问 user / messages 时的会话与用户查询不在事件循环中执行
+    return await sync_to_async(render)(request, 'product_detail.html', {
+        'product': product,
+        'comments': comments,
+        'page': comments,
+        'product_version': await caching.aproduct_version(product.pk),
+        'cache_timeout': caching.FRAGMENT_TIMEOUT,
+        'live_ws_url': settings.LIVE_WS_URL,
+    })
+
+
+async def search_suggest(request):
+    """
+    搜索框联想（异步视图）
+    - 查询进程内前缀索引（store.suggest），不访问数据库；
+      索引只在本进程首次使用时构建一次（在线程中进行，不阻塞事件循环）
+    - 支持名称前缀，安装 pypinyin 时支持中文名称的全拼 / 首字母前缀
+    """
+    q = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGEST_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+
+    index = suggest.current_index()
+    if index is None:
+        index = await sync_to_async(suggest.get_index, thread_sensitive=False)()
+
+    return JsonResponse({
+        'q': q,
+        'results': [
+            {'id': pk, 'name': name, 'url': reverse('product_detail', args=[pk])}
+            for pk, name in index.lookup(q, limit)
+        ],
+    })
 
 # ======================
 # 用户注册与登录（认证子系统）
@@ -98,7 +219,7 @@ def register_view(request):
     """
     用户注册视图
     - 使用邮箱验证码防止恶意注册
-    - 验证码存储于数据库，避免依赖 Session
+    - 验证码存储于带过期时间的键值存储（store.verification），不依赖 Session
     """
     if request.method == 'POST':
         form = RegisterForm(request.POST)
@@ -107,27 +228,15 @@ def register_view(request):
             email = form.cleaned_data['email']
             code_input = form.cleaned_data['code']
 
-            # 检查验证码
-            try:
-                record = EmailVerification.objects.get(email=email)
-            except EmailVerification.DoesNotExist:
-                messages.error(request, '请先发送验证码')
+            # 检查验证码（校验成功后立即作废）
+            result = verification.check_code(email, code_input)
+            if result == 'missing':
+                messages.error(request, '验证码不存在或已过期，请重新发送')
                 return render(request, 'register.html', {'form': form})
-
-            # 验证码过期
-            if record.is_expired():
-                record.delete()
-                messages.error(request, '验证码已过期，请重新发送')
-                return render(request, 'register.html', {'form': form})
-
-            # 验证码错误
-            if record.code != code_input:
+            if result != 'ok':
                 messages.error(request, '验证码错误')
                 return render(request, 'register.html', {'form': form})
 
-            # 验证成功 → 删除验证码
-            record.delete()
-
             # 创建用户
             user = form.save(commit=False)
             pw = form.cleaned_data['password']
@@ -190,6 +299,7 @@ def logout_view(request):
 # 购物车功能
 # ======================
 @login_required
+@use_primary
 def add_to_cart(request, pk):
     """
     加入购物车
@@ -198,10 +308,12 @@ def add_to_cart(request, pk):
     """
     product = get_object_or_404(Product, pk=pk)
     item, created = CartItem.objects.get_or_create(user=request.user, product=product)
+    # 分片商品的 Product.stock 是定期汇总值，按分片实际库存检查
+    stock = inventory.available_for([product])[product.pk]
 
     if not created:
         # 库存限制
-        if item.quantity + 1 > product.stock:
+        if item.quantity + 1 > stock:
             messages.error(request, "库存不足，无法继续添加。")
         else:
             item.quantity += 1
@@ -209,7 +321,7 @@ def add_to_cart(request, pk):
             messages.success(request, f'已将 {product.name} 加入购物车。')
     else:
         # 首次加入购物车，检查库存
-        if product.stock < 1:
+        if stock < 1:
             messages.error(request, "此商品已售罄。")
         else:
             item.quantity = 1
@@ -223,6 +335,7 @@ def add_to_cart(request, pk):
 
 
 @login_required
+@use_primary
 def remove_from_cart(request, item_id):
     """
     从购物车移除商品
@@ -238,109 +351,78 @@ def cart_view(request):
     购物车页面
     - 汇总用户当前购物车状态
     """
-    items = CartItem.objects.filter(user=request.user)
-    total = sum([it.subtotal() for it in items]) if items else Decimal('0.00')
+    items = list(CartItem.objects.filter(user=request.user).select_related('product'))
+    total = sum((it.subtotal() for it in items), Decimal('0.00'))
     return render(request, 'cart.html', {'items': items, 'total': total})
 
 
+def _cart_total(user):
+    """
+    购物车总金额（数据库端聚合，单条查询）
+    """
+    line_total = ExpressionWrapper(
+        F('quantity') * F('product__price'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    total = CartItem.objects.filter(user=user).aggregate(total=Sum(line_total))['total']
+    return total or Decimal('0.00')
+
+
 # ======================
 # 订单结算（事务与并发控制重点）
 # ======================
 @login_required
+@use_primary
 def checkout_view(request):
     """
     订单结算视图（系统关键路径）
-    - 使用 transaction.atomic 保证一致性
-    - 使用 select_for_update 防止并发超卖
+    - 库存扣减与订单写入由 store.checkout 以固定条数的集合式 SQL 完成
+    - 使用带条件的 UPDATE 防止并发超卖，无需 select_for_update 长时间持锁
     """
-    items = CartItem.objects.filter(user=request.user)
-    if not items.exists():
+    items = list(CartItem.objects.filter(user=request.user).select_related('product'))
+    if not items:
         messages.error(request, '购物车为空。')
         return redirect('product_list')
 
-    # 在用户刚进入结算页面（GET 阶段）先检查库存
+    # 在用户刚进入结算页面（GET 阶段）先检查库存（分片商品按分片实际库存）
+    stock = inventory.available_for([it.product for it in items])
     for it in items:
-        if it.product.stock < it.quantity:
+        if stock[it.product_id] < it.quantity:
             messages.error(
                 request,
-                f"商品《{it.product.name}》库存不足，当前库存：{it.product.stock}"
+                f"商品《{it.product.name}》库存不足，当前库存：{stock[it.product_id]}"
             )
             return redirect('cart')
 
-    total = sum([it.subtotal() for it in items])
+    total = sum(it.subtotal() for it in items)
 
     if request.method == 'POST':
         form = CheckoutForm(request.POST)
         if form.is_valid():
             address = form.cleaned_data['address']
 
-            with transaction.atomic():
-                # select_for_update 锁定商品库存
-                product_ids = [it.product_id for it in items]
-                locked_products = (
-                    Product.objects.select_for_update()
-                    .filter(id__in=product_ids)
-                )
-
-                locked_map = {p.id: p for p in locked_products}
-
-                # 并发场景下（二次检查库存）
-                for it in items:
-                    product = locked_map[it.product_id]
-                    if product.stock < it.quantity:
-                        messages.error(
-                            request,
-                            f"商品《{product.name}》库存不足，当前库存：{product.stock}"
-                        )
-                        return redirect('cart')
-
-                # 库存足够 → 创建订单
-                order = Order.objects.create(
-                    user=request.user,
-                    total_amount=total,
-                    address=address,
-                    status='paid'
+            # 并发场景下库存以 UPDATE 的受影响行数为准（二次检查库存）
+            try:
+                order = checkout.place_order(request.user, address, items)
+            except checkout.OutOfStock as e:
+                messages.error(
+                    request,
+                    f"商品《{e.product.name}》库存不足，当前库存：{e.available}"
                 )
+                return redirect('cart')
 
-                # 创建订单项 + 扣库存
-                for it in items:
-                    product = locked_map[it.product_id]
-
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        quantity=it.quantity,
-                        unit_price=product.price
-                    )
-
-                    product.stock -= it.quantity
-                    product.save()
-
-                # 清空购物车
-                items.delete()
-
-            # 生成随机验证串
-            confirm_code = uuid.uuid4().hex
-            order.confirm_code = confirm_code
-            order.save()
-
-            # 生成确认 URL
+            # 生成确认 URL（确认码在下单时已写入订单）
             confirm_url = request.build_absolute_uri(
-                reverse('confirm_shipment', args=[order.id, confirm_code])
+                reverse('confirm_shipment', args=[order.id, order.confirm_code])
             )
 
-            # 邮件通知
-            try:
-                send_mail(
-                    subject='您的订单已创建，请确认发货',
-                    message=f"您的订单已创建，总金额：{order.total_amount} 元。\n"
-                            f"请点击以下链接确认发货：\n{confirm_url}",
-                    from_email='3882373502@qq.com',
-                    recipient_list=[request.user.email],
-                    fail_silently=False,
-                )
-            except Exception as e:
-                print("邮件发送失败：", e)
+            # 邮件通知（写入发件箱，由后台进程发送）
+            mail.queue_mail(
+                subject='您的订单已创建，请确认发货',
+                message=f"您的订单已创建，总金额：{order.total_amount} 元。\n"
+                        f"请点击以下链接确认发货：\n{confirm_url}",
+                recipient_list=[request.user.email],
+            )
 
             messages.success(request, '订单已创建，请前往邮箱确认发货。')
             return redirect('order_success')
@@ -364,8 +446,19 @@ def order_list(request):
     """
     用户订单列表
     """
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'order_list.html', {'orders': orders})
+    orders = Order.objects.filter(user=request.user).prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+    )
+    page = paginate(request, orders, ORDERS_PER_PAGE)
+
+    if _wants_json(request):
+        return _page_json(page, [_order_json(o) for o in page])
+
+    return render(request, 'order_list.html', {
+        'orders': page,
+        'page': page,
+        'live_ws_url': settings.LIVE_WS_URL,
+    })
 
 
 # ======================
@@ -376,8 +469,12 @@ def is_superuser(user):
 
 @user_passes_test(is_superuser, login_url='login')
 def admin_product_list(request):
-    products = Product.objects.all().order_by('-created_at')
-    return render(request, 'admin/product_list.html', {'products': products})
+    page = paginate(request, Product.objects.all(), ADMIN_PER_PAGE)
+
+    if _wants_json(request):
+        return _page_json(page, [_product_json(p) for p in page])
+
+    return render(request, 'admin/product_list.html', {'products': page, 'page': page})
 
 @user_passes_test(is_superuser, login_url='login')
 def admin_product_add(request):
@@ -393,10 +490,22 @@ def admin_product_add(request):
 @user_passes_test(is_superuser, login_url='login')
 def admin_product_edit(request, pk):
     p = get_object_or_404(Product, pk=pk)
+    if p.stock_shard_count:
+        # 分片商品：表单中显示分片实际库存；只在提交时汇总写回，
+        # 保存时据此判断库存是否被修改
+        if request.method == 'POST':
+            inventory.consolidate([p.pk], rebalance=False)
+            p.refresh_from_db(fields=['stock'])
+        else:
+            p.stock = inventory.available([p.pk])[p.pk]
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=p)
         if form.is_valid():
             form.save()
+            if 'stock' in form.changed_data:
+                if p.stock_shard_count:
+                    inventory.set_stock(p, p.stock)
+                live.stock_changed([p.pk])
             return redirect('admin_product_list')
     else:
         form = ProductForm(instance=p)
@@ -416,19 +525,14 @@ def confirm_order(request, order_id):
     - 仅允许订单所属用户操作
     - 用于业务流程中“已支付 → 已发货”的状态迁移
     """
-    # 同时校验订单 ID 与用户身份，防止越权访问
-    order = get_object_or_404(Order, pk=order_id, user=request.user)
-
-    # 仅允许对已支付订单进行确认，保证状态机合法性
-    if order.status != 'paid':
+    # 条件更新：订单 ID、所属用户与当前状态同时作为 WHERE 条件，防止越权与并发重复确认
+    if orders.transition(order_id, 'shipped', expected='paid', user=request.user) is None:
+        if not Order.objects.filter(pk=order_id, user=request.user).exists():
+            raise Http404
         messages.error(request, '当前订单无法确认发货。')
         return redirect('order_list')
 
-    # 修改状态为“已发货”
-    order.status = 'shipped'
-    order.save()
-
-    messages.success(request, f'订单 {order.id} 已确认发货！')
+    messages.success(request, f'订单 {order_id} 已确认发货！')
     return redirect('order_list')
 
 def confirm_shipment_view(request, order_id, code):
@@ -437,20 +541,22 @@ def confirm_shipment_view(request, order_id, code):
     - 通过随机确认码验证操作合法性
     - 适用于“无登录态”的外部访问场景
     """
+    # 确认码作为 WHERE 条件，防止伪造请求
+    shipped = orders.transition(order_id, 'shipped', confirm_code=code) is not None
     order = get_object_or_404(Order, id=order_id)
 
-    # 校验确认码，防止伪造请求
-    if order.confirm_code != code:
-        return render(request, 'confirm_fail.html', {"msg": "验证码无效"})
-
-    order.status = 'shipped'
-    order.save()
+    if not shipped:
+        if order.confirm_code != code:
+            return render(request, 'confirm_fail.html', {"msg": "验证码无效"})
+        # 重复点击确认链接时仍显示成功
+        if order.status != 'shipped':
+            return render(request, 'confirm_fail.html', {"msg": "当前订单状态无法确认发货"})
 
     return render(request, 'confirm_success.html', {"order": order})
 
-def send_code(request):
+async def send_code(request):
     """
-    发送邮箱验证码（注册流程）
+    发送邮箱验证码（注册流程，异步视图）
     - 使用 GET 接口，返回 JSON，供前端 AJAX 调用
     """
     email = request.GET.get('email')
@@ -458,33 +564,17 @@ def send_code(request):
     if not email:
         return JsonResponse({'status': 'error', 'msg': '请提供邮箱'})
 
-    # 防止频繁发送验证码（简单限流机制）
-    try:
-        record = EmailVerification.objects.get(email=email)
-        if not record.is_expired():
-            return JsonResponse({'status': 'error', 'msg': '发送过于频繁，请稍后再试'})
-        else:
-            record.delete()
-    except EmailVerification.DoesNotExist:
-        pass
-
-    # 生成 6 位数字验证码
-    code = str(uuid.uuid4().int)[0:6]
-
-    # 保存验证码
-    EmailVerification.objects.create(email=email, code=code)
+    # 生成并保存验证码；按邮箱与 IP 两个令牌桶限流，被限流的请求不访问数据库
+    code, limited = await sync_to_async(verification.issue_code)(email, request.META.get('REMOTE_ADDR'))
+    if limited:
+        return JsonResponse({'status': 'error', 'msg': '发送过于频繁，请稍后再试'})
 
-    # 发送邮件
-    try:
-        send_mail(
-            subject='注册验证码',
-            message=f'您的注册验证码为：{code} （1 分钟内有效）',
-            from_email='3882373502@qq.com',
-            recipient_list=[email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        return JsonResponse({'status': 'error', 'msg': f'邮件发送失败：{e}'})
+    # 发送邮件（写入发件箱，不在请求内连接 SMTP）
+    await mail.aqueue_mail(
+        subject='注册验证码',
+        message=f'您的注册验证码为：{code} （1 分钟内有效）',
+        recipient_list=[email],
+    )
 
     return JsonResponse({'status': 'ok', 'msg': '验证码已发送'})
 
@@ -517,13 +607,11 @@ def forgot_password_view(request):
                 reverse('reset_password', args=[uid, token])
             )
 
-            # 发送邮件
-            send_mail(
+            # 发送邮件（写入发件箱，由后台进程发送）
+            mail.queue_mail(
                 subject='重置密码链接',
                 message=f"请点击以下链接重置您的密码：\n{reset_url}",
-                from_email='3882373502@qq.com',
                 recipient_list=[email],
-                fail_silently=False,
             )
 
             messages.success(request, "重置密码链接已发送至您的邮箱。")
@@ -579,7 +667,9 @@ def add_comment(request, pk):
     if request.method == 'POST':
         content = request.POST.get('content','').strip()
         if content:
-            ProductComment.objects.create(product=product, user=request.user, content=content)
+            # 评论与商品评论数（signals 中维护）同一事务提交
+            with transaction.atomic():
+                ProductComment.objects.create(product=product, user=request.user, content=content)
             messages.success(request, "评论已发布。")
         else:
             messages.error(request, "评论内容不能为空。")
@@ -594,8 +684,9 @@ def delete_comment(request, comment_id):
     - 使用 RBAC 控制，仅管理员可操作
     """
     c = get_object_or_404(ProductComment, pk=comment_id)
-    product_pk = c.product.pk
-    c.delete()
+    product_pk = c.product_id
+    with transaction.atomic():
+        c.delete()
     messages.success(request, "评论已删除。")
     return redirect('product_detail', pk=product_pk)
 
@@ -604,6 +695,7 @@ def delete_comment(request, comment_id):
 # 购物车数量更新（同步 + 异步）
 # ======================================================
 @login_required
+@use_primary
 def update_cart_item(request, item_id):
     """
     更新购物车商品数量（同步表单提交）
@@ -623,6 +715,7 @@ def update_cart_item(request, item_id):
 
     return redirect('cart')
 
+@use_primary
 def update_cart_quantity(request):
     """
     更新购物车数量（AJAX 接口）
@@ -632,14 +725,15 @@ def update_cart_quantity(request):
         cart_id = request.POST.get("cart_id")
         quantity = int(request.POST.get("quantity"))
 
-        item = CartItem.objects.get(id=cart_id, user=request.user)
+        item = CartItem.objects.select_related('product').get(id=cart_id, user=request.user)
 
-        # 库存检查
-        if quantity > item.product.stock:
+        # 库存检查（分片商品按分片实际库存）
+        stock = inventory.available_for([item.product])[item.product_id]
+        if quantity > stock:
             return JsonResponse({
                 'error': 'overstock',
-                'max': item.product.stock,
-                'message': f"最多只能购买 {item.product.stock} 件"
+                'max': stock,
+                'message': f"最多只能购买 {stock} 件"
             })
 
         # 库存不能小于 1
@@ -650,8 +744,7 @@ def update_cart_quantity(request):
         item.save()
 
         subtotal = item.quantity * item.product.price
-        items = CartItem.objects.filter(user=request.user)
-        total = sum(i.quantity * i.product.price for i in items)
+        total = _cart_total(request.user)
 
         return JsonResponse({
             'subtotal': subtotal,
@@ -669,16 +762,23 @@ def admin_orders(request):
     """
     管理员订单列表
     """
-    orders = Order.objects.all().order_by('-created_at')
-    return render(request, 'admin/admin_orders.html', {'orders': orders})
+    page = paginate(request, Order.objects.select_related('user'), ADMIN_PER_PAGE)
+
+    if _wants_json(request):
+        return _page_json(page, [
+            {**_order_json(o), 'user': o.user.username if o.user else None}
+            for o in page
+        ])
+
+    return render(request, 'admin/admin_orders.html', {'orders': page, 'page': page})
 
 @staff_member_required
 def admin_order_detail(request, pk):
     """
     管理员订单详情
     """
-    order = get_object_or_404(Order, pk=pk)
-    items = OrderItem.objects.filter(order=order)
+    order = get_object_or_404(Order.objects.select_related('user'), pk=pk)
+    items = list(OrderItem.objects.filter(order=order).select_related('product'))
 
     # 后端计算总金额，避免前端信任问题
     total_amount = sum(item.unit_price * item.quantity for item in items)
@@ -687,21 +787,82 @@ def admin_order_detail(request, pk):
         'order': order,
         'items': items,
         'total_amount': total_amount,
+        'next_statuses': [
+            (code, orders.STATUS_LABELS[code])
+            for code in sorted(orders.ALLOWED_TRANSITIONS.get(order.status, ()))
+        ],
     })
 
 @staff_member_required
 def admin_order_update(request, pk):
     """
     管理员修改订单状态
+    - 按状态机校验后条件更新，只写 status 一列
     """
-    order = get_object_or_404(Order, pk=pk)
     status = request.POST.get("status")
 
     if status:
-        order.status = status
-        order.save()
+        try:
+            changed = orders.transition(pk, status) is not None
+        except orders.TransitionError as e:
+            messages.error(request, str(e))
+        else:
+            if changed:
+                messages.success(request, f'订单 {pk} 状态已更新。')
+            else:
+                get_object_or_404(Order, pk=pk)
+                messages.error(request, '当前订单状态不能变更为该状态。')
+
+    return redirect('admin_order_detail', pk=pk)
+
+@staff_member_required
+def admin_orders_bulk_update(request):
+    """
+    管理员批量修改订单状态（发货批次等）
+    - POST：to_status 为目标状态；ids 为订单 id（可多个或逗号 / 空白分隔），
+      或不传 ids 而按 status / start / end 筛选订单（参数同订单明细导出）
+    - notify=1 时为每个成功的订单写入一封通知邮件
+    - 逐单校验状态迁移，不合法的订单列入失败列表，其余按批一条 UPDATE 写入
+    - ?format=json 时返回 {updated, failed: [{id, reason}]}
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest('仅支持 POST')
+
+    to_status = request.POST.get('to_status', '')
+    raw_ids = [s for value in request.POST.getlist('ids') for s in value.replace(',', ' ').split()]
+    try:
+        ids = [int(s) for s in raw_ids]
+    except ValueError:
+        return HttpResponseBadRequest('订单 id 必须是整数')
 
-    return redirect('admin/admin_order_detail', pk=pk)
+    if not ids:
+        # 未勾选订单：按筛选条件选出可迁移到目标状态的订单
+        try:
+            start, end, statuses = exports.parse_filters(request.POST)
+        except exports.ExportError as e:
+            return HttpResponseBadRequest(str(e))
+        if not (start or end or statuses):
+            return HttpResponseBadRequest('请选择订单或提供筛选条件')
+        qs = exports.filter_orders(
+            Order.objects.filter(status__in=orders.sources_for(to_status)), start, end, statuses,
+        )
+        ids = list(qs.order_by('id').values_list('id', flat=True))
+
+    try:
+        result = orders.bulk_transition(ids, to_status, notify=request.POST.get('notify') == '1')
+    except orders.TransitionError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if _wants_json(request):
+        return JsonResponse(result.as_dict())
+
+    if result.updated:
+        messages.success(request, f'已更新 {len(result.updated)} 个订单。')
+    if result.failed:
+        shown = '；'.join(f'#{pk} {reason}' for pk, reason in sorted(result.failed.items())[:20])
+        more = f' 等 {len(result.failed)} 个' if len(result.failed) > 20 else ''
+        messages.error(request, f'以下订单未更新{more}：{shown}')
+    return redirect('admin_orders')
 
 
 # ======================================================
@@ -711,33 +872,31 @@ def admin_order_update(request, pk):
 def sales_report(request):
     """
     销售统计报表
-    - 使用 ORM 聚合完成分析
+    - 读取预聚合的每日汇总表，开销与天数相关、与订单量无关
     """
     # 每日销售额
     daily_sales = (
-        Order.objects.filter(status__in=["paid", "shipped", "completed"])
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(total=Sum('total_amount'))
+        DailySales.objects.filter(order_count__gt=0)
+        .values('day', 'total_amount')
         .order_by('day')
     )
 
     # 转换成前端可直接使用的列表
-    labels = [str(item['day']) for item in daily_sales]
-    totals = [float(item['total']) for item in daily_sales]
+    labels = []
+    totals = []
+    total_sales = 0
+    for item in daily_sales:
+        labels.append(str(item['day']))
+        totals.append(float(item['total_amount']))
+        total_sales += item['total_amount']
 
     # 商品销量排行
     top_products = (
-        OrderItem.objects.values('product__name')
+        ProductDailySales.objects.values('product_name')
         .annotate(total_qty=Sum('quantity'))
         .order_by('-total_qty')[:10]
     )
 
-    # 总销售额
-    total_sales = Order.objects.filter(
-        status__in=["paid", "shipped", "completed"]
-    ).aggregate(Sum("total_amount"))['total_amount__sum'] or 0
-
     return render(request, 'admin/sales_report.html', {
         'labels': labels,
         'totals': totals,
@@ -746,6 +905,21 @@ def sales_report(request):
     })
 
 
+@staff_member_required
+def profiling_report(request):
+    """
+    当前进程的视图性能采样统计（分位数）
+    - ?reset=1 清空已有样本
+    """
+    if request.GET.get('reset'):
+        profiling.STORE.clear()
+    return JsonResponse({
+        'pid': os.getpid(),
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', None),
+        'views': profiling.STORE.snapshot(),
+    })
+
+
 # ======================================================
 # CSV 导出（流式响应）
 # ======================================================
@@ -753,7 +927,6 @@ import csv
 from django.http import StreamingHttpResponse
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Sum
-from django.db.models.functions import TruncDate
 
 
 class Echo:
@@ -768,13 +941,11 @@ class Echo:
 def export_sales_report_csv(request):
     """
     导出销售报表 CSV
-    - 使用 StreamingHttpResponse，避免大文件占用内存
+    - 使用 StreamingHttpResponse，避免大文件占用内存（ASGI 下逐块在线程中生成，见 exports.response_body）
     """
     qs = (
-        Order.objects.filter(status__in=["paid", "shipped", "completed"])
-        .annotate(day=TruncDate('created_at'))
-        .values('day')
-        .annotate(total=Sum('total_amount'))
+        DailySales.objects.filter(order_count__gt=0)
+        .values('day', 'total_amount')
         .order_by('day')
     )
 
@@ -792,11 +963,11 @@ def export_sales_report_csv(request):
         for row in qs:
             yield writer.writerow([
                 row['day'],
-                row['total']
+                row['total_amount']
             ])
 
     response = StreamingHttpResponse(
-        row_generator(),
+        exports.response_body(request, row_generator()),
         content_type='text/csv; charset=utf-8'
     )
 
@@ -807,6 +978,37 @@ def export_sales_report_csv(request):
     return response
 
 
+@staff_member_required
+def export_order_items(request):
+    """
+    导出订单明细（每个 OrderItem 一行）
+    - ?format=csv|jsonl，?gzip=1 压缩输出
+    - ?start=YYYY-MM-DD&end=YYYY-MM-DD 按下单日期过滤（含当天），?status=paid,shipped 按状态过滤
+    - 分批读取数据库并流式输出，百万行导出内存占用也保持平稳
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest('format 仅支持 csv / jsonl')
+    try:
+        start, end, statuses = exports.parse_filters(request.GET)
+    except exports.ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    compress = request.GET.get('gzip') in ('1', 'true')
+    rows = exports.order_items(start, end, statuses)
+    content_type = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+    filename = f'order_items.{fmt}'
+    if compress:
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(
+        exports.response_body(request, exports.stream(rows, fmt, compress)), content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ======================================================
 # 账号注销（事务保护）
 # ======================================================